@@ -24,6 +24,37 @@ function Badge({ status }) {
   return <span className={style}>{status}</span>;
 }
 
+/* ---------------- FILE LIST ---------------- */
+
+// GET /files is paged; follow X-Next-Cursor until the last page
+async function fetchAllFiles() {
+
+  const all = [];
+  let cursor = null;
+
+  do {
+
+    const url = new URL(`${API}/files`);
+    url.searchParams.set("limit", "1000");
+
+    if (cursor) {
+      url.searchParams.set("cursor", cursor);
+    }
+
+    const response = await fetch(url);
+
+    if (!response.ok) {
+      throw new Error(`Listing files failed: ${response.status}`);
+    }
+
+    all.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+
+  } while (cursor);
+
+  return all;
+}
+
 /* ---------------- MAIN ---------------- */
 
 export default function App() {
@@ -41,7 +72,7 @@ export default function App() {
 
     try {
 
-      const f = await fetch(`${API}/files`).then((r) => r.json());
+      const f = await fetchAllFiles();
       const n = await fetch(`${API}/nodes`).then((r) => r.json());
       const c = await fetch(`${API}/cluster/health`).then((r) => r.json());
 
@@ -54,13 +85,48 @@ export default function App() {
     }
   };
 
+  /* ---------------- LIVE UPDATES (SSE) ---------------- */
+
   useEffect(() => {
 
-    loadAll();
+    const events = new EventSource(`${API}/events`);
+
+    const on = (type, handler) =>
+      events.addEventListener(type, (e) => handler(JSON.parse(e.data)));
+
+    // (Re)connected: load the current state once, deltas follow
+    events.onopen = () => loadAll();
+
+    on("cluster", (health) => setCluster(health));
+
+    on("file_uploaded", ({ file }) =>
+      setFiles((prev) =>
+        prev.some((f) => f.file_id === file.file_id)
+          ? prev
+          : [...prev, file]
+      )
+    );
+
+    on("file_deleted", ({ file_id }) =>
+      setFiles((prev) => prev.filter((f) => f.file_id !== file_id))
+    );
+
+    on("file_status", ({ file_id, status }) =>
+      setFiles((prev) =>
+        prev.map((f) => (f.file_id === file_id ? { ...f, status } : f))
+      )
+    );
+
+    on("node_toggled", ({ node, is_online }) =>
+      setNodes((prev) =>
+        prev.map((n) => (n.name === node ? { ...n, is_online } : n))
+      )
+    );
 
-    const interval = setInterval(loadAll, 5000);
+    // The server dropped events for this client
+    on("resync", () => loadAll());
 
-    return () => clearInterval(interval);
+    return () => events.close();
 
   }, []);
 
@@ -0,0 +1,268 @@
+"""
+Chunk server: serves one storage root over HTTP/1.1 so a storage node
+can run as its own process (own cores, own GIL) or on another host.
+The API server talks to it through app.services.chunk_client; list it
+in NODE_ADDRESSES to use it. Run from dfs-lite/, one per node:
+
+    python -m app.chunk_server --root storage/node1 --port 7101
+    python -m app.chunk_server --root storage/node2 --port 7102
+    NODE_ADDRESSES=node1=127.0.0.1:7101,node2=127.0.0.1:7102 uvicorn app.main:app
+
+Protocol (paths are relative to the root):
+
+    PUT    /chunks/<path>                   store the body (atomic replace)
+    GET    /chunks/<path>[?codec=&sha256=]  stored bytes; decoded with codec,
+                                            422 if they do not match sha256
+    HEAD   /chunks/<path>                   X-Chunk-Size, -Mtime-Ns, -Inode
+    DELETE /chunks/<path>
+    POST   /hash/<path>[?codec=]            {"sha256": ...}
+    GET    /space                           {"free": ..., "total": ...}
+    POST   /probe                           {"steps": {...}, "free_ratio": ...}
+
+Missing files answer 404 and unreadable or damaged ones 422.
+"""
+
+import os
+import json
+import shutil
+import logging
+import argparse
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote, parse_qs
+
+from app.logging_config import configure_logging
+from app.services.chunk_files import (
+    ChunkCorrupt,
+    resolve,
+    write_file,
+    read_file,
+    read_decoded,
+    read_verified,
+    stat_key,
+    hash_stored,
+    probe_root
+)
+
+logger = logging.getLogger("app.chunk_server")
+
+
+class ChunkRequestHandler(BaseHTTPRequestHandler):
+
+    # Keep-alive: the client pools its connections
+    protocol_version = "HTTP/1.1"
+
+    def parse(self):
+        """
+        (route, chunk path or None, query params)
+        """
+
+        url = urlsplit(self.path)
+        route, _, rest = unquote(url.path).lstrip("/").partition("/")
+
+        params = {
+            key: values[-1]
+            for key, values in parse_qs(url.query).items()
+        }
+
+        chunk_path = resolve(self.server.root, rest) if rest else None
+
+        return route, chunk_path, params
+
+    def respond(self, status, body=b"", headers=None):
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def respond_json(self, value):
+
+        self.respond(
+            200,
+            json.dumps(value).encode(),
+            {"Content-Type": "application/json"}
+        )
+
+    def dispatch(self, handler):
+
+        try:
+            route, chunk_path, params = self.parse()
+
+            if not handler(route, chunk_path, params):
+                self.respond(404, b"Unknown route")
+
+        except FileNotFoundError as e:
+            self.respond(404, str(e).encode())
+
+        except ChunkCorrupt as e:
+            self.respond(422, str(e).encode())
+
+        except ValueError as e:
+            self.respond(400, str(e).encode())
+
+        except OSError as e:
+            logger.warning(
+                "Chunk request failed",
+                extra={"method": self.command, "path": self.path, "error": str(e)}
+            )
+            self.respond(500, str(e).encode())
+
+    # ------------- Methods -------------
+    def do_PUT(self):
+
+        # Read the body first so the connection stays usable on errors
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def put(route, chunk_path, params):
+
+            if route != "chunks" or chunk_path is None:
+                return False
+
+            write_file(self.server.root, chunk_path, data)
+            self.respond(204)
+            return True
+
+        self.dispatch(put)
+
+    def do_GET(self):
+
+        def get(route, chunk_path, params):
+
+            if route == "space" and chunk_path is None:
+                usage = shutil.disk_usage(self.server.root)
+                self.respond_json({"free": usage.free, "total": usage.total})
+                return True
+
+            if route != "chunks" or chunk_path is None:
+                return False
+
+            codec = params.get("codec")
+
+            if "sha256" in params:
+                data = read_verified(chunk_path, params["sha256"], codec)
+            elif codec is not None:
+                data = read_decoded(chunk_path, codec)
+            else:
+                data = read_file(chunk_path)
+
+            self.respond(200, data, {"Content-Type": "application/octet-stream"})
+            return True
+
+        self.dispatch(get)
+
+    def do_HEAD(self):
+
+        def head(route, chunk_path, params):
+
+            if route != "chunks" or chunk_path is None:
+                return False
+
+            size, mtime_ns, inode = stat_key(chunk_path)
+
+            self.respond(200, headers={
+                "X-Chunk-Size": str(size),
+                "X-Chunk-Mtime-Ns": str(mtime_ns),
+                "X-Chunk-Inode": str(inode)
+            })
+            return True
+
+        self.dispatch(head)
+
+    def do_DELETE(self):
+
+        def delete(route, chunk_path, params):
+
+            if route != "chunks" or chunk_path is None:
+                return False
+
+            os.remove(chunk_path)
+            self.respond(204)
+            return True
+
+        self.dispatch(delete)
+
+    def do_POST(self):
+
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def post(route, chunk_path, params):
+
+            if route == "hash" and chunk_path is not None:
+                self.respond_json({
+                    "sha256": hash_stored(chunk_path, params.get("codec"))
+                })
+                return True
+
+            if route == "probe" and chunk_path is None:
+                steps, free_ratio = probe_root(self.server.root)
+                self.respond_json({"steps": steps, "free_ratio": free_ratio})
+                return True
+
+            return False
+
+        self.dispatch(post)
+
+    def log_message(self, format, *args):
+
+        logger.debug("Chunk request", extra={"request": format % args})
+
+
+class ChunkServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, root):
+
+        self.root = os.path.abspath(root)
+
+        super().__init__(address, ChunkRequestHandler)
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app.chunk_server",
+        description="DFS Lite chunk server for one storage root"
+    )
+
+    parser.add_argument("--root", required=True, help="storage root to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+
+    configure_logging()
+
+    # Like initialize_nodes: the root exists from the start, and one
+    # that goes missing later fails writes and probes
+    os.makedirs(args.root, exist_ok=True)
+
+    server = ChunkServer((args.host, args.port), args.root)
+
+    logger.info(
+        "Chunk server started",
+        extra={"root": server.root, "address": f"{args.host}:{args.port}"}
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
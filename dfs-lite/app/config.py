@@ -1,5 +1,12 @@
 import os
 
+# dfs-lite project root (config.py -> app -> dfs-lite)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(
+        os.path.abspath(__file__)
+    )
+)
+
 class Settings:
     # Replication factor (how many replicas per chunk)
     REPLICATION_FACTOR = int(os.getenv("REPLICATION_FACTOR", 2))
@@ -11,5 +18,157 @@ class Settings:
         "storage/node3",
     ]
 
-settings = Settings()
+    # Root directory that holds one folder per storage node
+    STORAGE_DIR = os.getenv("STORAGE_DIR", os.path.join(BASE_DIR, "storage"))
+
+    # Storage nodes served by chunk server processes
+    # (python -m app.chunk_server), as "node1=host:port,node2=host:port".
+    # Nodes not listed are directories under STORAGE_DIR.
+    NODE_ADDRESSES = dict(
+        entry.strip().split("=", 1)
+        for entry in os.getenv("NODE_ADDRESSES", "").split(",")
+        if entry.strip()
+    )
+
+    # Chunk server client: idle keep-alive connections kept per
+    # node, and seconds a request may take
+    CHUNK_CLIENT_POOL_SIZE = int(os.getenv("CHUNK_CLIENT_POOL_SIZE", 8))
+    CHUNK_CLIENT_TIMEOUT = float(os.getenv("CHUNK_CLIENT_TIMEOUT", 30))
+
+    # Chunking for new uploads: "fixed" or "cdc" (content-defined).
+    # cdc scans about 10 MB/s per core in pure Python; install numpy
+    # for the vectorized scan (same cut points) before enabling it.
+    CHUNKER = os.getenv("CHUNKER", "fixed")
+
+    # Fixed chunk size (1 MB)
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1024 * 1024))
+
+    # Content-defined chunk size bounds
+    CDC_MIN_SIZE = int(os.getenv("CDC_MIN_SIZE", 256 * 1024))
+    CDC_AVG_SIZE = int(os.getenv("CDC_AVG_SIZE", 1024 * 1024))
+    CDC_MAX_SIZE = int(os.getenv("CDC_MAX_SIZE", 4 * 1024 * 1024))
+
+    # Chunk compression for new uploads: "none", "zlib" or "lzma"
+    # (or a registered codec). Chunks that save less than
+    # COMPRESSION_MIN_SAVINGS (fraction) are stored raw.
+    COMPRESSION = os.getenv("COMPRESSION", "none")
+    COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+    COMPRESSION_MIN_SAVINGS = float(os.getenv("COMPRESSION_MIN_SAVINGS", 0.1))
+
+    # Compression threads shared by all uploads (0: one per CPU)
+    COMPRESSION_WORKERS = int(os.getenv("COMPRESSION_WORKERS", 0))
+
+    # Hashing threads shared by uploads, the scrubber and repair
+    # (0: one per CPU; downloads verify on the node read pools);
+    # batches smaller than HASH_PARALLEL_MIN_BYTES are hashed on
+    # the calling thread
+    HASH_WORKERS = int(os.getenv("HASH_WORKERS", 0))
+    HASH_PARALLEL_MIN_BYTES = int(os.getenv("HASH_PARALLEL_MIN_BYTES", 256 * 1024))
+
+    # Bytes read from an upload at a time; several chunks per read
+    # are hashed in parallel
+    UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", 4 * 1024 * 1024))
+
+    # Default storage policy for new uploads: "replicated"
+    # (REPLICATION_FACTOR full copies) or "ec:<k>+<m>" (Reed-Solomon,
+    # k data + m parity shards on k+m distinct nodes). Uploads may
+    # pick their own with ?storage_policy=.
+    STORAGE_POLICY = os.getenv("STORAGE_POLICY", "replicated")
+
+    # Chunk file layout: "file" ({file_id}_chunk_{n}) or
+    # "content" (keyed by SHA-256, deduplicated across files)
+    CHUNK_STORE_MODE = os.getenv("CHUNK_STORE_MODE", "file")
+
+    # Seconds a successful replica hash check is trusted while the
+    # file's size, mtime and inode are unchanged
+    VERIFY_CACHE_TTL = float(os.getenv("VERIFY_CACHE_TTL", 300))
+
+    # Maximum replicas remembered by the verification cache
+    VERIFY_CACHE_MAX_ENTRIES = int(os.getenv("VERIFY_CACHE_MAX_ENTRIES", 100000))
+
+    # Scrubber: replicas per batch, disk read budget, and how old a
+    # verification must be before the replica is read again
+    SCRUB_BATCH_SIZE = int(os.getenv("SCRUB_BATCH_SIZE", 200))
+    SCRUB_MAX_BYTES_PER_SEC = int(os.getenv("SCRUB_MAX_BYTES_PER_SEC", 20 * 1024 * 1024))
+    SCRUB_REVERIFY_AFTER = float(os.getenv("SCRUB_REVERIFY_AFTER", 3600))
+    SCRUB_IDLE_SLEEP = float(os.getenv("SCRUB_IDLE_SLEEP", 10))
+
+    # Repair engine: worker threads and seconds between safety-net scans
+    REPAIR_WORKERS = int(os.getenv("REPAIR_WORKERS", 2))
+    REPAIR_SCAN_INTERVAL = float(os.getenv("REPAIR_SCAN_INTERVAL", 15))
 
+    # Under-replicated chunks a repair worker handles per transaction
+    REPAIR_BATCH_SIZE = int(os.getenv("REPAIR_BATCH_SIZE", 100))
+
+    # Seconds /cluster/health may be served from cache (events
+    # such as uploads, deletes and repairs drop it earlier)
+    HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", 2))
+
+    # Event stream (GET /events): seconds between keep-alive
+    # comments, and events buffered per client before it is
+    # told to resync
+    EVENT_STREAM_KEEPALIVE = float(os.getenv("EVENT_STREAM_KEEPALIVE", 15))
+    EVENT_STREAM_MAX_PENDING = int(os.getenv("EVENT_STREAM_MAX_PENDING", 1000))
+
+    # Seconds after the first event of a burst before cluster health
+    # is recomputed (once) and sent to event streams
+    CLUSTER_EVENT_DELAY = float(os.getenv("CLUSTER_EVENT_DELAY", 0.25))
+
+    # Seconds a node's free-space reading is reused by placement
+    PLACEMENT_STATS_TTL = float(os.getenv("PLACEMENT_STATS_TTL", 5))
+
+    # Downloads: chunks verified ahead of the one being sent,
+    # concurrent replica reads per node, and hedging (a second
+    # replica is read when the first is slower than this
+    # percentile of recent reads, bounded below by the minimum;
+    # the default applies until enough reads were seen)
+    DOWNLOAD_PREFETCH = int(os.getenv("DOWNLOAD_PREFETCH", 4))
+    READ_WORKERS_PER_NODE = int(os.getenv("READ_WORKERS_PER_NODE", 4))
+    DOWNLOAD_HEDGE_PERCENTILE = float(os.getenv("DOWNLOAD_HEDGE_PERCENTILE", 95))
+    DOWNLOAD_HEDGE_MIN_DELAY = float(os.getenv("DOWNLOAD_HEDGE_MIN_DELAY", 0.02))
+    DOWNLOAD_HEDGE_DEFAULT_DELAY = float(os.getenv("DOWNLOAD_HEDGE_DEFAULT_DELAY", 0.2))
+
+    # Concurrent replica writes per storage node
+    WRITE_WORKERS_PER_NODE = int(os.getenv("WRITE_WORKERS_PER_NODE", 4))
+
+    # Replicas that must be written before a chunk counts as stored
+    WRITE_QUORUM = int(os.getenv("WRITE_QUORUM", 2))
+
+    # Chunks of one upload that may be in flight at the same time
+    MAX_INFLIGHT_CHUNKS = int(os.getenv("MAX_INFLIGHT_CHUNKS", 8))
+
+    # Node monitor: seconds between probes of every storage root,
+    # and seconds a probe may take before it counts as failed
+    NODE_PROBE_INTERVAL = float(os.getenv("NODE_PROBE_INTERVAL", 5))
+    NODE_PROBE_TIMEOUT = float(os.getenv("NODE_PROBE_TIMEOUT", 2))
+
+    # Node health: probes in the error-rate window, EWMA weight of
+    # the newest probe latency, and the latency above which the
+    # score starts to drop
+    NODE_HEALTH_WINDOW = int(os.getenv("NODE_HEALTH_WINDOW", 12))
+    NODE_LATENCY_SMOOTHING = float(os.getenv("NODE_LATENCY_SMOOTHING", 0.3))
+    NODE_SLOW_PROBE_SECONDS = float(os.getenv("NODE_SLOW_PROBE_SECONDS", 0.25))
+
+    # Node states: SUSPECT below this score, DOWN after this many
+    # failed probes in a row, DRAINING (no new chunks) below this
+    # fraction of free space
+    NODE_SUSPECT_SCORE = float(os.getenv("NODE_SUSPECT_SCORE", 0.5))
+    NODE_DOWN_AFTER = int(os.getenv("NODE_DOWN_AFTER", 3))
+    NODE_DRAIN_FREE_RATIO = float(os.getenv("NODE_DRAIN_FREE_RATIO", 0.05))
+
+    # Lowest placement weight multiplier of a suspect node
+    NODE_MIN_PLACEMENT_FACTOR = float(os.getenv("NODE_MIN_PLACEMENT_FACTOR", 0.05))
+
+    # Upload sessions (POST /uploads): largest chunk size a client
+    # may pick, seconds without activity before a session is
+    # aborted, and seconds between checks for such sessions
+    UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", 64 * 1024 * 1024))
+    UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))
+    UPLOAD_SESSION_GC_INTERVAL = float(os.getenv("UPLOAD_SESSION_GC_INTERVAL", 300))
+
+    # Logging: level (DEBUG adds per-chunk lines) and format
+    # ("text" or "json", one object per line)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+settings = Settings()
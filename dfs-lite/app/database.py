@@ -1,10 +1,14 @@
 import os
+import time
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from dotenv import load_dotenv
 
+from app.services.metrics import DB_QUERY_SECONDS
+
 load_dotenv()
 
 # --------------------------------------------------
@@ -15,12 +19,94 @@ DATABASE_URL = os.getenv(
     "sqlite:///./data/dfs_lite.db"
 )
 
-print("DATABASE_URL =", DATABASE_URL)
+# --------------------------------------------------
+# Database mode
+# "production": WAL, tuned pragmas, pooled writer and
+#               read-only engines (default)
+# "basic":      a single engine with SQLite defaults
+# --------------------------------------------------
+DB_MODE = os.getenv("DB_MODE", "production")
+
+# Connections kept per engine, extra connections allowed
+# under load, and seconds to wait for a free connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+# Milliseconds a connection waits for a lock before failing
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 30000))
+
+# Bytes of the database file read through mmap
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# Page cache per connection (negative: KiB)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -16000))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (
+    DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+)
+
+
+def sqlite_pragmas(read_only):
+    """
+    Connection hook: WAL lets readers run alongside the single writer,
+    synchronous=NORMAL is durable with WAL and avoids an fsync per
+    commit, and busy_timeout makes a blocked writer wait instead of
+    failing with "database is locked".
+    """
+
+    def on_connect(dbapi_connection, connection_record):
+
+        cursor = dbapi_connection.cursor()
+
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+
+        cursor.close()
+
+    return on_connect
+
+
+def create_sqlite_engine(read_only=False):
+
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT / 1000
+        },
+        poolclass=QueuePool,
+        pool_size=DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+
+    event.listen(engine, "connect", sqlite_pragmas(read_only))
+
+    return engine
+
 
 # --------------------------------------------------
-# SQLite Engine
+# Engines
+# engine:      writes (and reads that lead to writes)
+# read_engine: read-only queries for API reads and
+#              background scans
 # --------------------------------------------------
-if DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE and DB_MODE == "production" and not IS_SQLITE_MEMORY:
+
+    engine = create_sqlite_engine()
+    read_engine = create_sqlite_engine(read_only=True)
+
+elif IS_SQLITE:
 
     engine = create_engine(
         DATABASE_URL,
@@ -28,13 +114,62 @@ if DATABASE_URL.startswith("sqlite"):
             "check_same_thread": False
         }
     )
+    read_engine = engine
 
 else:
 
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+    read_engine = engine
+
+# --------------------------------------------------
+# Statement timings (dfs_db_query_seconds)
+# Labelled by engine and statement kind (SELECT, INSERT,
+# UPDATE, ...) so the label set stays small.
+# --------------------------------------------------
+def time_statements(engine, engine_name):
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+
+        started = conn.info["query_started"].pop()
+
+        DB_QUERY_SECONDS.observe(
+            time.perf_counter() - started,
+            engine=engine_name,
+            statement=statement.lstrip().split(None, 1)[0].upper()
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+
+        # after_cursor_execute never runs for a failed statement
+        if context.connection is None:
+            return
+
+        started = context.connection.info.get("query_started")
+
+        if started:
+            started.pop()
+
+
+time_statements(engine, "write")
+
+if read_engine is not engine:
+    time_statements(read_engine, "read")
 
 # --------------------------------------------------
-# Session Factory
+# Session Factories
 # --------------------------------------------------
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -42,6 +177,12 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
 # --------------------------------------------------
 # Base Model
 # --------------------------------------------------
@@ -59,3 +200,14 @@ def get_db():
 
     finally:
         db.close()
+
+
+def get_read_db():
+
+    db = ReadSessionLocal()
+
+    try:
+        yield db
+
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+import json
+import logging
+
+from app.config import settings
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+def _fields(record):
+
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in _STANDARD_ATTRS
+    }
+
+
+# --------------------------------------------------
+# Formatters
+# Context goes in through extra={...}:
+#   logger.info("Replica restored", extra={"chunk_path": path})
+# text: 2026-01-01 12:00:00 INFO app.services.repair Replica restored chunk_path=...
+# json: one object per line with the same fields
+# --------------------------------------------------
+class TextFormatter(logging.Formatter):
+
+    def __init__(self):
+
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+
+        line = super().format(record)
+
+        fields = _fields(record)
+
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        entry.update(_fields(record))
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+
+    handler = logging.StreamHandler()
+
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter())
+
+    logger = logging.getLogger("app")
+    logger.handlers[:] = [handler]
+    logger.setLevel(settings.LOG_LEVEL.upper())
+
+    # uvicorn configures its own loggers; leave the root alone
+    logger.propagate = False
@@ -1,22 +1,37 @@
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import threading
-from app.services.healer import start_healer
-from app.database import engine, Base
+from app.config import settings
+from app.database import DATABASE_URL
+from app.logging_config import configure_logging
+from app.migrations import migrate
 from app.models.file import File
 from app.models.chunk import Chunk
 from app.models.node import Node
+from app.models.replica import ChunkReplica
+from app.models.upload_session import UploadSession, UploadChunk
 
 from app.routes.files import router as file_router
 from app.routes.nodes import router as node_router
 from app.routes.cluster import router as cluster_router
+from app.routes.events import router as events_router
+from app.routes.metrics import router as metrics_router
+from app.routes.uploads import router as uploads_router
 
-from app.services.repair import repair_daemon
+from app.services.repair import start_repair_engine
 from app.services.node_manager import initialize_nodes
+from app.services.chunk_store import sync_replica_refs
+from app.services.scrubber import start_scrubber
+from app.services.node_monitor import start_node_monitor
+from app.services.upload_sessions import start_session_collector
+
+
+configure_logging()
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="DFS Lite")
-start_healer()
 
 # -----------------------------
 # Enable CORS for Frontend
@@ -27,13 +42,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],
 )
 
 
 # -----------------------------
-# Create Tables
+# Create / Upgrade Tables
 # -----------------------------
-Base.metadata.create_all(bind=engine)
+logger.info(
+    "Starting",
+    extra={"database_url": DATABASE_URL, "storage_dir": settings.STORAGE_DIR}
+)
+
+migrate()
 
 
 # -----------------------------
@@ -42,6 +63,9 @@ Base.metadata.create_all(bind=engine)
 app.include_router(file_router)
 app.include_router(node_router)
 app.include_router(cluster_router)
+app.include_router(events_router)
+app.include_router(metrics_router)
+app.include_router(uploads_router)
 
 
 # -----------------------------
@@ -61,7 +85,18 @@ def start_background_services():
     # Initialize storage nodes in DB
     initialize_nodes()
 
-    # Start background repair daemon
-    thread = threading.Thread(target=repair_daemon, daemon=True)
-    thread.start()
+    # Refcount chunks stored before deduplication existed
+    sync_replica_refs()
+
+    # Start repair engine (task queue, workers, safety-net scan)
+    start_repair_engine()
+
+    # Probe storage roots; marks nodes suspect, draining or down
+    start_node_monitor()
+
+    # Start background scrubber (feeds the repair engine)
+    start_scrubber()
+
+    # Abort upload sessions abandoned for UPLOAD_SESSION_TTL
+    start_session_collector()
 
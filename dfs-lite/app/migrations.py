@@ -0,0 +1,185 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.database import engine, Base
+from app.models.file import File
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# Metadata schema revisions
+# 1: tables and columns as created by create_all
+# 2: indexes for hot lookups (chunks by file/index,
+#    hash and path; files by status; replicas by node)
+# 3: file listing indexes (created_at/id keyset order,
+#    owner filter)
+# 4: per-chunk compression codec (chunks, chunk_replicas)
+# 5: erasure coding (files.storage_policy, chunks.shard_index)
+# 6: node health (nodes.state, health_score, checked_at)
+# --------------------------------------------------
+SCHEMA_REVISION = 6
+
+
+def ensure_revision_table(conn):
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_revision (revision INTEGER NOT NULL)"
+    ))
+
+
+def get_revision(conn):
+
+    ensure_revision_table(conn)
+
+    revision = conn.execute(text(
+        "SELECT MAX(revision) FROM schema_revision"
+    )).scalar()
+
+    return revision or 0
+
+
+def set_revision(conn, revision):
+
+    ensure_revision_table(conn)
+
+    conn.execute(text("DELETE FROM schema_revision"))
+    conn.execute(
+        text("INSERT INTO schema_revision (revision) VALUES (:revision)"),
+        {"revision": revision}
+    )
+
+
+# --------------------------------------------------
+# Add columns introduced after a table was created
+# (create_all only creates missing tables)
+# --------------------------------------------------
+def add_missing_columns(conn):
+
+    inspector = inspect(conn)
+
+    for table in Base.metadata.sorted_tables:
+
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {
+            column["name"]
+            for column in inspector.get_columns(table.name)
+        }
+
+        for column in table.columns:
+
+            if column.name in existing:
+                continue
+
+            column_type = column.type.compile(dialect=conn.dialect)
+
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            ))
+
+            logger.info(
+                "Added column",
+                extra={"table": table.name, "column": column.name}
+            )
+
+
+def create_missing_indexes(conn):
+    """
+    create_all() only creates indexes together with new tables,
+    so indexes added to existing tables are created here.
+    """
+
+    inspector = inspect(conn)
+
+    for table in Base.metadata.sorted_tables:
+
+        existing = {
+            index["name"]
+            for index in inspector.get_indexes(table.name)
+        }
+
+        for index in table.indexes:
+
+            if index.name in existing:
+                continue
+
+            index.create(bind=conn)
+
+            logger.info("Created index", extra={"index": index.name})
+
+
+# --------------------------------------------------
+# Upgrade steps (revision -> function)
+# --------------------------------------------------
+def upgrade_to_1(conn):
+
+    add_missing_columns(conn)
+
+
+def upgrade_to_2(conn):
+
+    create_missing_indexes(conn)
+
+
+def upgrade_to_3(conn):
+
+    create_missing_indexes(conn)
+
+
+def upgrade_to_4(conn):
+
+    add_missing_columns(conn)
+
+
+def upgrade_to_5(conn):
+
+    add_missing_columns(conn)
+
+
+def upgrade_to_6(conn):
+
+    add_missing_columns(conn)
+
+
+UPGRADES = {
+    1: upgrade_to_1,
+    2: upgrade_to_2,
+    3: upgrade_to_3,
+    4: upgrade_to_4,
+    5: upgrade_to_5,
+    6: upgrade_to_6,
+}
+
+
+# --------------------------------------------------
+# Bring the database up to SCHEMA_REVISION in place
+# --------------------------------------------------
+def migrate():
+
+    fresh = not inspect(engine).has_table(File.__tablename__)
+
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+
+        # create_all() built a new database at the latest revision
+        if fresh:
+            set_revision(conn, SCHEMA_REVISION)
+
+        revision = get_revision(conn)
+
+    if revision > SCHEMA_REVISION:
+        raise RuntimeError(
+            f"Database schema revision {revision} is newer than "
+            f"this build ({SCHEMA_REVISION})"
+        )
+
+    for target in range(revision + 1, SCHEMA_REVISION + 1):
+
+        with engine.begin() as conn:
+            UPGRADES[target](conn)
+            set_revision(conn, target)
+
+        logger.info("Schema upgraded", extra={"revision": target})
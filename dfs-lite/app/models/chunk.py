@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -11,6 +11,14 @@ class Chunk(Base):
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(UUID(as_uuid=True), ForeignKey("files.id"))
     chunk_index = Column(Integer, nullable=False)
-    chunk_hash = Column(String, nullable=False)
-    chunk_path = Column(String, nullable=False)
+    chunk_hash = Column(String, nullable=False, index=True)
+    chunk_path = Column(String, nullable=False, index=True)
+    chunk_size = Column(Integer)  # bytes; NULL for chunks stored before CDC
+    codec = Column(String)  # compression of the stored bytes; NULL = raw
+    shard_index = Column(Integer)  # erasure-coded shard; NULL = full replica
+
+    __table_args__ = (
+        # Every read of a file's chunks filters on file_id, ordered by index
+        Index("ix_chunks_file_id_chunk_index", "file_id", "chunk_index"),
+    )
 
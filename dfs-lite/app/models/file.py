@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, BigInteger, Integer, TIMESTAMP
+from sqlalchemy import Column, String, BigInteger, Integer, TIMESTAMP, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -11,9 +11,16 @@ class File(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String, nullable=False)
-    owner = Column(String, nullable=False)
+    owner = Column(String, nullable=False, index=True)
     total_size = Column(BigInteger, nullable=False)
     total_chunks = Column(Integer, nullable=False)
-    status = Column(String, default="HEALTHY")  # NEW FIELD
+    status = Column(String, default="HEALTHY", index=True)
+    chunker = Column(String)  # e.g. "fixed:1048576" or "cdc:min:avg:max"
+    storage_policy = Column(String)  # "replicated" or "ec:k+m"; NULL = replicated
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Keyset pagination order of GET /files
+        Index("ix_files_created_at_id", "created_at", "id"),
+    )
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime
 from app.database import Base
 
 
@@ -8,5 +8,10 @@ class Node(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
     path = Column(String, unique=True, nullable=False)
-    is_online = Column(Boolean, default=True)
+    is_online = Column(Boolean, default=True)  # operator switch (toggle)
+
+    # Set by the node monitor
+    state = Column(String, default="UP")  # UP, SUSPECT, DRAINING or DOWN
+    health_score = Column(Float)
+    checked_at = Column(DateTime)  # last probe (UTC)
 
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.database import Base
+
+
+class ChunkReplica(Base):
+    __tablename__ = "chunk_replicas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chunk_path = Column(String, unique=True, nullable=False)
+    chunk_hash = Column(String, nullable=False, index=True)
+    node_name = Column(String, nullable=False, index=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    codec = Column(String)  # compression of the stored bytes; NULL = raw
+    verified_at = Column(DateTime, index=True)  # last successful scrub (UTC)
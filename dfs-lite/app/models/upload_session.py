@@ -0,0 +1,38 @@
+from sqlalchemy import Column, String, BigInteger, Integer, DateTime, TIMESTAMP, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)  # becomes the file id
+    filename = Column(String, nullable=False)
+    owner = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+    storage_policy = Column(String, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime, nullable=False, index=True)  # last activity (UTC)
+
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+
+    # Same shape as Chunk: one row per replica or shard
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("upload_sessions.id"))
+    chunk_index = Column(Integer, nullable=False)
+    chunk_hash = Column(String, nullable=False)
+    chunk_path = Column(String, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    codec = Column(String)
+    shard_index = Column(Integer)
+    content_hash = Column(String, nullable=False)  # SHA-256 the client sent for the chunk
+
+    __table_args__ = (
+        Index("ix_upload_chunks_session_id_chunk_index", "session_id", "chunk_index"),
+    )
@@ -0,0 +1,69 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.cluster_stats import get_cluster_health
+from app.services.events import EventStream, format_sse
+
+router = APIRouter(tags=["Events"])
+
+
+# --------------------------------------------------
+# Server-sent events
+# GET /events
+#
+# Sends the current cluster health first, then one SSE
+# event per change (file_uploaded, file_deleted,
+# file_status, node_toggled, replica_restored,
+# chunks_replicated, repair_scan). After each burst of
+# changes a "cluster" event carries the new health
+# numbers, computed once for all clients (see
+# cluster_stats.broadcast_health).
+# "resync" asks the client to reload everything.
+# --------------------------------------------------
+@router.get("/events")
+async def event_stream(request: Request):
+
+    stream = EventStream(
+        asyncio.get_running_loop(),
+        settings.EVENT_STREAM_MAX_PENDING
+    )
+
+    async def generate():
+
+        with stream:
+
+            health = await run_in_threadpool(get_cluster_health)
+            yield format_sse("cluster", health)
+
+            while True:
+
+                try:
+                    event = await stream.get(settings.EVENT_STREAM_KEEPALIVE)
+
+                except asyncio.TimeoutError:
+
+                    if await request.is_disconnected():
+                        return
+
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+
+                # Everything that arrived meanwhile goes out as one burst
+                for event in [event] + stream.drain():
+
+                    data = {k: v for k, v in event.items() if k != "type"}
+                    yield format_sse(event["type"], data)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
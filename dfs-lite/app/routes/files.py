@@ -1,45 +1,173 @@
 from uuid import UUID
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from uuid import uuid4, UUID
+from typing import Optional
 import os
-import hashlib
+import logging
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.models.file import File as FileModel
 from app.models.chunk import Chunk
-from app.services.storage import save_file_in_chunks
+from app.services.storage import save_stream_in_chunks
+from app.services.multipart_stream import MultipartFileStream
+from app.services.chunker import make_chunker
+from app.services.erasure import parse_storage_policy
+from app.services.download import (
+    ChunkStreamResponse,
+    RangeNotSatisfiable,
+    parse_range,
+    plan_chunks
+)
+from app.services.chunk_store import (
+    acquire_refs,
+    new_refs,
+    delete_file_chunks,
+    discard_unrecorded,
+    remove_chunk_files
+)
+from app.services.events import publish
+from app.services.catalog import (
+    InvalidCursor,
+    file_summary,
+    list_etag,
+    list_files_page
+)
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 STORAGE_PATH = "storage"
 
 
 # --------------------------------------------------
 # Upload Endpoint
 # --------------------------------------------------
-@router.post("/upload")
+@router.post(
+    "/upload",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "uploaded_file": {
+                                "type": "string",
+                                "format": "binary"
+                            }
+                        },
+                        "required": ["uploaded_file"]
+                    }
+                }
+            }
+        }
+    }
+)
 async def upload_file(
     owner: str,
-    uploaded_file: UploadFile = File(...),
+    request: Request,
+    storage_policy: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
 
     file_id = uuid4()
 
-    total_size, total_chunks, chunk_metadata = save_file_in_chunks(
-        uploaded_file.file,
-        file_id
+    try:
+        code = parse_storage_policy(storage_policy or settings.STORAGE_POLICY)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    storage_policy = code.spec if code is not None else "replicated"
+
+    try:
+        uploaded_file = MultipartFileStream(request, "uploaded_file")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunker = make_chunker()
+
+    # Multipart bytes are chunked and replicated as they arrive
+    total_size, total_chunks, chunk_metadata = await save_stream_in_chunks(
+        uploaded_file,
+        file_id,
+        chunker,
+        code
     )
 
+    # The replicas are written; without committed rows they
+    # (and the references pinned on reused copies) are undone
+    try:
+
+        if uploaded_file.filename is None:
+            raise HTTPException(status_code=400, detail="uploaded_file is required")
+
+        new_file = await run_in_threadpool(
+            store_file_metadata,
+            db,
+            file_id,
+            uploaded_file.filename,
+            owner,
+            total_size,
+            total_chunks,
+            chunk_metadata,
+            chunker.spec,
+            storage_policy
+        )
+
+    except HTTPException:
+        await run_in_threadpool(discard_unrecorded, chunk_metadata)
+        raise
+
+    except Exception as e:
+
+        logger.exception(
+            "Storing file metadata failed",
+            extra={"file_id": str(file_id), "error": str(e)}
+        )
+
+        await run_in_threadpool(db.rollback)
+        await run_in_threadpool(discard_unrecorded, chunk_metadata)
+
+        raise HTTPException(status_code=503, detail="Could not store file metadata")
+
+    publish("file_uploaded", file=file_summary(new_file))
+
+    return {
+        "file_id": str(file_id),
+        "filename": uploaded_file.filename,
+        "size": total_size,
+        "chunks": total_chunks,
+        "status": new_file.status
+    }
+
+
+def store_file_metadata(
+    db,
+    file_id,
+    filename,
+    owner,
+    total_size,
+    total_chunks,
+    chunk_metadata,
+    chunker_spec,
+    storage_policy="replicated"
+):
+
     new_file = FileModel(
         id=file_id,
-        filename=uploaded_file.filename,
+        filename=filename,
         owner=owner,
         total_size=total_size,
         total_chunks=total_chunks,
-        status="HEALTHY"
+        status="HEALTHY",
+        chunker=chunker_spec,
+        storage_policy=storage_policy
     )
 
     db.add(new_file)
@@ -51,49 +179,65 @@ async def upload_file(
                 file_id=file_id,
                 chunk_index=chunk["chunk_index"],
                 chunk_hash=chunk["chunk_hash"],
-                chunk_path=path
+                chunk_path=path,
+                chunk_size=chunk["chunk_size"],
+                codec=chunk["codec"],
+                shard_index=chunk["shard_index"]
             )
             db.add(new_chunk)
 
+    acquire_refs(db, new_refs(chunk_metadata))
+
     db.commit()
     db.refresh(new_file)
 
-    return {
-        "file_id": str(file_id),
-        "filename": uploaded_file.filename,
-        "size": total_size,
-        "chunks": total_chunks,
-        "status": new_file.status
-    }
+    return new_file
 
 
 # --------------------------------------------------
-# List All Files
+# List Files
+# Keyset-paginated (oldest first); the next page's cursor
+# is returned in X-Next-Cursor and a Link header.
+# Unchanged pages answer If-None-Match with 304 (the page
+# is still read, but not sent).
 # --------------------------------------------------
 @router.get("/files")
-def list_files(db: Session = Depends(get_db)):
-
-    files = db.query(FileModel).all()
-
-    return [
-        {
-            "file_id": str(file.id),
-            "filename": file.filename,
-            "owner": file.owner,
-            "size": file.total_size,
-            "chunks": file.total_chunks,
-            "status": file.status,
-            "created_at": file.created_at
-        }
-        for file in files
-    ]
+def list_files(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    owner: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+
+    try:
+        rows, next_cursor = list_files_page(db, limit, cursor, owner, status)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    entries = [file_summary(row) for row in rows]
+    etag = list_etag(entries, next_cursor)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    return entries
 
 
 # --------------------------------------------------
 # Get Single File Metadata
 # --------------------------------------------------
 @router.get("/files/{file_id}")
-def get_file_metadata(file_id: str, db: Session = Depends(get_db)):
+def get_file_metadata(file_id: str, db: Session = Depends(get_read_db)):
 
     try:
         file_uuid = UUID(file_id)
@@ -118,11 +262,16 @@ def get_file_metadata(file_id: str, db: Session = Depends(get_db)):
         "owner": file.owner,
         "size": file.total_size,
         "status": file.status,
+        "chunker": file.chunker,
+        "storage_policy": file.storage_policy or "replicated",
         "chunks": [
             {
                 "chunk_index": c.chunk_index,
                 "chunk_hash": c.chunk_hash,
-                "chunk_path": c.chunk_path
+                "chunk_path": c.chunk_path,
+                "chunk_size": c.chunk_size,
+                "codec": c.codec,
+                "shard_index": c.shard_index
             }
             for c in chunks
         ]
@@ -131,9 +280,10 @@ def get_file_metadata(file_id: str, db: Session = Depends(get_db)):
 
 # --------------------------------------------------
 # Download Endpoint (Integrity + Self-Healing + Status Tracking)
+# Supports single-range requests (Range: bytes=start-end)
 # --------------------------------------------------
 @router.get("/download/{file_id}")
-def download_file(file_id: str, db: Session = Depends(get_db)):
+def download_file(file_id: str, request: Request, db: Session = Depends(get_read_db)):
 
     try:
         file_uuid = UUID(file_id)
@@ -155,84 +305,20 @@ def download_file(file_id: str, db: Session = Depends(get_db)):
     if not chunks:
         raise HTTPException(status_code=404, detail="No chunks found")
 
-    def file_generator():
-
-        from collections import defaultdict
-
-        chunk_groups = defaultdict(list)
-        repaired_any = False
-
-        # Group replicas by chunk index
-        for c in chunks:
-            chunk_groups[c.chunk_index].append(c)
-
-        # Process each chunk
-        for chunk_index in sorted(chunk_groups.keys()):
-
-            replicas = chunk_groups[chunk_index]
-            valid_data = None
-            valid_hash = None
-
-            # ---------- First pass: find healthy replica ----------
-            for replica in replicas:
-
-                if not os.path.exists(replica.chunk_path):
-                    continue
-
-                with open(replica.chunk_path, "rb") as f:
-                    data = f.read()
-
-                computed_hash = hashlib.sha256(data).hexdigest()
-
-                if computed_hash == replica.chunk_hash:
-                    valid_data = data
-                    valid_hash = computed_hash
-                    break
+    plans = plan_chunks(file_entry, chunks)
 
-            # If no valid replica found → file is DEAD
-            if not valid_data:
-                file_entry.status = "DEAD"
-                db.commit()
-
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"All replicas corrupted for chunk {chunk_index}"
-                )
-
-            # ---------- Second pass: repair corrupted replicas ----------
-            for replica in replicas:
-
-                if not os.path.exists(replica.chunk_path):
-                    continue
-
-                with open(replica.chunk_path, "rb") as f:
-                    data = f.read()
-
-                computed_hash = hashlib.sha256(data).hexdigest()
-
-                if computed_hash != valid_hash:
-                    with open(replica.chunk_path, "wb") as f:
-                        f.write(valid_data)
-
-                    repaired_any = True
-
-            yield valid_data
-
-        # After processing all chunks → update health state
-        if repaired_any:
-            file_entry.status = "DEGRADED"
-        else:
-            file_entry.status = "HEALTHY"
-
-        db.commit()
+    try:
+        byte_range = parse_range(
+            request.headers.get("range"),
+            file_entry.total_size
+        )
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416,
+            headers={"Content-Range": f"bytes */{file_entry.total_size}"}
+        )
 
-    return StreamingResponse(
-        file_generator(),
-        media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f"attachment; filename={file_entry.filename}"
-        },
-    )
+    return ChunkStreamResponse(file_entry, plans, byte_range)
 
 from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
@@ -265,27 +351,20 @@ def delete_file(file_id: str, db: Session = Depends(get_db)):
             detail="File not found"
         )
 
-    # Find all chunks
-    chunks = db.query(Chunk).filter(
-        Chunk.file_id == file_uuid
-    ).all()
-
-    # Delete physical chunk files
-    for chunk in chunks:
-
-        if os.path.exists(chunk.chunk_path):
-            os.remove(chunk.chunk_path)
-
-    # Delete chunk metadata
-    db.query(Chunk).filter(
-        Chunk.file_id == file_uuid
-    ).delete()
+    # Delete chunk metadata and drop this file's references;
+    # shared chunks stay on disk
+    unreferenced = delete_file_chunks(db, [file_uuid])
 
     # Delete file metadata
     db.delete(file)
 
     db.commit()
 
+    # Delete physical chunk files nothing refers to anymore
+    remove_chunk_files(unreferenced)
+
+    publish("file_deleted", file_id=file_id)
+
     return {
         "message": "File deleted successfully",
         "file_id": file_id
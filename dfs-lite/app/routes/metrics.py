@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import render
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+
+    return PlainTextResponse(
+        render(),
+        media_type="text/plain; version=0.0.4"
+    )
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.node import Node
+from app.services.repair import report_node_change
+from app.services.events import publish
 
 router = APIRouter(prefix="/nodes", tags=["Nodes"])
 
@@ -12,7 +14,7 @@ router = APIRouter(prefix="/nodes", tags=["Nodes"])
 # GET /nodes
 # -----------------------------------------
 @router.get("")
-def list_nodes(db: Session = Depends(get_db)):
+def list_nodes(db: Session = Depends(get_read_db)):
     nodes = db.query(Node).order_by(Node.name).all()
 
 
@@ -21,6 +23,9 @@ def list_nodes(db: Session = Depends(get_db)):
             "name": node.name,
             "path": node.path,
             "is_online": node.is_online,
+            "state": node.state,
+            "health_score": node.health_score,
+            "checked_at": node.checked_at,
         }
         for node in nodes
     ]
@@ -41,6 +46,11 @@ def toggle_node(node_name: str, db: Session = Depends(get_db)):
     node.is_online = not node.is_online
     db.commit()
 
+    publish("node_toggled", node=node.name, is_online=node.is_online)
+
+    # Re-check replication of everything stored on this node
+    report_node_change(node.name)
+
     return {
         "message": "Node toggled successfully",
         "node": node.name,
@@ -0,0 +1,269 @@
+from uuid import UUID
+from typing import List, Optional
+
+from fastapi import APIRouter, Request, Depends, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.services.erasure import parse_storage_policy
+from app.services.events import publish
+from app.services.catalog import file_summary
+from app.services.upload_sessions import (
+    UploadSessionNotFound,
+    InvalidChunk,
+    ChunkConflict,
+    IncompleteUpload,
+    create_session,
+    get_session,
+    received_chunks,
+    expires_at,
+    store_chunk,
+    apply_manifest,
+    commit_session,
+    abort_session
+)
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+
+def parse_upload_id(upload_id):
+
+    try:
+        return UUID(upload_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid upload_id format"
+        )
+
+
+def session_not_found():
+
+    return HTTPException(
+        status_code=404,
+        detail="Upload session not found"
+    )
+
+
+# -----------------------------------------
+# START AN UPLOAD SESSION
+# POST /uploads?owner=&filename=&size=
+# -----------------------------------------
+@router.post("")
+def initiate_upload(
+    owner: str,
+    filename: str,
+    size: int,
+    chunk_size: Optional[int] = None,
+    storage_policy: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+
+    try:
+        code = parse_storage_policy(storage_policy or settings.STORAGE_POLICY)
+
+        session = create_session(
+            db,
+            filename,
+            owner,
+            size,
+            chunk_size or settings.CHUNK_SIZE,
+            code
+        )
+
+    except (ValueError, InvalidChunk) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "upload_id": str(session.id),
+        "chunk_size": session.chunk_size,
+        "total_chunks": session.total_chunks,
+        "storage_policy": session.storage_policy,
+        "expires_at": expires_at(session)
+    }
+
+
+# -----------------------------------------
+# UPLOAD ONE CHUNK (any order, in parallel)
+# PUT /uploads/{upload_id}/chunks/{chunk_index}?sha256=
+# Body: the chunk's raw bytes
+# -----------------------------------------
+@router.put("/{upload_id}/chunks/{chunk_index}")
+async def upload_chunk(
+    upload_id: str,
+    chunk_index: int,
+    sha256: str,
+    request: Request
+):
+
+    session_id = parse_upload_id(upload_id)
+
+    parts = []
+    received = 0
+
+    async for data in request.stream():
+
+        received += len(data)
+
+        if received > settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+
+        parts.append(data)
+
+    try:
+        stored = await run_in_threadpool(
+            store_chunk,
+            session_id,
+            chunk_index,
+            b"".join(parts),
+            sha256
+        )
+
+    except UploadSessionNotFound:
+        raise session_not_found()
+
+    except InvalidChunk as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except ChunkConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {
+        "upload_id": upload_id,
+        "chunk_index": chunk_index,
+        "stored": stored
+    }
+
+
+# -----------------------------------------
+# DEDUP NEGOTIATION
+# POST /uploads/{upload_id}/manifest
+# Body: {"start": 0, "chunks": ["<sha256 of chunk 0>", ...]}
+# Chunks the cluster already has are added to the session;
+# the response lists the indexes that still need a PUT.
+# Large files can send their manifest in several parts.
+# -----------------------------------------
+class ChunkManifest(BaseModel):
+
+    start: int = 0
+    chunks: List[str]
+
+
+@router.post("/{upload_id}/manifest")
+def negotiate_chunks(upload_id: str, manifest: ChunkManifest):
+
+    session_id = parse_upload_id(upload_id)
+
+    try:
+        missing = apply_manifest(
+            session_id,
+            {
+                manifest.start + offset: chunk_hash
+                for offset, chunk_hash in enumerate(manifest.chunks)
+            }
+        )
+
+    except UploadSessionNotFound:
+        raise session_not_found()
+
+    except InvalidChunk as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except ChunkConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {
+        "upload_id": upload_id,
+        "reused_chunks": len(manifest.chunks) - len(missing),
+        "missing_chunks": missing
+    }
+
+
+# -----------------------------------------
+# SESSION PROGRESS (what is left to resume)
+# GET /uploads/{upload_id}
+# -----------------------------------------
+@router.get("/{upload_id}")
+def upload_status(upload_id: str, db: Session = Depends(get_read_db)):
+
+    session_id = parse_upload_id(upload_id)
+
+    try:
+        session = get_session(db, session_id)
+    except UploadSessionNotFound:
+        raise session_not_found()
+
+    received = received_chunks(db, session_id)
+
+    return {
+        "upload_id": upload_id,
+        "filename": session.filename,
+        "owner": session.owner,
+        "size": session.total_size,
+        "chunk_size": session.chunk_size,
+        "total_chunks": session.total_chunks,
+        "storage_policy": session.storage_policy,
+        "received_chunks": len(received),
+        "missing_chunks": [
+            i for i in range(session.total_chunks) if i not in received
+        ],
+        "expires_at": expires_at(session)
+    }
+
+
+# -----------------------------------------
+# COMMIT: turn the chunks into a file
+# POST /uploads/{upload_id}/commit
+# -----------------------------------------
+@router.post("/{upload_id}/commit")
+def commit_upload(upload_id: str):
+
+    session_id = parse_upload_id(upload_id)
+
+    try:
+        new_file = commit_session(session_id)
+
+    except UploadSessionNotFound:
+        raise session_not_found()
+
+    except IncompleteUpload as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "missing_chunks": e.missing}
+        )
+
+    except InvalidChunk as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    publish("file_uploaded", file=file_summary(new_file))
+
+    return {
+        "file_id": str(new_file.id),
+        "filename": new_file.filename,
+        "size": new_file.total_size,
+        "chunks": new_file.total_chunks,
+        "status": new_file.status
+    }
+
+
+# -----------------------------------------
+# ABORT: drop the session and its chunks
+# DELETE /uploads/{upload_id}
+# -----------------------------------------
+@router.delete("/{upload_id}")
+def abort_upload(upload_id: str):
+
+    session_id = parse_upload_id(upload_id)
+
+    try:
+        abort_session(session_id)
+    except UploadSessionNotFound:
+        raise session_not_found()
+
+    return {
+        "message": "Upload aborted",
+        "upload_id": upload_id
+    }
@@ -0,0 +1,138 @@
+import json
+import uuid
+import base64
+import hashlib
+
+from datetime import datetime
+
+from sqlalchemy import String, and_, or_, type_coerce
+from sqlalchemy.orm import Session
+
+from app.models.file import File
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+# --------------------------------------------------
+# Page ETag
+# Hashed from the page as read from the database (its
+# entries and the next cursor), so it is the same in
+# every API process and changes exactly when the
+# response would.
+# --------------------------------------------------
+def list_etag(entries, next_cursor):
+
+    key = json.dumps([entries, next_cursor], default=str)
+
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+# --------------------------------------------------
+# Keyset cursor: opaque (created_at, id) of the last
+# row of the previous page
+# --------------------------------------------------
+def encode_cursor(created_key, file_id):
+
+    if isinstance(created_key, datetime):
+        created_key = created_key.isoformat()
+
+    raw = json.dumps([created_key, str(file_id)])
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, raw_timestamps):
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_key, file_id = json.loads(base64.urlsafe_b64decode(padded))
+
+        if not raw_timestamps:
+            created_key = datetime.fromisoformat(created_key)
+
+        return created_key, uuid.UUID(file_id)
+
+    except (ValueError, TypeError):
+        raise InvalidCursor()
+
+
+# --------------------------------------------------
+# One page of files, oldest first. Columns only, no
+# ORM objects. Returns (rows, next_cursor or None).
+# --------------------------------------------------
+LIST_COLUMNS = (
+    File.id,
+    File.filename,
+    File.owner,
+    File.total_size,
+    File.total_chunks,
+    File.status,
+    File.created_at,
+)
+
+
+def created_key(db: Session):
+
+    # SQLite keeps server-default timestamps as text without
+    # microseconds; compare the stored text so a cursor matches
+    # the row it came from
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(File.created_at, String), True
+
+    return File.created_at, False
+
+
+def list_files_page(db: Session, limit, cursor=None, owner=None, status=None):
+
+    key, raw_timestamps = created_key(db)
+
+    query = db.query(*LIST_COLUMNS, key.label("created_key"))
+
+    if owner is not None:
+        query = query.filter(File.owner == owner)
+
+    if status is not None:
+        query = query.filter(File.status == status)
+
+    if cursor is not None:
+
+        last_key, last_id = decode_cursor(cursor, raw_timestamps)
+
+        query = query.filter(or_(
+            key > last_key,
+            and_(key == last_key, File.id > last_id)
+        ))
+
+    # One extra row tells whether another page exists
+    rows = (
+        query
+        .order_by(File.created_at, File.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+
+    return rows, encode_cursor(last.created_key, last.id)
+
+
+def file_summary(row):
+    """
+    One GET /files entry, from a File or a LIST_COLUMNS row.
+    """
+
+    return {
+        "file_id": str(row.id),
+        "filename": row.filename,
+        "owner": row.owner,
+        "size": row.total_size,
+        "chunks": row.total_chunks,
+        "status": row.status,
+        "created_at": row.created_at
+    }
@@ -0,0 +1,196 @@
+import json
+import queue
+import threading
+import http.client
+
+from urllib.parse import quote, urlencode
+
+from app.config import settings
+from app.services.chunk_files import ChunkCorrupt
+
+
+# --------------------------------------------------
+# Client for one chunk server (python -m app.chunk_server)
+# Keeps up to CHUNK_CLIENT_POOL_SIZE idle keep-alive
+# connections; busy callers open extra ones. A request on
+# a reused connection the server already closed is sent
+# once more on a fresh one (every call is idempotent).
+# Errors map onto what local file access raises:
+#   404 -> FileNotFoundError, 422 -> ChunkCorrupt,
+#   anything else (and no connection) -> OSError
+# --------------------------------------------------
+class ChunkClient:
+
+    def __init__(self, node_name, address):
+
+        host, _, port = address.rpartition(":")
+
+        self.node_name = node_name
+        self.host = host or "127.0.0.1"
+        self.port = int(port)
+        self.idle = queue.LifoQueue(maxsize=settings.CHUNK_CLIENT_POOL_SIZE)
+
+    def connect(self):
+
+        return http.client.HTTPConnection(
+            self.host,
+            self.port,
+            timeout=settings.CHUNK_CLIENT_TIMEOUT
+        )
+
+    def acquire(self):
+
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            return self.connect(), False
+
+    def release(self, conn):
+
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, path, body=None, params=None):
+
+        url = "/" + quote(path)
+
+        if params:
+            url += "?" + urlencode(params)
+
+        while True:
+
+            conn, reused = self.acquire()
+
+            try:
+                conn.request(method, url, body=body)
+                response = conn.getresponse()
+                data = response.read()
+
+            except (ConnectionError, http.client.HTTPException) as e:
+
+                conn.close()
+
+                # Stale keep-alive connection: retry on a new one
+                if reused:
+                    continue
+
+                raise OSError(f"Chunk server {self.node_name}: {e}") from e
+
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self.release(conn)
+
+            if response.status == 404:
+                raise FileNotFoundError(f"{path} not found on {self.node_name}")
+
+            if response.status == 422:
+                raise ChunkCorrupt(f"{path} on {self.node_name}: {data.decode()}")
+
+            if response.status >= 400:
+                raise OSError(
+                    f"Chunk server {self.node_name} answered "
+                    f"{response.status}: {data.decode(errors='replace')}"
+                )
+
+            return response, data
+
+    # ------------- Chunk operations -------------
+    def put(self, chunk_path, data):
+
+        self.request("PUT", f"chunks/{chunk_path}", body=data)
+
+    def get(self, chunk_path, codec=None, chunk_hash=None):
+        """
+        Stored bytes, or the decoded ones when codec is given. With
+        chunk_hash the server checks the (decoded) bytes first.
+        """
+
+        params = {}
+
+        if codec is not None:
+            params["codec"] = codec
+
+        if chunk_hash is not None:
+            params["sha256"] = chunk_hash
+
+        _, data = self.request("GET", f"chunks/{chunk_path}", params=params)
+
+        return data
+
+    def stat(self, chunk_path):
+        """
+        (size, mtime_ns, inode) of the stored file.
+        """
+
+        response, _ = self.request("HEAD", f"chunks/{chunk_path}")
+
+        return (
+            int(response.headers["X-Chunk-Size"]),
+            int(response.headers["X-Chunk-Mtime-Ns"]),
+            int(response.headers["X-Chunk-Inode"])
+        )
+
+    def delete(self, chunk_path):
+
+        self.request("DELETE", f"chunks/{chunk_path}")
+
+    def hash(self, chunk_path, codec=None):
+
+        params = {"codec": codec} if codec is not None else None
+
+        _, data = self.request("POST", f"hash/{chunk_path}", params=params)
+
+        return json.loads(data)["sha256"]
+
+    # ------------- Node operations -------------
+    def space(self):
+        """
+        (free bytes, total bytes) of the node's filesystem.
+        """
+
+        _, data = self.request("GET", "space")
+        usage = json.loads(data)
+
+        return usage["free"], usage["total"]
+
+    def probe(self):
+        """
+        (seconds per probe step, free ratio), measured on the node.
+        """
+
+        _, data = self.request("POST", "probe")
+        result = json.loads(data)
+
+        return result["steps"], result["free_ratio"]
+
+
+# --------------------------------------------------
+# Clients by node name (NODE_ADDRESSES); nodes without
+# an address are local directories
+# --------------------------------------------------
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def node_client(node_name):
+
+    address = settings.NODE_ADDRESSES.get(node_name)
+
+    if address is None:
+        return None
+
+    with _clients_lock:
+
+        client = _clients.get(node_name)
+
+        if client is None:
+            client = _clients[node_name] = ChunkClient(node_name, address)
+
+        return client
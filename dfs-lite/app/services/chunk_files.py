@@ -0,0 +1,170 @@
+import os
+import lzma
+import zlib
+import time
+import shutil
+import threading
+
+from app.services.codecs import decode_chunk
+from app.services.hashing import sha256_hex, hash_file
+
+# Raised by codecs on a damaged compressed replica
+DECODE_ERRORS = (zlib.error, lzma.LZMAError)
+
+
+class ChunkCorrupt(Exception):
+    """
+    A replica that exists but does not decode or match its hash.
+    """
+    pass
+
+
+# --------------------------------------------------
+# Chunk files under one storage root
+# Used by the API process for local nodes and by the
+# chunk server for its own root, so both store and
+# verify chunks the same way.
+# --------------------------------------------------
+def resolve(root, relative_path):
+    """
+    Absolute path of relative_path under root; refuses
+    paths that would leave the root.
+    """
+
+    root = os.path.abspath(root)
+    path = os.path.normpath(os.path.join(root, relative_path))
+
+    if not path.startswith(root + os.sep):
+        raise ValueError(f"Path {relative_path} is outside the storage root")
+
+    return path
+
+
+def make_chunk_dirs(root, chunk_path):
+
+    # The root itself is never created: if it is gone (lost
+    # disk, unmounted volume) the write fails instead of
+    # landing on whatever filesystem is underneath
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Storage root {root} is missing")
+
+    os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+
+
+def write_file(root, chunk_path, data):
+
+    make_chunk_dirs(root, chunk_path)
+
+    # Write to a temp name first so readers (and concurrent uploads
+    # of the same content-addressed chunk) never see a partial file
+    temp_path = f"{chunk_path}.{threading.get_ident()}.tmp"
+
+    with open(temp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(temp_path, chunk_path)
+
+
+def copy_file(root, source_path, chunk_path):
+
+    make_chunk_dirs(root, chunk_path)
+
+    temp_path = f"{chunk_path}.{threading.get_ident()}.tmp"
+
+    # copyfile uses sendfile() on Linux
+    shutil.copyfile(source_path, temp_path)
+
+    os.replace(temp_path, chunk_path)
+
+
+def read_file(chunk_path):
+
+    with open(chunk_path, "rb") as f:
+        return f.read()
+
+
+def stat_key(chunk_path):
+
+    st = os.stat(chunk_path)
+
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+# --------------------------------------------------
+# Hash / verify a replica file
+# --------------------------------------------------
+def read_decoded(chunk_path, codec=None):
+
+    try:
+        return decode_chunk(codec, read_file(chunk_path))
+    except DECODE_ERRORS as e:
+        raise ChunkCorrupt(f"{chunk_path} does not decode: {e}")
+
+
+def hash_stored(chunk_path, codec=None):
+
+    # Chunk hashes are over the original bytes
+    if codec is None:
+        return hash_file(chunk_path)
+
+    return sha256_hex(read_decoded(chunk_path, codec))
+
+
+def read_verified(chunk_path, chunk_hash, codec=None):
+    """
+    Original bytes of a replica, checked against chunk_hash.
+    """
+
+    data = read_decoded(chunk_path, codec)
+
+    if sha256_hex(data) != chunk_hash:
+        raise ChunkCorrupt(f"{chunk_path} does not match its hash")
+
+    return data
+
+
+# --------------------------------------------------
+# Probe a storage root
+# Writes, fsyncs, reads back and removes a small file,
+# then reads free space. A missing root counts as a
+# failure. Returns (seconds per step, free ratio);
+# raises OSError on failure.
+# --------------------------------------------------
+PROBE_FILE = ".probe"
+PROBE_PAYLOAD = os.urandom(4096)
+
+
+def probe_root(root):
+
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Storage root {root} is missing")
+
+    path = os.path.join(root, PROBE_FILE)
+
+    steps = {}
+    started = time.perf_counter()
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    try:
+        os.write(fd, PROBE_PAYLOAD)
+        steps["write"] = time.perf_counter() - started
+
+        os.fsync(fd)
+        steps["fsync"] = time.perf_counter() - started - steps["write"]
+
+    finally:
+        os.close(fd)
+
+    read_started = time.perf_counter()
+
+    if read_file(path) != PROBE_PAYLOAD:
+        raise OSError(f"Probe file in {root} read back wrong data")
+
+    steps["read"] = time.perf_counter() - read_started
+
+    os.remove(path)
+
+    usage = shutil.disk_usage(root)
+
+    return steps, usage.free / usage.total if usage.total else 0.0
@@ -0,0 +1,427 @@
+import os
+import logging
+
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.chunk import Chunk
+from app.models.replica import ChunkReplica
+from app.models.upload_session import UploadChunk
+from app.services.placement import node_storage_path, path_node_name
+from app.services.node_store import chunk_exists, remove_stored
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------
+# Chunk file layout
+# --------------------------------------------------
+def content_addressed():
+
+    return settings.CHUNK_STORE_MODE == "content"
+
+
+def placement_key(file_id, chunk_index, chunk_hash):
+
+    # Identical content lands on the same nodes in content mode
+    if content_addressed():
+        return chunk_hash
+
+    return f"{file_id}_chunk_{chunk_index}"
+
+
+def chunk_path_for(
+    node_name,
+    file_id,
+    chunk_index,
+    chunk_hash,
+    codec=None,
+    shard_index=None
+):
+    """
+    For erasure-coded shards chunk_hash is the shard's own hash.
+    """
+
+    if content_addressed():
+
+        # The codec is part of the name, so a compressed and a raw
+        # copy of the same content never overwrite each other
+        name = f"{chunk_hash}.{codec}" if codec else chunk_hash
+
+        return os.path.join(
+            node_storage_path(node_name),
+            "cas",
+            chunk_hash[:2],
+            name
+        )
+
+    name = f"{file_id}_chunk_{chunk_index}"
+
+    if shard_index is not None:
+        name += f"_shard_{shard_index}"
+
+    return os.path.join(node_storage_path(node_name), name)
+
+
+# --------------------------------------------------
+# Deduplication lookup
+# --------------------------------------------------
+def find_stored_paths(db, chunk_hash):
+    """
+    Stored copies of chunk_hash as (codec, paths), using the codec
+    with the most copies on disk; (None, []) if there are none.
+    """
+
+    replicas = db.query(ChunkReplica).filter(
+        ChunkReplica.chunk_hash == chunk_hash,
+        ChunkReplica.ref_count > 0
+    ).all()
+
+    by_codec = defaultdict(list)
+
+    for replica in replicas:
+        if chunk_exists(replica.chunk_path):
+            by_codec[replica.codec].append(replica.chunk_path)
+
+    if not by_codec:
+        return None, []
+
+    return max(by_codec.items(), key=lambda item: len(item[1]))
+
+
+def lookup_stored_paths(chunk_hash):
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        return find_stored_paths(db, chunk_hash)
+
+    finally:
+        db.close()
+
+
+def lookup_chunk_size(chunk_hash):
+    """
+    Original size of the whole chunk with this hash, from a file's
+    or an upload session's rows; None if no row records one.
+    """
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        for model in (Chunk, UploadChunk):
+
+            size = db.query(model.chunk_size).filter(
+                model.chunk_hash == chunk_hash,
+                model.shard_index.is_(None),
+                model.chunk_size.isnot(None)
+            ).limit(1).scalar()
+
+            if size is not None:
+                return size
+
+        return None
+
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# Reference counting
+# --------------------------------------------------
+def _load_replicas(db, chunk_paths):
+
+    replicas = {}
+
+    for start in range(0, len(chunk_paths), BATCH_SIZE):
+
+        batch = chunk_paths[start:start + BATCH_SIZE]
+
+        for replica in db.query(ChunkReplica).filter(
+            ChunkReplica.chunk_path.in_(batch)
+        ):
+            replicas[replica.chunk_path] = replica
+
+    return replicas
+
+
+def acquire_refs(db, chunk_refs):
+    """
+    chunk_refs: iterable of (chunk_path, chunk_hash, codec), one per Chunk row.
+    Only for paths this upload or repair wrote (or already holds a
+    reference on); stored copies found by lookup are referenced with
+    take_existing_refs.
+    """
+
+    counts = Counter()
+    hashes = {}
+    codecs = {}
+
+    for chunk_path, chunk_hash, codec in chunk_refs:
+        counts[chunk_path] += 1
+        hashes[chunk_path] = chunk_hash
+        codecs[chunk_path] = codec
+
+    replicas = _load_replicas(db, list(counts))
+
+    for chunk_path, count in counts.items():
+
+        replica = replicas.get(chunk_path)
+
+        if replica is None:
+            db.add(ChunkReplica(
+                chunk_path=chunk_path,
+                chunk_hash=hashes[chunk_path],
+                node_name=path_node_name(chunk_path),
+                ref_count=count,
+                codec=codecs[chunk_path]
+            ))
+        else:
+            replica.ref_count += count
+
+
+def new_refs(chunk_metadata):
+    """
+    acquire_refs input for an upload's chunk metadata; pinned reuses
+    already hold their references.
+    """
+
+    return [
+        (path, chunk["chunk_hash"], chunk["codec"])
+        for chunk in chunk_metadata
+        if not chunk.get("pinned")
+        for path in chunk["chunk_paths"]
+    ]
+
+
+def take_existing_refs(db, chunk_paths):
+    """
+    Add one reference to each replica in chunk_paths that is still
+    referenced. The check and the increment are one UPDATE, so a
+    concurrent delete either sees the new reference or has already
+    dropped the row; a released replica (whose file may be unlinked
+    any moment) is never revived. Returns the paths referenced.
+    """
+
+    taken = []
+
+    for chunk_path in chunk_paths:
+
+        row = db.execute(
+            update(ChunkReplica)
+            .where(
+                ChunkReplica.chunk_path == chunk_path,
+                ChunkReplica.ref_count > 0
+            )
+            .values(ref_count=ChunkReplica.ref_count + 1)
+            .returning(ChunkReplica.chunk_path)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+        if row is not None:
+            taken.append(chunk_path)
+
+    return taken
+
+
+def pin_stored_paths(chunk_paths):
+    """
+    take_existing_refs in its own write transaction, for uploads that
+    reuse stored chunks before their rows are written. The caller owns
+    the references: they count for the upload's first Chunk row per
+    path, or are dropped with release_pinned if the upload fails.
+    """
+
+    db: Session = SessionLocal()
+
+    try:
+        taken = take_existing_refs(db, chunk_paths)
+        db.commit()
+        return taken
+
+    finally:
+        db.close()
+
+
+def release_pinned(chunk_paths):
+
+    if not chunk_paths:
+        return
+
+    db: Session = SessionLocal()
+
+    try:
+        unreferenced = release_refs(db, list(chunk_paths))
+        db.commit()
+
+    finally:
+        db.close()
+
+    remove_chunk_files(unreferenced)
+
+
+def discard_unrecorded(chunk_metadata):
+    """
+    Undo a finished write whose rows were never committed (the
+    upload or session failed or went away meanwhile): drop the
+    references pinned on reused copies and remove written paths
+    nothing refers to.
+    """
+
+    release_pinned([
+        path
+        for chunk in chunk_metadata
+        if chunk.get("pinned")
+        for path in chunk["chunk_paths"]
+    ])
+
+    remove_chunk_files([
+        path
+        for chunk in chunk_metadata
+        if not chunk.get("pinned")
+        for path in chunk["chunk_paths"]
+    ])
+
+
+def release_refs(db, chunk_paths):
+    """
+    Drop one reference per entry in chunk_paths (one per deleted Chunk row).
+    Returns the paths nothing refers to anymore; remove them after commit.
+    """
+
+    counts = Counter(chunk_paths)
+
+    replicas = _load_replicas(db, list(counts))
+
+    unreferenced = []
+
+    for chunk_path, count in counts.items():
+
+        replica = replicas.get(chunk_path)
+
+        if replica is None:
+            unreferenced.append(chunk_path)
+            continue
+
+        replica.ref_count -= count
+
+        if replica.ref_count <= 0:
+            db.delete(replica)
+            unreferenced.append(chunk_path)
+
+    return unreferenced
+
+
+def delete_file_chunks(db, file_ids):
+    """
+    Delete the Chunk rows of file_ids and release their references.
+    DELETE ... RETURNING reports exactly the rows removed, including
+    replicas the repair engine added after this request started.
+    Returns the paths nothing refers to anymore; remove them after commit.
+    """
+
+    file_ids = list(file_ids)
+    chunk_paths = []
+
+    for start in range(0, len(file_ids), BATCH_SIZE):
+
+        result = db.execute(
+            delete(Chunk)
+            .where(Chunk.file_id.in_(file_ids[start:start + BATCH_SIZE]))
+            .returning(Chunk.chunk_path)
+        )
+
+        chunk_paths += [chunk_path for (chunk_path,) in result]
+
+    return release_refs(db, chunk_paths)
+
+
+def remove_chunk_files(chunk_paths):
+
+    chunk_paths = list(set(chunk_paths))
+    referenced = set()
+
+    # A path released by one request may have been written and
+    # referenced again (same content address) since; keep those
+    db: Session = ReadSessionLocal()
+
+    try:
+        for start in range(0, len(chunk_paths), BATCH_SIZE):
+            referenced.update(
+                path
+                for (path,) in db.query(ChunkReplica.chunk_path).filter(
+                    ChunkReplica.chunk_path.in_(chunk_paths[start:start + BATCH_SIZE])
+                )
+            )
+    finally:
+        db.close()
+
+    for chunk_path in chunk_paths:
+
+        if chunk_path in referenced:
+            continue
+
+        # The rows are already gone; a node that cannot be
+        # reached keeps an orphaned file rather than failing
+        # the delete
+        try:
+            remove_stored(chunk_path)
+        except OSError as e:
+            logger.warning(
+                "Chunk file removal failed",
+                extra={"chunk_path": chunk_path, "error": str(e)}
+            )
+
+
+# --------------------------------------------------
+# Backfill refcounts for chunks stored before
+# chunk_replicas existed
+# --------------------------------------------------
+def sync_replica_refs():
+
+    db: Session = SessionLocal()
+
+    try:
+
+        missing = (
+            db.query(
+                Chunk.chunk_path,
+                Chunk.chunk_hash,
+                Chunk.codec,
+                func.count(Chunk.id)
+            )
+            .outerjoin(
+                ChunkReplica,
+                ChunkReplica.chunk_path == Chunk.chunk_path
+            )
+            .filter(ChunkReplica.id == None)
+            .group_by(Chunk.chunk_path, Chunk.chunk_hash, Chunk.codec)
+            .all()
+        )
+
+        for chunk_path, chunk_hash, codec, count in missing:
+            db.add(ChunkReplica(
+                chunk_path=chunk_path,
+                chunk_hash=chunk_hash,
+                node_name=path_node_name(chunk_path),
+                ref_count=count,
+                codec=codec
+            ))
+
+        db.commit()
+
+        if missing:
+            logger.info(
+                "Backfilled replica refcounts",
+                extra={"replicas": len(missing)}
+            )
+
+    finally:
+        db.close()
@@ -0,0 +1,287 @@
+import hashlib
+
+from app.config import settings
+
+# Optional: vectorized cut-point search (same cut points)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MASK64 = (1 << 64) - 1
+
+
+# --------------------------------------------------
+# Fixed-size chunking (default, 1 MB)
+# --------------------------------------------------
+class FixedChunker:
+
+    cpu_bound = False
+
+    def __init__(self, size):
+
+        self.size = size
+        self._buffer = bytearray()
+
+    @property
+    def spec(self):
+        return f"fixed:{self.size}"
+
+    def feed(self, data):
+
+        self._buffer += data
+
+        chunks = []
+
+        while len(self._buffer) >= self.size:
+            chunks.append(bytes(self._buffer[:self.size]))
+            del self._buffer[:self.size]
+
+        return chunks
+
+    def flush(self):
+
+        if not self._buffer:
+            return []
+
+        chunk = bytes(self._buffer)
+        self._buffer = bytearray()
+
+        return [chunk]
+
+
+# --------------------------------------------------
+# Content-defined chunking (FastCDC-style)
+# A gear rolling hash picks cut points from the data
+# itself, so an insertion only changes the chunks around
+# it. Cuts are never made before min_size, a stricter mask
+# is used up to avg_size and a looser one after it
+# (normalized chunking), and max_size forces a cut.
+# With numpy installed the hash is computed a block at a
+# time (a few hundred MB/s); without it a byte-at-a-time
+# Python loop scans roughly 10 MB/s per core, which caps
+# upload throughput, so CHUNKER stays "fixed" by default.
+# --------------------------------------------------
+
+# Stable gear table: identical content must cut identically
+# across processes and releases, or deduplication breaks.
+GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "big")
+    for i in range(256)
+]
+
+
+def _top_mask(bits):
+
+    # Use the high bits: with a left-shifting gear hash they
+    # depend on the last 64 bytes, the low bits on only a few.
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+# Bytes hashed per numpy pass; cuts land near avg_size, so
+# the scan stops early instead of hashing up to max_size
+SCAN_BLOCK = 64 * 1024
+
+GEAR_ARRAY = numpy.array(GEAR, dtype=numpy.uint64) if numpy is not None else None
+
+
+def _gear_hashes(buf, start, begin, end):
+    """
+    Gear hash at every position in [begin, end) of a scan that
+    started at start (bytes before start are not hashed).
+    The hash after byte i is sum(GEAR[buf[i - k]] << k) over
+    the last 64 bytes, built by doubling the window: six
+    array passes instead of a Python step per byte.
+    """
+
+    first = max(start, begin - 63)
+
+    h = GEAR_ARRAY[
+        numpy.frombuffer(buf, dtype=numpy.uint8, count=end - first, offset=first)
+    ]
+
+    width = 1
+
+    while width < 64:
+        h[width:] += h[:-width] << numpy.uint64(width)
+        width *= 2
+
+    return h[begin - first:]
+
+
+def _first_cut(buf, start, begin, end, mask):
+    """
+    Position after the first byte in [begin, end) whose hash
+    has no bits of mask set, or None.
+    """
+
+    mask = numpy.uint64(mask)
+
+    for block in range(begin, end, SCAN_BLOCK):
+
+        block_end = min(block + SCAN_BLOCK, end)
+        hits = numpy.flatnonzero(
+            (_gear_hashes(buf, start, block, block_end) & mask) == 0
+        )
+
+        if hits.size:
+            return block + int(hits[0]) + 1
+
+    return None
+
+
+class CdcChunker:
+
+    cpu_bound = True
+
+    def __init__(self, min_size, avg_size, max_size):
+
+        if not 0 < min_size <= avg_size <= max_size:
+            raise ValueError("Expected 0 < min_size <= avg_size <= max_size")
+
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        bits = max(avg_size.bit_length() - 1, 2)
+
+        self.mask_small = _top_mask(bits + 1)
+        self.mask_large = _top_mask(bits - 1)
+
+        self._buffer = bytearray()
+        self._pos = 0
+        self._hash = 0
+
+    @property
+    def spec(self):
+        return f"cdc:{self.min_size}:{self.avg_size}:{self.max_size}"
+
+    def _find_cut(self):
+
+        if numpy is not None:
+            return self._find_cut_vectorized()
+
+        buf = self._buffer
+        size = len(buf)
+
+        pos = max(self._pos, self.min_size)
+        h = self._hash
+
+        gear = GEAR
+        mask = self.mask_small
+
+        # Before avg_size: harder to cut
+        for i in range(pos, min(size, self.avg_size)):
+            h = ((h << 1) + gear[buf[i]]) & MASK64
+            if not h & mask:
+                return i + 1
+
+        mask = self.mask_large
+
+        # After avg_size: easier to cut
+        for i in range(max(pos, self.avg_size), min(size, self.max_size)):
+            h = ((h << 1) + gear[buf[i]]) & MASK64
+            if not h & mask:
+                return i + 1
+
+        if size >= self.max_size:
+            return self.max_size
+
+        # Remember progress so the next feed resumes the scan
+        self._pos = max(pos, size)
+        self._hash = h
+
+        return None
+
+    def _find_cut_vectorized(self):
+
+        # Same cut points as the loop above. Hashes are recomputed
+        # from the bytes before pos, so only pos is carried over.
+        buf = self._buffer
+        size = len(buf)
+
+        pos = max(self._pos, self.min_size)
+
+        cut = None
+
+        # Before avg_size: harder to cut
+        if pos < min(size, self.avg_size):
+            cut = _first_cut(
+                buf,
+                self.min_size,
+                pos,
+                min(size, self.avg_size),
+                self.mask_small
+            )
+
+        # After avg_size: easier to cut
+        if cut is None and max(pos, self.avg_size) < min(size, self.max_size):
+            cut = _first_cut(
+                buf,
+                self.min_size,
+                max(pos, self.avg_size),
+                min(size, self.max_size),
+                self.mask_large
+            )
+
+        if cut is not None:
+            return cut
+
+        if size >= self.max_size:
+            return self.max_size
+
+        self._pos = max(pos, size)
+
+        return None
+
+    def feed(self, data):
+
+        self._buffer += data
+
+        chunks = []
+
+        while True:
+
+            cut = self._find_cut()
+
+            if cut is None:
+                break
+
+            chunks.append(bytes(self._buffer[:cut]))
+            del self._buffer[:cut]
+
+            self._pos = 0
+            self._hash = 0
+
+        return chunks
+
+    def flush(self):
+
+        if not self._buffer:
+            return []
+
+        chunk = bytes(self._buffer)
+
+        self._buffer = bytearray()
+        self._pos = 0
+        self._hash = 0
+
+        return [chunk]
+
+
+# --------------------------------------------------
+# Chunker for new uploads (settings.CHUNKER)
+# --------------------------------------------------
+def make_chunker():
+
+    if settings.CHUNKER == "cdc":
+        return CdcChunker(
+            settings.CDC_MIN_SIZE,
+            settings.CDC_AVG_SIZE,
+            settings.CDC_MAX_SIZE
+        )
+
+    if settings.CHUNKER != "fixed":
+        raise ValueError(f"Unknown chunker: {settings.CHUNKER}")
+
+    return FixedChunker(settings.CHUNK_SIZE)
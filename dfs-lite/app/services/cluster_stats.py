@@ -0,0 +1,239 @@
+import time
+import threading
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.models.file import File
+from app.models.node import Node
+from app.models.replica import ChunkReplica
+from app.services.events import subscribe, publish, stream_count
+from app.services.repair import last_scan_stats
+from app.services.node_health import AVAILABLE, SUSPECT, DRAINING
+
+
+def _count_status(status):
+
+    return func.coalesce(
+        func.sum(case((File.status == status, 1), else_=0)),
+        0
+    )
+
+
+# --------------------------------------------------
+# One aggregate over files, with node and replica
+# totals as scalar subqueries
+# --------------------------------------------------
+def collect_stats(db: Session):
+
+    row = db.execute(
+        select(
+            func.count(File.id),
+            _count_status("HEALTHY"),
+            _count_status("DEGRADED"),
+            _count_status("DEAD"),
+            func.coalesce(func.sum(File.total_size), 0),
+            select(func.count(Node.id)).scalar_subquery(),
+            select(func.count(Node.id))
+            .where(AVAILABLE)
+            .scalar_subquery(),
+            select(func.count(Node.id))
+            .where(AVAILABLE, Node.state == SUSPECT)
+            .scalar_subquery(),
+            select(func.count(Node.id))
+            .where(AVAILABLE, Node.state == DRAINING)
+            .scalar_subquery(),
+            select(func.count(ChunkReplica.id)).scalar_subquery(),
+        ).select_from(File)
+    ).one()
+
+    (
+        total_files,
+        healthy_files,
+        degraded_files,
+        dead_files,
+        logical_bytes,
+        total_nodes,
+        online_nodes,
+        suspect_nodes,
+        draining_nodes,
+        replicas
+    ) = row
+
+    # Determine cluster state
+    if dead_files > 0:
+        cluster_state = "CRITICAL"
+    elif degraded_files > 0:
+        cluster_state = "DEGRADED"
+    else:
+        cluster_state = "HEALTHY"
+
+    scan = last_scan_stats()
+
+    return {
+        "nodes": {
+            "total": total_nodes,
+            "online": online_nodes,
+            "offline": total_nodes - online_nodes,
+            "suspect": suspect_nodes,
+            "draining": draining_nodes
+        },
+        "files": {
+            "total": total_files,
+            "healthy": healthy_files,
+            "degraded": degraded_files,
+            "dead": dead_files
+        },
+        "storage": {
+            # Sum of file sizes: before replication, erasure
+            # coding and compression, and counting deduplicated
+            # chunks once per file
+            "logical_bytes": logical_bytes,
+            "replicas": replicas,
+            # From the repair engine's last scan (None until it ran)
+            "under_replicated_chunks": scan["under_replicated_chunks"],
+            "scanned_at": scan["scanned_at"]
+        },
+        "cluster_status": cluster_state
+    }
+
+
+def collect_node_replicas(db: Session):
+
+    rows = (
+        db.query(ChunkReplica.node_name, func.count(ChunkReplica.id))
+        .group_by(ChunkReplica.node_name)
+        .all()
+    )
+
+    return {node_name: count for node_name, count in rows}
+
+
+# --------------------------------------------------
+# Short-TTL cache, dropped on any cluster event
+# (upload, delete, node toggle, repair, status change)
+# except the "cluster" event published below
+# --------------------------------------------------
+_cache = {}
+_cache_lock = threading.Lock()
+
+# Bumped on invalidation, so a load that raced with an
+# event is not cached
+_generation = 0
+
+
+def invalidate(event=None):
+
+    global _generation
+
+    if event is not None and event["type"] == "cluster":
+        return
+
+    with _cache_lock:
+        _cache.clear()
+        _generation += 1
+
+
+subscribe(invalidate)
+
+
+def _cached(key, loader):
+
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        generation = _generation
+
+    if entry and entry[0] > now:
+        return entry[1]
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        value = loader(db)
+    finally:
+        db.close()
+
+    with _cache_lock:
+        if generation == _generation:
+            _cache[key] = (now + settings.HEALTH_CACHE_TTL, value)
+
+    return value
+
+
+def get_cluster_health():
+
+    return _cached("health", collect_stats)
+
+
+def get_node_replicas():
+
+    return _cached("node_replicas", collect_node_replicas)
+
+
+# --------------------------------------------------
+# Cluster event
+# Events come in bursts (an upload publishes several, a
+# repair pass many). CLUSTER_EVENT_DELAY after the first
+# event of a burst, health is recomputed once and
+# published as a "cluster" event if it changed, so every
+# event stream gets the same payload from one query.
+# --------------------------------------------------
+_broadcast_lock = threading.Lock()
+_broadcast_timer = None
+
+# One recompute at a time; guards _last_broadcast
+_compute_lock = threading.Lock()
+_last_broadcast = None
+
+
+def schedule_broadcast(event):
+
+    global _broadcast_timer
+
+    if event["type"] == "cluster":
+        return
+
+    with _broadcast_lock:
+
+        # Already pending: this event joins the burst
+        if _broadcast_timer is not None:
+            return
+
+        _broadcast_timer = threading.Timer(
+            settings.CLUSTER_EVENT_DELAY,
+            broadcast_health
+        )
+        _broadcast_timer.daemon = True
+        _broadcast_timer.start()
+
+
+subscribe(schedule_broadcast)
+
+
+def broadcast_health():
+
+    global _broadcast_timer, _last_broadcast
+
+    # Events from here on start the next burst
+    with _broadcast_lock:
+        _broadcast_timer = None
+
+    with _compute_lock:
+
+        # Nobody listening; new streams start from a fresh snapshot
+        if not stream_count():
+            _last_broadcast = None
+            return
+
+        health = get_cluster_health()
+
+        if health == _last_broadcast:
+            return
+
+        _last_broadcast = health
+
+    publish("cluster", **health)
@@ -0,0 +1,166 @@
+import os
+import lzma
+import zlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+
+# Leading bytes test-compressed before a whole chunk is
+SAMPLE_SIZE = 64 * 1024
+
+
+# --------------------------------------------------
+# Codec interface
+# A codec turns a chunk's original bytes into what is
+# stored on disk and back. Chunk hashes are always over
+# the original bytes. Register new codecs with
+# register_codec(); the name is stored on chunk rows.
+# --------------------------------------------------
+class Codec:
+
+    name = None
+
+    def encode(self, data):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+
+class ZlibCodec(Codec):
+
+    name = "zlib"
+
+    def __init__(self, level):
+        self.level = level
+
+    def encode(self, data):
+        return zlib.compress(data, self.level)
+
+    def decode(self, data):
+        return zlib.decompress(data)
+
+
+class LzmaCodec(Codec):
+
+    name = "lzma"
+
+    def __init__(self, preset):
+        self.preset = preset
+
+    def encode(self, data):
+        return lzma.compress(data, preset=self.preset)
+
+    def decode(self, data):
+        return lzma.decompress(data)
+
+
+_codecs = {}
+
+
+def register_codec(codec):
+
+    _codecs[codec.name] = codec
+
+
+def get_codec(name):
+
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec: {name}")
+
+
+register_codec(ZlibCodec(settings.COMPRESSION_LEVEL))
+register_codec(LzmaCodec(min(settings.COMPRESSION_LEVEL, 9)))
+
+
+# --------------------------------------------------
+# Compression pool
+# zlib and lzma release the GIL, so chunks of concurrent
+# uploads compress in parallel; the pool bounds the CPU
+# that uploads can take.
+# --------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+
+    global _pool
+
+    with _pool_lock:
+
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.COMPRESSION_WORKERS or os.cpu_count() or 1,
+                thread_name_prefix="compress"
+            )
+
+        return _pool
+
+
+def _worth_storing(original_size, encoded_size):
+
+    return encoded_size <= original_size * (1 - settings.COMPRESSION_MIN_SAVINGS)
+
+
+def _encode(codec, data):
+
+    # Already-compressed data (media, archives): a cheap test on
+    # the first bytes avoids compressing the whole chunk for nothing
+    if len(data) > 2 * SAMPLE_SIZE:
+        sample = data[:SAMPLE_SIZE]
+        if not _worth_storing(len(sample), len(zlib.compress(sample, 1))):
+            return None, data
+
+    encoded = codec.encode(data)
+
+    if not _worth_storing(len(data), len(encoded)):
+        return None, data
+
+    return codec.name, encoded
+
+
+def encode_many(buffers):
+    """
+    Compress chunks with settings.COMPRESSION, in order. The whole
+    batch is submitted before any result is awaited, so the chunks
+    compress in parallel. Returns [(codec_name or None, stored_bytes)].
+    """
+
+    if settings.COMPRESSION == "none":
+        return [(None, data) for data in buffers]
+
+    codec = get_codec(settings.COMPRESSION)
+
+    futures = [_get_pool().submit(_encode, codec, data) for data in buffers]
+
+    return [future.result() for future in futures]
+
+
+def encode_chunk(data):
+    """
+    Compress one chunk with settings.COMPRESSION.
+    Returns (codec_name or None, stored_bytes).
+    """
+
+    return encode_many([data])[0]
+
+
+def encode_with(codec_name, data):
+
+    if codec_name is None:
+        return data
+
+    return get_codec(codec_name).encode(data)
+
+
+def decode_chunk(codec_name, stored):
+
+    if codec_name is None:
+        return stored
+
+    return get_codec(codec_name).decode(stored)
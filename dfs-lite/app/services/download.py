@@ -0,0 +1,381 @@
+import mmap
+import asyncio
+
+from collections import defaultdict, deque
+from urllib.parse import quote
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.file import File
+from app.services.repair import report_corrupt_replica, report_missing_replica
+from app.services.replica_reader import fetch_chunk, fetch_shards
+from app.services.erasure import parse_storage_policy
+from app.services.events import publish
+from app.services.metrics import BYTES_OUT
+
+# Chunk size of files uploaded before chunk sizes were recorded
+LEGACY_CHUNK_SIZE = 1024 * 1024
+
+# Slice size when streaming from an mmap without zero-copy support
+SEND_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+# --------------------------------------------------
+# Download plan: one entry per chunk index
+# --------------------------------------------------
+class ChunkPlan:
+
+    def __init__(self, chunk_index, offset, size, replicas, code=None):
+
+        self.chunk_index = chunk_index
+        self.offset = offset
+        self.size = size
+
+        # (chunk_path, chunk_hash, codec) tuples, detached from the
+        # DB session; for erasure-coded chunks (code set) they are
+        # (chunk_path, shard_hash, shard_index)
+        self.replicas = replicas
+        self.code = code
+
+
+def plan_chunks(file_entry, chunks):
+
+    code = parse_storage_policy(file_entry.storage_policy)
+
+    groups = defaultdict(list)
+
+    for c in chunks:
+        groups[c.chunk_index].append(c)
+
+    plans = []
+    offset = 0
+
+    for chunk_index in sorted(groups):
+
+        replicas = groups[chunk_index]
+
+        size = replicas[0].chunk_size
+
+        if size is None:
+            size = min(LEGACY_CHUNK_SIZE, file_entry.total_size - offset)
+
+        if code is not None:
+            entries = [(r.chunk_path, r.chunk_hash, r.shard_index) for r in replicas]
+        else:
+            entries = [(r.chunk_path, r.chunk_hash, r.codec) for r in replicas]
+
+        plans.append(ChunkPlan(chunk_index, offset, size, entries, code))
+
+        offset += size
+
+    return plans
+
+
+# --------------------------------------------------
+# Range header (single byte range)
+# Returns (start, end) with end exclusive, or None to
+# send the whole file.
+# --------------------------------------------------
+def parse_range(header, total_size):
+
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[len("bytes="):].strip()
+
+    # Multiple ranges are not supported; serve the full body
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = spec.split("-", 1)
+
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start = max(total_size - suffix, 0)
+            end = total_size
+        else:
+            start = int(first)
+            end = int(last) + 1 if last else total_size
+    except ValueError:
+        return None
+
+    end = min(end, total_size)
+
+    if start >= total_size or start >= end:
+        raise RangeNotSatisfiable()
+
+    return start, end
+
+
+def report_faults(file_id, readable, missing, corrupt):
+
+    # Mark the file before repair starts, so the repair engine's
+    # DEGRADED -> HEALTHY transition cannot run first
+    if readable:
+        set_file_status(file_id, "DEGRADED")
+
+    for chunk_path, chunk_hash, _ in missing:
+        report_missing_replica(chunk_path, chunk_hash)
+
+    for chunk_path, chunk_hash, _ in corrupt:
+        report_corrupt_replica(chunk_path, chunk_hash)
+
+
+async def resolve_chunk(file_id, plan):
+    """
+    Find a verified replica of one chunk (or rebuild it from its
+    shards); faulty replicas met on the way are reported to the
+    repair engine.
+    Returns (healthy_path or None, decoded data or None, found_fault);
+    both None when the chunk cannot be read.
+    """
+
+    if plan.code is not None:
+        healthy = None
+        data, missing, corrupt = await fetch_shards(
+            plan.replicas,
+            plan.code,
+            plan.size
+        )
+    else:
+        healthy, data, missing, corrupt = await fetch_chunk(
+            plan.replicas,
+            plan.chunk_index
+        )
+
+    if not (missing or corrupt):
+        return healthy, data, False
+
+    readable = healthy is not None or data is not None
+
+    await run_in_threadpool(report_faults, file_id, readable, missing, corrupt)
+
+    return healthy, data, True
+
+
+def set_file_status(file_id, status, only_from=None):
+
+    db: Session = SessionLocal()
+
+    try:
+        # Only write (and notify) when the status actually changes
+        query = db.query(File).filter(
+            File.id == file_id,
+            File.status != status
+        )
+
+        if only_from is not None:
+            query = query.filter(File.status == only_from)
+
+        changed = query.update({File.status: status})
+        db.commit()
+
+    finally:
+        db.close()
+
+    if changed:
+        publish("file_status", file_id=str(file_id), status=status)
+
+
+# --------------------------------------------------
+# Streaming response
+# Sends verified replicas straight from the page cache:
+# through the ASGI zero-copy extension (sendfile) when the
+# server offers it, otherwise as mmap slices. Compressed
+# chunks are sent from their decoded bytes.
+# --------------------------------------------------
+class ChunkStreamResponse(Response):
+
+    media_type = "application/octet-stream"
+
+    def __init__(self, file_entry, plans, byte_range=None):
+
+        self.file_id = file_entry.id
+        self.total_size = file_entry.total_size
+        self.plans = plans
+        self.background = None
+
+        if byte_range is None:
+            self.start, self.end = 0, self.total_size
+            self.status_code = 200
+        else:
+            self.start, self.end = byte_range
+            self.status_code = 206
+
+        quoted = quote(file_entry.filename)
+
+        if quoted == file_entry.filename:
+            disposition = f'attachment; filename="{quoted}"'
+        else:
+            disposition = f"attachment; filename*=utf-8''{quoted}"
+
+        headers = {
+            "content-disposition": disposition,
+            "accept-ranges": "bytes",
+            "content-length": str(self.end - self.start),
+        }
+
+        if byte_range is not None:
+            headers["content-range"] = (
+                f"bytes {self.start}-{self.end - 1}/{self.total_size}"
+            )
+
+        self.init_headers(headers)
+
+    def _selected_plans(self):
+
+        return [
+            plan for plan in self.plans
+            if plan.offset < self.end
+            and plan.offset + plan.size > self.start
+        ]
+
+    async def _send_data(self, send, data, offset, count):
+
+        view = memoryview(data)
+
+        for position in range(offset, offset + count, SEND_SIZE):
+            await send({
+                "type": "http.response.body",
+                "body": bytes(view[position:min(position + SEND_SIZE, offset + count)]),
+                "more_body": True,
+            })
+
+    async def _send_chunk(self, send, zerocopy, path, offset, count):
+
+        with open(path, "rb") as f:
+
+            if zerocopy:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": True,
+                })
+                return
+
+            # One copy out of the page cache per slice, no read()
+            # into a whole-chunk buffer
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+                for position in range(offset, offset + count, SEND_SIZE):
+                    await send({
+                        "type": "http.response.body",
+                        "body": mm[position:min(position + SEND_SIZE, offset + count)],
+                        "more_body": True,
+                    })
+
+    async def __call__(self, scope, receive, send):
+
+        zerocopy = "http.response.zerocopy" in scope.get("extensions", {})
+
+        selected = self._selected_plans()
+        found_fault = False
+
+        # Chunks are verified DOWNLOAD_PREFETCH ahead of the one being
+        # sent, on the per-node read pools
+        lookups = deque()
+        upcoming = iter(selected)
+
+        def prefetch():
+            while len(lookups) < max(settings.DOWNLOAD_PREFETCH, 1):
+                plan = next(upcoming, None)
+                if plan is None:
+                    return
+                lookups.append((
+                    plan,
+                    asyncio.ensure_future(resolve_chunk(self.file_id, plan))
+                ))
+
+        try:
+
+            prefetch()
+
+            # The first chunk is verified before the status line goes
+            # out, so a dead file still gets a proper error response
+            if lookups:
+
+                plan, lookup = lookups[0]
+                first_path, first_data, _ = await lookup
+
+                if first_path is None and first_data is None:
+                    await run_in_threadpool(set_file_status, self.file_id, "DEAD")
+                    error = Response(
+                        f"All replicas corrupted for chunk {plan.chunk_index}",
+                        status_code=500
+                    )
+                    await error(scope, receive, send)
+                    return
+
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+
+            while lookups:
+
+                plan, lookup = lookups.popleft()
+                prefetch()
+
+                path, data, fault = await lookup
+                found_fault = found_fault or fault
+
+                if path is None and data is None:
+                    await run_in_threadpool(set_file_status, self.file_id, "DEAD")
+                    raise RuntimeError(
+                        f"All replicas corrupted for chunk {plan.chunk_index}"
+                    )
+
+                chunk_start = max(self.start - plan.offset, 0)
+                chunk_end = min(self.end - plan.offset, plan.size)
+
+                if data is not None:
+                    await self._send_data(
+                        send,
+                        data,
+                        chunk_start,
+                        chunk_end - chunk_start
+                    )
+                else:
+                    await self._send_chunk(
+                        send,
+                        zerocopy,
+                        path,
+                        chunk_start,
+                        chunk_end - chunk_start
+                    )
+
+                BYTES_OUT.inc(chunk_end - chunk_start)
+
+            await send({
+                "type": "http.response.body",
+                "body": b"",
+                "more_body": False,
+            })
+
+        finally:
+            for _, lookup in lookups:
+                lookup.cancel()
+
+        # Every chunk had a verified replica, so the file is not dead;
+        # a DEGRADED file stays so until the repair engine clears it
+        if not found_fault and len(selected) == len(self.plans):
+            await run_in_threadpool(
+                set_file_status,
+                self.file_id,
+                "HEALTHY",
+                only_from="DEAD"
+            )
@@ -0,0 +1,239 @@
+import re
+
+# --------------------------------------------------
+# GF(2^8) arithmetic (polynomial 0x11d, generator 2)
+# --------------------------------------------------
+GF_EXP = [0] * 512
+GF_LOG = [0] * 256
+
+_x = 1
+
+for _i in range(255):
+    GF_EXP[_i] = _x
+    GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11d
+
+for _i in range(255, 512):
+    GF_EXP[_i] = GF_EXP[_i - 255]
+
+
+def gf_mul(a, b):
+
+    if a == 0 or b == 0:
+        return 0
+
+    return GF_EXP[GF_LOG[a] + GF_LOG[b]]
+
+
+def gf_inv(a):
+
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+
+    return GF_EXP[255 - GF_LOG[a]]
+
+
+# One bytes.translate() table per coefficient: multiplying a
+# whole shard by a constant runs in C instead of per byte
+MUL_TABLES = [
+    bytes(gf_mul(c, x) for x in range(256))
+    for c in range(256)
+]
+
+
+def _combine(coefficients, shards, size):
+    """
+    XOR-sum of coefficient * shard over GF(256). Shards are
+    XORed as big integers, again to stay out of Python loops.
+    """
+
+    acc = 0
+
+    for c, shard in zip(coefficients, shards):
+
+        if c == 0:
+            continue
+
+        if c != 1:
+            shard = shard.translate(MUL_TABLES[c])
+
+        acc ^= int.from_bytes(shard, "little")
+
+    return acc.to_bytes(size, "little")
+
+
+def _invert(matrix):
+
+    n = len(matrix)
+
+    rows = [
+        list(row) + [1 if i == j else 0 for j in range(n)]
+        for i, row in enumerate(matrix)
+    ]
+
+    for col in range(n):
+
+        pivot = next(
+            (r for r in range(col, n) if rows[r][col]),
+            None
+        )
+
+        if pivot is None:
+            raise ValueError("Singular matrix")
+
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+
+        inv = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(inv, v) for v in rows[col]]
+
+        for r in range(n):
+
+            factor = rows[r][col]
+
+            if r != col and factor:
+                rows[r] = [
+                    v ^ gf_mul(factor, p)
+                    for v, p in zip(rows[r], rows[col])
+                ]
+
+    return [row[n:] for row in rows]
+
+
+# --------------------------------------------------
+# Systematic Reed-Solomon code (k data + m parity shards)
+# Shards 0..k-1 are the chunk itself, cut into k equal
+# slices (the last one zero-padded); parity rows form a
+# Cauchy matrix, so any k of the k+m shards are enough to
+# rebuild the chunk.
+# --------------------------------------------------
+class ReedSolomon:
+
+    def __init__(self, data_shards, parity_shards):
+
+        if data_shards < 1 or parity_shards < 1:
+            raise ValueError("Expected at least one data and one parity shard")
+
+        if data_shards + parity_shards > 256:
+            raise ValueError("At most 256 shards per chunk")
+
+        self.data_shards = data_shards
+        self.parity_shards = parity_shards
+        self.total_shards = data_shards + parity_shards
+
+        k = data_shards
+
+        self.matrix = [
+            [1 if i == j else 0 for j in range(k)]
+            for i in range(k)
+        ] + [
+            [gf_inv(x ^ y) for y in range(k)]
+            for x in range(k, self.total_shards)
+        ]
+
+    @property
+    def spec(self):
+        return f"ec:{self.data_shards}+{self.parity_shards}"
+
+    def shard_size(self, chunk_size):
+
+        return max(-(-chunk_size // self.data_shards), 1)
+
+    def encode(self, data):
+        """
+        Returns the k+m shards of one chunk.
+        """
+
+        size = self.shard_size(len(data))
+        padded = data.ljust(size * self.data_shards, b"\0")
+
+        shards = [
+            padded[i * size:(i + 1) * size]
+            for i in range(self.data_shards)
+        ]
+
+        for row in self.matrix[self.data_shards:]:
+            shards.append(_combine(row, shards, size))
+
+        return shards
+
+    def _data_shards(self, shards):
+
+        k = self.data_shards
+
+        if len(shards) < k:
+            raise ValueError(
+                f"{len(shards)} shards available, {k} needed"
+            )
+
+        if all(i in shards for i in range(k)):
+            return [shards[i] for i in range(k)]
+
+        # Prefer data shards: their rows are unit vectors
+        chosen = sorted(shards)[:k]
+        size = len(shards[chosen[0]])
+
+        inverse = _invert([self.matrix[i] for i in chosen])
+        available = [shards[i] for i in chosen]
+
+        return [
+            shards[i] if i in shards
+            else _combine(inverse[i], available, size)
+            for i in range(k)
+        ]
+
+    def decode(self, shards, chunk_size):
+        """
+        shards: {shard_index: bytes} with at least k entries.
+        Returns the original chunk.
+        """
+
+        return b"".join(self._data_shards(shards))[:chunk_size]
+
+    def rebuild(self, shards):
+        """
+        shards: {shard_index: bytes} with at least k entries.
+        Returns all k+m shards.
+        """
+
+        data = self._data_shards(shards)
+        size = len(data[0])
+
+        return data + [
+            shards[i] if i in shards
+            else _combine(self.matrix[i], data, size)
+            for i in range(self.data_shards, self.total_shards)
+        ]
+
+
+# --------------------------------------------------
+# Storage policies: "replicated" (full copies) or
+# "ec:<k>+<m>". Returns None for replication.
+# An unescaped "+" in a query string arrives as a space,
+# so "ec:<k> <m>" is accepted too.
+# --------------------------------------------------
+_POLICY = re.compile(r"^ec:(\d+)[+ ](\d+)$")
+
+_codes = {}
+
+
+def parse_storage_policy(spec):
+
+    if spec is None or spec == "replicated":
+        return None
+
+    code = _codes.get(spec)
+
+    if code is not None:
+        return code
+
+    match = _POLICY.match(spec)
+
+    if not match:
+        raise ValueError(f"Unknown storage policy: {spec}")
+
+    code = ReedSolomon(int(match.group(1)), int(match.group(2)))
+    _codes[spec] = code
+
+    return code
@@ -0,0 +1,141 @@
+import json
+import asyncio
+import logging
+import threading
+
+# --------------------------------------------------
+# In-process event bus
+# Uploads, deletes, node toggles and repairs publish
+# events here; caches and streams subscribe to them.
+# Callbacks run on the publishing thread and must be
+# quick.
+# --------------------------------------------------
+_subscribers = []
+_lock = threading.Lock()
+
+# Open event streams (SSE clients)
+_stream_count = 0
+
+logger = logging.getLogger(__name__)
+
+
+def subscribe(callback):
+
+    with _lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback):
+
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def stream_count():
+
+    return _stream_count
+
+
+def publish(event_type, **data):
+
+    event = {"type": event_type, **data}
+
+    with _lock:
+        subscribers = list(_subscribers)
+
+    for callback in subscribers:
+
+        try:
+            callback(event)
+        except Exception:
+            logger.exception(
+                "Event subscriber failed",
+                extra={"event_type": event_type}
+            )
+
+
+# --------------------------------------------------
+# Per-client stream (SSE)
+# Events from any thread are handed to the client's
+# event loop; a client that falls too far behind gets a
+# single "resync" event instead of an unbounded backlog.
+# --------------------------------------------------
+class EventStream:
+
+    def __init__(self, loop, max_pending):
+
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def _put(self, event):
+
+        if self.overflowed:
+            return
+
+        try:
+            self.queue.put_nowait(event)
+
+        except asyncio.QueueFull:
+
+            self.overflowed = True
+
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+            self.queue.put_nowait({"type": "resync"})
+
+    def __call__(self, event):
+
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def __enter__(self):
+
+        global _stream_count
+
+        with _lock:
+            _stream_count += 1
+
+        subscribe(self)
+        return self
+
+    def __exit__(self, *exc):
+
+        global _stream_count
+
+        unsubscribe(self)
+
+        with _lock:
+            _stream_count -= 1
+
+    async def get(self, timeout):
+
+        event = await asyncio.wait_for(self.queue.get(), timeout)
+
+        if event["type"] == "resync":
+            self.overflowed = False
+
+        return event
+
+    def drain(self):
+        """
+        Events already queued, without waiting.
+        """
+
+        events = []
+
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+
+        if any(event["type"] == "resync" for event in events):
+            self.overflowed = False
+
+        return events
+
+
+def format_sse(event_type, data):
+
+    payload = json.dumps(data, default=str)
+
+    return f"event: {event_type}\ndata: {payload}\n\n"
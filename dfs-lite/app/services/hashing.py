@@ -0,0 +1,91 @@
+import os
+import mmap
+import hashlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+
+
+# --------------------------------------------------
+# Hashing pool
+# hashlib releases the GIL while it hashes buffers larger
+# than 2 KB, so SHA-256 over chunks scales across cores
+# from threads; a process pool would only add a copy of
+# every chunk. Uploads, the scrubber and repair share the
+# pool, which bounds the CPU they take. Downloads verify on
+# the per-node read pools (or on the chunk server) instead,
+# where the read already runs.
+# --------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_workers():
+
+    return settings.HASH_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool():
+
+    global _pool
+
+    with _pool_lock:
+
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=hash_workers(),
+                thread_name_prefix="hash"
+            )
+
+        return _pool
+
+
+def submit(function, *args, **kwargs):
+    """
+    Run a hashing job (hash or verify one replica) on the pool.
+    Jobs must not submit to the pool themselves.
+    """
+
+    return _get_pool().submit(function, *args, **kwargs)
+
+
+# --------------------------------------------------
+# Buffers
+# --------------------------------------------------
+def sha256_hex(data):
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_many(buffers):
+    """
+    SHA-256 hex digests of buffers, in order. Batches too small
+    to be worth a thread handoff are hashed on the caller.
+    """
+
+    if (
+        len(buffers) < 2
+        or sum(len(data) for data in buffers) < settings.HASH_PARALLEL_MIN_BYTES
+    ):
+        return [sha256_hex(data) for data in buffers]
+
+    futures = [_get_pool().submit(sha256_hex, data) for data in buffers]
+
+    return [future.result() for future in futures]
+
+
+# --------------------------------------------------
+# Files (mmap-backed: one hashlib call over the page
+# cache, no read buffers or Python copies)
+# --------------------------------------------------
+def hash_file(path):
+
+    with open(path, "rb") as f:
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
@@ -0,0 +1,318 @@
+import time
+import bisect
+import threading
+
+from contextlib import contextmanager
+
+
+# --------------------------------------------------
+# Minimal Prometheus-style metrics
+# Counters, gauges and histograms with labels, rendered
+# in the Prometheus text exposition format by render().
+# Recording is a dict lookup and an add under a lock, so
+# it is cheap enough for per-chunk hot paths.
+# --------------------------------------------------
+_registry = []
+_registry_lock = threading.Lock()
+
+# Seconds; spans a page-cache hit up to a slow disk or a large repair
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value):
+
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(names, values, extra=None):
+
+    pairs = list(zip(names, values))
+
+    if extra:
+        pairs.append(extra)
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+
+    if value == float("inf"):
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+class Metric:
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._values = {}
+        self._lock = threading.Lock()
+
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """
+        (suffix, label values, extra label, value) tuples.
+        """
+
+        with self._lock:
+            return [
+                ("", key, None, value)
+                for key, value in sorted(self._values.items())
+            ]
+
+    def render(self):
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+        for suffix, key, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}"
+                f"{_format_labels(self.labelnames, key, extra)} "
+                f"{_format_value(value)}"
+            )
+
+        return lines
+
+
+class Counter(Metric):
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+
+        super().__init__(name, documentation, labelnames)
+
+        # Read at scrape time instead of being set by the code
+        self.function = function
+
+    def set(self, value, **labels):
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+
+        if self.function is not None:
+            return [("", (), None, self.function())]
+
+        return super().samples()
+
+
+class Histogram(Metric):
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+
+        super().__init__(name, documentation, labelnames)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+
+        key = self._key(labels)
+
+        # Index of the first bucket the value fits in
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+
+            entry = self._values.get(key)
+
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+
+            if index < len(self.buckets):
+                entry[0][index] += 1
+
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+
+        with self._lock:
+            entries = [
+                (key, list(counts), count, total)
+                for key, (counts, count, total) in sorted(self._values.items())
+            ]
+
+        samples = []
+
+        for key, counts, count, total in entries:
+
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, ("le", _format_value(bound)), cumulative))
+
+            samples.append(("_bucket", key, ("le", "+Inf"), count))
+            samples.append(("_count", key, None, count))
+            samples.append(("_sum", key, None, total))
+
+        return samples
+
+
+def render():
+
+    with _registry_lock:
+        metrics = list(_registry)
+
+    lines = []
+
+    for metric in metrics:
+        lines += metric.render()
+
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------
+# Metrics of the storage paths
+# --------------------------------------------------
+CHUNK_WRITE_SECONDS = Histogram(
+    "dfs_chunk_write_seconds",
+    "Time to write one replica or shard to a node",
+    ["node"]
+)
+
+CHUNK_READ_SECONDS = Histogram(
+    "dfs_chunk_read_seconds",
+    "Time to read and verify one replica or shard for a download",
+    ["node"]
+)
+
+CHUNK_HASH_SECONDS = Histogram(
+    "dfs_chunk_hash_seconds",
+    "Time to hash one chunk (node=ingest: incoming upload data)",
+    ["node"]
+)
+
+NODE_BYTES_WRITTEN = Counter(
+    "dfs_node_bytes_written_total",
+    "Bytes written to replicas and shards",
+    ["node"]
+)
+
+NODE_BYTES_READ = Counter(
+    "dfs_node_bytes_read_total",
+    "Bytes read from replicas and shards by downloads",
+    ["node"]
+)
+
+BYTES_IN = Counter(
+    "dfs_bytes_in_total",
+    "File bytes received by uploads"
+)
+
+BYTES_OUT = Counter(
+    "dfs_bytes_out_total",
+    "File bytes sent by downloads"
+)
+
+REPLICA_FAULTS = Counter(
+    "dfs_replica_faults_total",
+    "Replica faults reported to the repair engine",
+    ["kind"]
+)
+
+REPAIR_TASKS = Counter(
+    "dfs_repair_tasks_total",
+    "Repair tasks run",
+    ["task", "outcome"]
+)
+
+REPAIR_TASK_SECONDS = Histogram(
+    "dfs_repair_task_seconds",
+    "Time to run one repair task or batch",
+    ["task"]
+)
+
+REPLICAS_RESTORED = Counter(
+    "dfs_replicas_restored_total",
+    "Replicas and shards rewritten or recreated by the repair engine",
+    ["action"]
+)
+
+SCAN_SECONDS = Histogram(
+    "dfs_repair_scan_seconds",
+    "Duration of the under-replication scan",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+SCRUB_REPLICAS = Counter(
+    "dfs_scrub_replicas_total",
+    "Replicas checked by the scrubber",
+    ["result"]
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "dfs_db_query_seconds",
+    "Database statement execution time",
+    ["engine", "statement"]
+)
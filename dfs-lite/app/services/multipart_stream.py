@@ -0,0 +1,100 @@
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+# --------------------------------------------------
+# Incremental multipart reader
+# Yields the bytes of one file field as they arrive on
+# the socket instead of spooling the whole body first.
+# --------------------------------------------------
+class MultipartFileStream:
+
+    def __init__(self, request, field_name):
+
+        self.request = request
+        self.field_name = field_name
+        self.filename = None
+
+        content_type, params = parse_options_header(
+            request.headers.get("content-type", "")
+        )
+
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("Expected multipart/form-data request body")
+
+        self._events = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._in_field = False
+
+        self._parser = MultipartParser(
+            params[b"boundary"],
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            }
+        )
+
+    # ---------- Parser callbacks ----------
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+
+        _, options = parse_options_header(
+            self._headers.get(b"content-disposition", b"")
+        )
+
+        name = options.get(b"name", b"").decode("latin-1")
+
+        self._in_field = (
+            name == self.field_name
+            and self.filename is None
+        )
+
+        if self._in_field:
+            self.filename = options.get(b"filename", b"").decode("utf-8")
+
+    def _on_part_data(self, data, start, end):
+        if self._in_field:
+            self._events.append(data[start:end])
+
+    def _on_part_end(self):
+        self._in_field = False
+
+    # ---------- Async iteration ----------
+    async def __aiter__(self):
+
+        async for body_piece in self.request.stream():
+
+            self._parser.write(body_piece)
+
+            for data in self._drain():
+                yield data
+
+        self._parser.finalize()
+
+        for data in self._drain():
+            yield data
+
+    def _drain(self):
+
+        events, self._events = self._events, []
+
+        return events
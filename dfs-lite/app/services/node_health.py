@@ -0,0 +1,172 @@
+import threading
+
+from collections import deque
+
+from sqlalchemy import and_, or_
+
+from app.config import settings
+from app.models.node import Node
+
+# Node states decided by the node monitor
+UP = "UP"
+SUSPECT = "SUSPECT"        # slow or flaky: still used, but deprioritized
+DRAINING = "DRAINING"      # nearly full: readable, gets no new chunks
+DOWN = "DOWN"              # failing probes: not used at all
+
+
+# Nodes whose replicas count: switched on and not failed.
+# (Rows from before the monitor existed have no state.)
+AVAILABLE = and_(
+    Node.is_online == True,
+    or_(Node.state == None, Node.state != DOWN)
+)
+
+
+# --------------------------------------------------
+# Rolling health of one node
+# Probe latency is smoothed with an EWMA and errors are
+# counted over the last NODE_HEALTH_WINDOW probes. The
+# score is 1.0 for a node answering within
+# NODE_SLOW_PROBE_SECONDS without errors and drops with
+# slowness and error rate.
+# --------------------------------------------------
+class NodeHealth:
+
+    def __init__(self):
+
+        self.results = deque(maxlen=settings.NODE_HEALTH_WINDOW)
+        self.latency = None
+        self.consecutive_failures = 0
+        self.free_ratio = None
+        self.state = UP
+        self.score = 1.0
+
+    def record(self, ok, latency=None, free_ratio=None):
+
+        self.results.append(ok)
+
+        if ok:
+
+            self.consecutive_failures = 0
+            self.free_ratio = free_ratio
+
+            alpha = settings.NODE_LATENCY_SMOOTHING
+
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = alpha * latency + (1 - alpha) * self.latency
+
+        else:
+            self.consecutive_failures += 1
+
+        self.score = self.compute_score()
+        self.state = self.compute_state()
+
+    def error_rate(self):
+
+        if not self.results:
+            return 0.0
+
+        return self.results.count(False) / len(self.results)
+
+    def compute_score(self):
+
+        slow = settings.NODE_SLOW_PROBE_SECONDS
+
+        speed = 1.0
+
+        if self.latency is not None and self.latency > slow:
+            speed = slow / self.latency
+
+        return round((1 - self.error_rate()) * speed, 3)
+
+    def compute_state(self):
+
+        if self.consecutive_failures >= settings.NODE_DOWN_AFTER:
+            return DOWN
+
+        if (
+            self.free_ratio is not None
+            and self.free_ratio < settings.NODE_DRAIN_FREE_RATIO
+        ):
+            return DRAINING
+
+        if self.consecutive_failures or self.score < settings.NODE_SUSPECT_SCORE:
+            return SUSPECT
+
+        return UP
+
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def record_probe(node_name, ok, latency=None, free_ratio=None):
+    """
+    Returns (previous state, new state, score).
+    """
+
+    with _health_lock:
+
+        health = _health.get(node_name)
+
+        if health is None:
+            health = _health[node_name] = NodeHealth()
+
+        previous = health.state
+        health.record(ok, latency, free_ratio)
+
+        return previous, health.state, health.score
+
+
+def node_state(node_name):
+
+    with _health_lock:
+        health = _health.get(node_name)
+        return health.state if health else UP
+
+
+def node_score(node_name):
+
+    with _health_lock:
+        health = _health.get(node_name)
+        return health.score if health else 1.0
+
+
+# --------------------------------------------------
+# Routing hints for placement and reads
+# --------------------------------------------------
+def placement_factor(node_name):
+    """
+    Multiplier of a node's placement weight: 0 for nodes that must
+    not get new chunks, the health score otherwise.
+    """
+
+    with _health_lock:
+        health = _health.get(node_name)
+
+    if health is None:
+        return 1.0
+
+    if health.state in (DOWN, DRAINING):
+        return 0.0
+
+    return max(health.score, settings.NODE_MIN_PLACEMENT_FACTOR)
+
+
+def read_rank(node_name):
+    """
+    Lower is read first: healthy and draining nodes, then
+    suspect ones, then nodes that are down.
+    """
+
+    state = node_state(node_name)
+
+    if state == DOWN:
+        return 2
+
+    if state == SUSPECT:
+        return 1
+
+    return 0
@@ -1,7 +1,10 @@
+import os
+
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.node import Node
 from app.config import settings
+from app.services.placement import node_storage_path
 
 
 def initialize_nodes():
@@ -13,6 +16,12 @@ def initialize_nodes():
 
             node_name = node_path.split("/")[-1]
 
+            # Storage roots exist from the start; one that goes
+            # missing later is reported by the node monitor.
+            # Chunk servers create their own.
+            if node_name not in settings.NODE_ADDRESSES:
+                os.makedirs(node_storage_path(node_name), exist_ok=True)
+
             existing = db.query(Node).filter(Node.name == node_name).first()
 
             if not existing:
@@ -23,11 +32,8 @@ def initialize_nodes():
                 )
 
                 db.add(node)
-            else:
-                existing.status = "ACTIVE"
 
         db.commit()
 
     finally:
         db.close()
-
@@ -0,0 +1,221 @@
+import time
+import logging
+import threading
+
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.node import Node
+from app.services.node_store import probe
+from app.services.node_health import DOWN, record_probe
+from app.services.repair import report_node_change
+from app.services.events import publish
+from app.services.metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+NODE_HEALTH_SCORE = Gauge(
+    "dfs_node_health_score",
+    "Rolling health score of a storage node (1.0 = healthy)",
+    ["node"]
+)
+
+NODE_PROBE_SECONDS = Histogram(
+    "dfs_node_probe_seconds",
+    "Duration of one node probe step",
+    ["node", "step"]
+)
+
+def utcnow():
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --------------------------------------------------
+# Probe one storage node
+# Writes, fsyncs, reads back and removes a small file,
+# then reads free space, on the node itself (a chunk
+# server probes its own root). A missing root counts as
+# a failure: it is never recreated here, so a node whose
+# disk is gone stays failed; so does a chunk server that
+# does not answer. Returns (latency, free ratio); raises
+# OSError on failure.
+# --------------------------------------------------
+def probe_node(node_name):
+
+    started = time.perf_counter()
+
+    steps, free_ratio = probe(node_name)
+
+    for step, seconds in steps.items():
+        NODE_PROBE_SECONDS.observe(seconds, node=node_name, step=step)
+
+    latency = time.perf_counter() - started
+
+    return latency, free_ratio
+
+
+# --------------------------------------------------
+# Node monitor
+# Every node is probed on its own thread each
+# NODE_PROBE_INTERVAL; a probe that does not finish within
+# NODE_PROBE_TIMEOUT counts as failed (a hung disk keeps
+# failing until its probe returns). State changes are
+# written to the nodes table, published, and sent to the
+# repair engine when a node goes down or comes back.
+# --------------------------------------------------
+class NodeMonitor:
+
+    def __init__(self):
+
+        self.pools = {}
+        self.running = {}
+
+    def pool(self, node_name):
+
+        if node_name not in self.pools:
+            self.pools[node_name] = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f"probe-{node_name}"
+            )
+
+        return self.pools[node_name]
+
+    def probe_all(self, node_names):
+
+        futures = {}
+
+        for node_name in node_names:
+
+            previous = self.running.get(node_name)
+
+            # Still stuck in the last probe
+            if previous is not None and not previous.done():
+                futures[node_name] = previous
+                continue
+
+            futures[node_name] = self.running[node_name] = (
+                self.pool(node_name).submit(probe_node, node_name)
+            )
+
+        deadline = time.monotonic() + settings.NODE_PROBE_TIMEOUT
+
+        results = {}
+
+        for node_name, future in futures.items():
+
+            try:
+                results[node_name] = future.result(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+            except (OSError, TimeoutError) as e:
+                results[node_name] = e
+
+        return results
+
+    def run_once(self):
+
+        db: Session = ReadSessionLocal()
+
+        try:
+            node_names = [name for (name,) in db.query(Node.name)]
+        finally:
+            db.close()
+
+        changes = []
+
+        for node_name, result in self.probe_all(node_names).items():
+
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Node probe failed",
+                    extra={"node": node_name, "error": str(result) or "timeout"}
+                )
+                previous, state, score = record_probe(node_name, False)
+            else:
+                latency, free_ratio = result
+                previous, state, score = record_probe(
+                    node_name,
+                    True,
+                    latency,
+                    free_ratio
+                )
+
+            NODE_HEALTH_SCORE.set(score, node=node_name)
+
+            changes.append((node_name, previous, state, score))
+
+        self.save(changes)
+
+        for node_name, previous, state, score in changes:
+
+            if state == previous:
+                continue
+
+            log = logger.warning if state != "UP" else logger.info
+            log(
+                "Node state changed",
+                extra={"node": node_name, "from": previous, "to": state, "score": score}
+            )
+
+            publish("node_state", node=node_name, state=state, health_score=score)
+
+            # Its replicas stop or start counting
+            if DOWN in (previous, state):
+                report_node_change(node_name)
+
+    def save(self, changes):
+
+        db: Session = SessionLocal()
+
+        try:
+
+            checked_at = utcnow()
+
+            nodes = {
+                node.name: node
+                for node in db.query(Node).filter(
+                    Node.name.in_([name for name, _, _, _ in changes])
+                )
+            }
+
+            for node_name, _, state, score in changes:
+
+                node = nodes.get(node_name)
+
+                if node is None:
+                    continue
+
+                node.state = state
+                node.health_score = score
+                node.checked_at = checked_at
+
+            db.commit()
+
+        finally:
+            db.close()
+
+
+def monitor_forever():
+
+    monitor = NodeMonitor()
+
+    while True:
+
+        try:
+            monitor.run_once()
+        except Exception:
+            logger.exception("Node monitor pass failed")
+
+        time.sleep(settings.NODE_PROBE_INTERVAL)
+
+
+def start_node_monitor():
+
+    threading.Thread(target=monitor_forever, daemon=True).start()
+
+    logger.info("Node monitor started")
@@ -0,0 +1,189 @@
+import os
+
+from app.services.placement import node_storage_path, path_node_name
+from app.services.chunk_client import node_client
+from app.services.chunk_files import (
+    write_file,
+    copy_file,
+    read_file,
+    read_decoded,
+    read_verified as read_verified_file,
+    stat_key as stat_file,
+    hash_stored as hash_stored_file,
+    probe_root
+)
+
+
+# --------------------------------------------------
+# Replica access by chunk path
+# Chunk paths keep their storage/<node>/... form in the
+# database; the node part decides where the file lives.
+# Nodes listed in NODE_ADDRESSES are chunk servers and
+# get the path below their root; the rest are local
+# directories of this process.
+# --------------------------------------------------
+def locate(chunk_path):
+    """
+    (client, path on the node) for a chunk server,
+    (None, chunk_path) for a local node.
+    """
+
+    node_name = path_node_name(chunk_path)
+    client = node_client(node_name)
+
+    if client is None:
+        return None, chunk_path
+
+    return client, os.path.relpath(chunk_path, node_storage_path(node_name))
+
+
+def is_remote(chunk_path):
+
+    return node_client(path_node_name(chunk_path)) is not None
+
+
+def stat_key(chunk_path):
+    """
+    (size, mtime_ns, inode); changes whenever the file is rewritten.
+    """
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return stat_file(path)
+
+    return client.stat(path)
+
+
+def stored_size(chunk_path):
+
+    return stat_key(chunk_path)[0]
+
+
+def chunk_exists(chunk_path):
+    """
+    False only when the node says the file is missing; a chunk
+    server that cannot be reached keeps its replicas (its rows
+    must not be dropped over a network blip).
+    """
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return os.path.exists(path)
+
+    try:
+        client.stat(path)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+
+    return True
+
+
+def read_stored(chunk_path):
+    """
+    Bytes as stored (still compressed for compressed replicas).
+    """
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return read_file(path)
+
+    return client.get(path)
+
+
+def read_chunk(chunk_path, codec=None):
+    """
+    Original bytes of a replica; raises ChunkCorrupt if it does
+    not decode.
+    """
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return read_decoded(path, codec)
+
+    return client.get(path, codec=codec)
+
+
+def read_verified(chunk_path, chunk_hash, codec=None):
+    """
+    Original bytes of a replica checked against chunk_hash; a chunk
+    server decodes and hashes on its own cores. Raises ChunkCorrupt.
+    """
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return read_verified_file(path, chunk_hash, codec)
+
+    return client.get(path, codec=codec, chunk_hash=chunk_hash)
+
+
+def hash_stored(chunk_path, codec=None):
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        return hash_stored_file(path, codec)
+
+    return client.hash(path, codec)
+
+
+def write_stored(chunk_path, data):
+
+    client, path = locate(chunk_path)
+
+    if client is None:
+        write_file(node_storage_path(path_node_name(path)), path, data)
+        return
+
+    client.put(path, data)
+
+
+def copy_stored(source_path, chunk_path):
+
+    source_client, source = locate(source_path)
+    client, path = locate(chunk_path)
+
+    # Local to local stays a kernel-side copy
+    if source_client is None and client is None:
+        copy_file(node_storage_path(path_node_name(path)), source, path)
+        return
+
+    write_stored(chunk_path, read_stored(source_path))
+
+
+def remove_stored(chunk_path):
+    """
+    Delete a replica; one that is already gone is fine.
+    """
+
+    client, path = locate(chunk_path)
+
+    try:
+        if client is None:
+            os.remove(path)
+        else:
+            client.delete(path)
+    except FileNotFoundError:
+        pass
+
+
+# --------------------------------------------------
+# Whole nodes
+# --------------------------------------------------
+def probe(node_name):
+    """
+    (seconds per probe step, free ratio); raises OSError.
+    """
+
+    client = node_client(node_name)
+
+    if client is None:
+        return probe_root(node_storage_path(node_name))
+
+    return client.probe()
@@ -0,0 +1,147 @@
+import os
+import math
+import time
+import shutil
+import hashlib
+import threading
+
+from app.config import settings
+from app.services.node_health import placement_factor
+from app.services.chunk_client import node_client
+
+
+# --------------------------------------------------
+# Node storage path
+# --------------------------------------------------
+def node_storage_path(node_name):
+
+    return os.path.join(
+        settings.STORAGE_DIR,
+        node_name
+    )
+
+
+def path_node_name(chunk_path):
+
+    # storage/<node>/<chunk file> or storage/<node>/cas/<xx>/<hash>
+    return os.path.relpath(
+        chunk_path,
+        settings.STORAGE_DIR
+    ).split(os.sep)[0]
+
+
+# --------------------------------------------------
+# Node load (replica writes queued or running)
+# --------------------------------------------------
+_node_load = {}
+_load_lock = threading.Lock()
+
+
+def add_node_load(node_name, delta):
+
+    with _load_lock:
+        _node_load[node_name] = _node_load.get(node_name, 0) + delta
+
+
+def get_node_load(node_name):
+
+    with _load_lock:
+        return _node_load.get(node_name, 0)
+
+
+# --------------------------------------------------
+# Node free capacity (cached for PLACEMENT_STATS_TTL)
+# --------------------------------------------------
+_free_bytes = {}
+_free_lock = threading.Lock()
+
+
+def get_free_bytes(node_name):
+
+    now = time.monotonic()
+
+    with _free_lock:
+        cached = _free_bytes.get(node_name)
+
+    if cached and now - cached[1] < settings.PLACEMENT_STATS_TTL:
+        return cached[0]
+
+    client = node_client(node_name)
+
+    # Roots are created by initialize_nodes (or the chunk server);
+    # a missing or unreachable one gets no new chunks
+    try:
+        if client is None:
+            free = shutil.disk_usage(node_storage_path(node_name)).free
+        else:
+            free = client.space()[0]
+    except OSError:
+        free = 0
+
+    with _free_lock:
+        _free_bytes[node_name] = (free, now)
+
+    return free
+
+
+# --------------------------------------------------
+# Weighted rendezvous (highest random weight) hashing
+# The same key always prefers the same nodes, and each
+# node's share scales with its free space and drops
+# while it is busy or unhealthy; nodes the monitor has
+# marked down or draining get nothing.
+# --------------------------------------------------
+def node_weight(node_name):
+
+    factor = placement_factor(node_name)
+
+    if factor <= 0:
+        return 0.0
+
+    free = get_free_bytes(node_name)
+
+    if free <= 0:
+        return 0.0
+
+    return factor * free / (1 + get_node_load(node_name))
+
+
+def rendezvous_score(key, node_name, weight):
+
+    digest = hashlib.sha256(
+        f"{key}:{node_name}".encode()
+    ).digest()
+
+    # Uniform value in (0, 1)
+    u = (int.from_bytes(digest[:8], "big") + 1) / (2 ** 64 + 2)
+
+    return -weight / math.log(u)
+
+
+def choose_nodes(key, nodes, count, exclude=()):
+    """
+    Pick up to `count` nodes for `key`, skipping names in `exclude`.
+    """
+
+    if count <= 0:
+        return []
+
+    scored = []
+
+    for node in nodes:
+
+        if node.name in exclude:
+            continue
+
+        weight = node_weight(node.name)
+
+        if weight <= 0:
+            continue
+
+        scored.append(
+            (rendezvous_score(key, node.name, weight), node)
+        )
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    return [node for _, node in scored[:count]]
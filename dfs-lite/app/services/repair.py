@@ -1,121 +1,1094 @@
-import os
 import time
-import hashlib
-import random
+import queue
+import logging
+import itertools
+import threading
 
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from collections import defaultdict
 
-from app.database import SessionLocal
+from app.database import SessionLocal, ReadSessionLocal
 from app.models.chunk import Chunk
 from app.models.file import File
 from app.models.node import Node
+from app.models.replica import ChunkReplica
 from app.config import settings
+from app.services.placement import choose_nodes, path_node_name
+from app.services.node_health import AVAILABLE
+from app.services.replica_writer import copy_replica, write_replica
+from app.services.codecs import encode_with
+from app.services.chunk_files import ChunkCorrupt
+from app.services.node_store import (
+    chunk_exists,
+    stored_size,
+    read_chunk,
+    read_verified
+)
+from app.services.erasure import parse_storage_policy
+from app.services.verify_cache import verify_replica
+from app.services.hashing import submit, hash_many
+from app.services.events import publish
+from app.services.metrics import (
+    Gauge,
+    REPLICA_FAULTS,
+    REPAIR_TASKS,
+    REPAIR_TASK_SECONDS,
+    REPLICAS_RESTORED,
+    SCAN_SECONDS
+)
+from app.services.chunk_store import (
+    BATCH_SIZE,
+    acquire_refs,
+    release_refs,
+    remove_chunk_files,
+    delete_file_chunks,
+    chunk_path_for,
+    placement_key
+)
 
+logger = logging.getLogger(__name__)
 
-def repair_daemon():
+# --------------------------------------------------
+# Repair tasks (lower value runs first)
+# --------------------------------------------------
+CORRUPT_REPLICA = 0
+MISSING_REPLICA = 1
+NODE_CHANGED = 2
+UNDER_REPLICATED = 3
 
-    while True:
-        print("[REPAIR] Running background scan...")
+TASK_NAMES = {
+    CORRUPT_REPLICA: "corrupt replica",
+    MISSING_REPLICA: "missing replica",
+    NODE_CHANGED: "node changed",
+    UNDER_REPLICATED: "under-replicated chunk",
+}
 
-        db: Session = SessionLocal()
+_tasks = queue.PriorityQueue()
+_sequence = itertools.count()
+
+# Keys queued or running, so the same fault is repaired once
+_pending = set()
+_pending_lock = threading.Lock()
+
+# Striped locks: work on one chunk hash never runs concurrently
+_chunk_locks = [threading.Lock() for _ in range(64)]
+
+
+# Result of the last safety-net scan
+_scan_stats = {"under_replicated_chunks": None, "scanned_at": None}
+_scan_lock = threading.Lock()
+
+# Only one batch of under-replicated chunks is applied at a time
+_replication_lock = threading.Lock()
+
+
+def _chunk_lock(chunk_hash):
+
+    return _chunk_locks[hash(chunk_hash) % len(_chunk_locks)]
+
+
+@contextmanager
+def _stripe_lock(chunk_hashes):
+    """
+    Hold the locks of every hash in a chunk's rows: the replicas'
+    one hash, or each shard's own hash for an erasure-coded chunk,
+    so a single-shard repair never overlaps a rebuild of its
+    stripe. Taken in stripe order, each lock once.
+    """
+
+    locks = sorted(
+        {hash(chunk_hash) % len(_chunk_locks) for chunk_hash in chunk_hashes}
+    )
+
+    for index in locks:
+        _chunk_locks[index].acquire()
+
+    try:
+        yield
+
+    finally:
+        for index in reversed(locks):
+            _chunk_locks[index].release()
+
+
+def _enqueue(kind, key, *args):
+
+    with _pending_lock:
+
+        if key in _pending:
+            return False
+
+        _pending.add(key)
+
+    _tasks.put((kind, next(_sequence), key, args))
+
+    return True
+
+
+def queue_depth():
+
+    return _tasks.qsize()
+
+
+Gauge(
+    "dfs_repair_queue_depth",
+    "Repair tasks waiting in the queue",
+    function=queue_depth
+)
+
+
+# --------------------------------------------------
+# Feeders (download, scrubber, node changes, scan)
+# --------------------------------------------------
+def report_corrupt_replica(chunk_path, chunk_hash):
+
+    REPLICA_FAULTS.inc(kind="corrupt")
+
+    _enqueue(CORRUPT_REPLICA, ("replica", chunk_path), chunk_path, chunk_hash)
+
+
+def report_missing_replica(chunk_path, chunk_hash):
 
+    REPLICA_FAULTS.inc(kind="missing")
+
+    _enqueue(MISSING_REPLICA, ("replica", chunk_path), chunk_path, chunk_hash)
+
+
+def report_node_change(node_name):
+
+    _enqueue(NODE_CHANGED, ("node", node_name), node_name)
+
+
+def report_under_replicated(file_id, chunk_index):
+
+    _enqueue(
+        UNDER_REPLICATED,
+        ("chunk", str(file_id), chunk_index),
+        file_id,
+        chunk_index
+    )
+
+
+# --------------------------------------------------
+# Task: restore one replica in place
+# --------------------------------------------------
+def find_healthy_copy(db: Session, chunk_hash, exclude_path):
+    """
+    Returns (chunk_path, codec) of a verified copy, or (None, None).
+    """
+
+    others = db.query(ChunkReplica).filter(
+        ChunkReplica.chunk_hash == chunk_hash,
+        ChunkReplica.chunk_path != exclude_path
+    ).all()
+
+    for other in others:
+
+        # A copy on a node that cannot be reached is skipped
         try:
-            files = db.query(File).all()
+            if verify_replica(other.chunk_path, other.chunk_hash, codec=other.codec):
+                return other.chunk_path, other.codec
+        except OSError:
+            continue
 
-            for file in files:
+    return None, None
 
-                chunks = (
-                    db.query(Chunk)
-                    .filter(Chunk.file_id == file.id)
-                    .order_by(Chunk.chunk_index)
-                    .all()
-                )
 
-                chunk_groups = defaultdict(list)
-                for c in chunks:
-                    chunk_groups[c.chunk_index].append(c)
+def restore_copy(source_path, source_codec, chunk_path, codec):
 
-                for chunk_index, replicas in chunk_groups.items():
+    # Same encoding: a plain file copy. Otherwise (content-addressed
+    # copies of one chunk may use different codecs) re-encode.
+    if source_codec == codec:
+        copy_replica(source_path, chunk_path)
+        return
 
-                    valid_data = None
-                    valid_hash = None
+    write_replica(
+        chunk_path,
+        encode_with(codec, read_chunk(source_path, source_codec))
+    )
 
-                    # ------------- Find healthy replica -------------
-                    for replica in replicas:
-                        if not os.path.exists(replica.chunk_path):
-                            continue
 
-                        with open(replica.chunk_path, "rb") as f:
-                            data = f.read()
+def set_status_for_hash(db: Session, chunk_hash, status, only_from=None):
+    """
+    Returns the ids of the files whose status changed.
+    """
 
-                        computed = hashlib.sha256(data).hexdigest()
+    file_ids = db.query(Chunk.file_id).filter(
+        Chunk.chunk_hash == chunk_hash
+    ).distinct()
 
-                        if computed == replica.chunk_hash:
-                            valid_data = data
-                            valid_hash = computed
-                            break
+    query = db.query(File.id).filter(
+        File.id.in_(file_ids),
+        File.status != status
+    )
 
-                    if not valid_data:
-                        print(f"[REPAIR] All replicas corrupted for {file.id} chunk {chunk_index}")
-                        file.status = "DEAD"
-                        continue
+    if only_from is not None:
+        query = query.filter(File.status == only_from)
 
-                    # ------------- Remove missing replicas from DB -------------
-                    for replica in replicas:
-                        if not os.path.exists(replica.chunk_path):
-                            db.delete(replica)
+    changed = [file_id for (file_id,) in query]
 
-                    db.commit()
+    set_file_status(db, changed, status)
 
-                    # Refresh replicas list
-                    replicas = (
-                        db.query(Chunk)
-                        .filter(Chunk.file_id == file.id)
-                        .filter(Chunk.chunk_index == chunk_index)
-                        .all()
-                    )
+    return changed
 
-                    # ------------- Ensure replication factor -------------
-                    active_nodes = db.query(Node).all()
-                    existing_paths = [r.chunk_path for r in replicas]
 
-                    while len(replicas) < settings.REPLICATION_FACTOR:
+def set_file_status(db: Session, file_ids, status, only_from=None):
+    """
+    Returns the ids of the files whose status changed.
+    """
 
-                        node = random.choice(active_nodes)
+    file_ids = list(file_ids)
+    changed = []
 
-                        new_path = os.path.join(
-                            node.path,
-                            f"{file.id}_chunk_{chunk_index}"
-                        )
+    for start in range(0, len(file_ids), BATCH_SIZE):
+
+        query = db.query(File.id).filter(
+            File.id.in_(file_ids[start:start + BATCH_SIZE]),
+            File.status != status
+        )
+
+        if only_from is not None:
+            query = query.filter(File.status == only_from)
+
+        batch = [file_id for (file_id,) in query]
+
+        if batch:
+            db.query(File).filter(File.id.in_(batch)).update(
+                {File.status: status},
+                synchronize_session=False
+            )
+            changed += batch
+
+    return changed
+
+
+def publish_status(file_ids, status):
+
+    for file_id in file_ids:
+        publish("file_status", file_id=str(file_id), status=status)
+
+
+# --------------------------------------------------
+# Erasure-coded shards are rebuilt from any k verified
+# shards of the same chunk instead of being copied
+# --------------------------------------------------
+def read_verified_shards(shards, count):
+    """
+    shards: Chunk rows of one chunk. Returns {shard_index: bytes}
+    with up to count verified shards, data shards first.
+    """
+
+    found = {}
+
+    candidates = sorted(shards, key=lambda s: s.shard_index)
+    position = 0
+
+    # Read the shards still needed in parallel on the hashing
+    # pool; failures move on to the next candidates
+    while len(found) < count and position < len(candidates):
+
+        wave = {}
+
+        while position < len(candidates) and len(found) + len(wave) < count:
+
+            shard = candidates[position]
+            position += 1
+
+            if shard.shard_index not in found and shard.shard_index not in wave:
+                wave[shard.shard_index] = shard
+
+        # Chunk servers check the shard before sending it
+        futures = {
+            shard_index: submit(read_verified, shard.chunk_path, shard.chunk_hash)
+            for shard_index, shard in wave.items()
+        }
+
+        for shard_index, future in futures.items():
+            try:
+                found[shard_index] = future.result()
+            except (OSError, ChunkCorrupt):
+                continue
+
+    return found
+
+
+def load_storage_codes(db: Session, file_ids):
+    """
+    {file_id: ReedSolomon or None} for the files that still exist.
+    """
+
+    file_ids = list(file_ids)
+    codes = {}
+
+    for start in range(0, len(file_ids), BATCH_SIZE):
+        for file_id, policy in db.query(File.id, File.storage_policy).filter(
+            File.id.in_(file_ids[start:start + BATCH_SIZE])
+        ):
+            codes[file_id] = parse_storage_policy(policy)
+
+    return codes
+
+
+def rebuild_shard(db: Session, chunk_path):
+    """
+    Rewrite the shard stored at chunk_path from its siblings.
+    Returns False if chunk_path is not a shard or too few
+    siblings are readable.
+    """
+
+    shard = db.query(Chunk).filter(
+        Chunk.chunk_path == chunk_path,
+        Chunk.shard_index != None
+    ).first()
+
+    if shard is None:
+        return False
+
+    code = load_storage_codes(db, [shard.file_id]).get(shard.file_id)
+
+    if code is None:
+        return False
+
+    siblings = db.query(Chunk).filter(
+        Chunk.file_id == shard.file_id,
+        Chunk.chunk_index == shard.chunk_index,
+        Chunk.chunk_path != chunk_path
+    ).all()
+
+    found = read_verified_shards(siblings, code.data_shards)
+
+    if len(found) < code.data_shards:
+        return False
+
+    write_replica(chunk_path, code.rebuild(found)[shard.shard_index])
+
+    return True
+
+
+def repair_replica(chunk_path, chunk_hash):
+
+    db: Session = SessionLocal()
+
+    try:
+
+        codec = db.query(ChunkReplica.codec).filter(
+            ChunkReplica.chunk_path == chunk_path
+        ).scalar()
+
+        # Someone may have fixed it since the fault was reported.
+        # A node that cannot be reached is left to the node monitor
+        # and the under-replication scan.
+        try:
+            if verify_replica(chunk_path, chunk_hash, use_cache=False, codec=codec):
+                return
+        except OSError as e:
+            logger.warning(
+                "Replica node unreachable",
+                extra={"chunk_path": chunk_path, "error": str(e)}
+            )
+            return
+
+        source_path, source_codec = find_healthy_copy(db, chunk_hash, chunk_path)
+
+        if source_path:
+            restore_copy(source_path, source_codec, chunk_path, codec)
+
+        elif rebuild_shard(db, chunk_path):
+            source_path = "sibling shards"
+
+        else:
+            logger.error("No healthy copy left", extra={"chunk_hash": chunk_hash})
+            changed = set_status_for_hash(db, chunk_hash, "DEAD")
+            db.commit()
+
+            publish_status(changed, "DEAD")
+            return
+
+        changed = set_status_for_hash(
+            db,
+            chunk_hash,
+            "HEALTHY",
+            only_from="DEGRADED"
+        )
+        db.commit()
+
+        REPLICAS_RESTORED.inc(action="restored")
+
+        logger.info(
+            "Replica restored",
+            extra={"chunk_path": chunk_path, "source": source_path}
+        )
+
+        publish("replica_restored", chunk_path=chunk_path, chunk_hash=chunk_hash)
+
+        publish_status(changed, "HEALTHY")
+
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# Task: bring chunks back to REPLICATION_FACTOR
+# Workers hand over up to REPAIR_BATCH_SIZE chunks at a
+# time. The node table is read once per batch, replicas
+# are loaded in bulk, and each batch of row changes is a
+# single transaction.
+# --------------------------------------------------
+def load_replica_groups(db: Session, chunk_keys):
+
+    groups = defaultdict(list)
+
+    # Two bound parameters per (file_id, chunk_index) pair
+    step = BATCH_SIZE // 2
+
+    for start in range(0, len(chunk_keys), step):
+
+        batch = chunk_keys[start:start + step]
+
+        for replica in db.query(Chunk).filter(
+            tuple_(Chunk.file_id, Chunk.chunk_index).in_(batch)
+        ):
+            groups[(replica.file_id, replica.chunk_index)].append(replica)
+
+    return groups
+
+
+def existing_file_ids(db: Session, file_ids):
+
+    file_ids = list(file_ids)
+    existing = set()
+
+    for start in range(0, len(file_ids), BATCH_SIZE):
+        existing.update(
+            file_id
+            for (file_id,) in db.query(File.id).filter(
+                File.id.in_(file_ids[start:start + BATCH_SIZE])
+            )
+        )
+
+    return existing
+
+
+def drop_deleted_files(db: Session, file_ids):
+
+    gone = set(file_ids) - existing_file_ids(db, file_ids)
+
+    if not gone:
+        return
+
+    unreferenced = delete_file_chunks(db, gone)
+    db.commit()
+
+    remove_chunk_files(unreferenced)
+
+
+def ensure_replication(chunk_keys):
+    """
+    chunk_keys: list of (file_id, chunk_index)
+    """
+
+    # Row changes of one batch are committed together, so only
+    # one batch at a time may decide what is missing
+    with _replication_lock:
+
+        db: Session = SessionLocal()
+
+        try:
+
+            active_nodes = db.query(Node).filter(AVAILABLE).all()
+
+            groups = load_replica_groups(db, chunk_keys)
+
+            codes = load_storage_codes(db, {file_id for file_id, _ in groups})
+
+            dead = set()
+            healed = set()
+            unhealed = set()
+            removed_paths = []
+            added = []
+
+            for (file_id, chunk_index), replicas in groups.items():
 
-                        if new_path in existing_paths:
-                            continue
+                # Deleted meanwhile; its rows are going away
+                if file_id not in codes:
+                    continue
 
-                        with open(new_path, "wb") as f:
-                            f.write(valid_data)
+                code = codes[file_id]
 
-                        new_chunk = Chunk(
-                            file_id=file.id,
-                            chunk_index=chunk_index,
-                            chunk_hash=valid_hash,
-                            chunk_path=new_path
+                with _stripe_lock({r.chunk_hash for r in replicas}):
+                    if code is not None:
+                        status = rebuild_shards(
+                            db,
+                            active_nodes,
+                            file_id,
+                            chunk_index,
+                            code,
+                            replicas,
+                            removed_paths,
+                            added
                         )
+                    else:
+                        status = replicate_chunk(
+                            db,
+                            active_nodes,
+                            file_id,
+                            chunk_index,
+                            replicas,
+                            removed_paths,
+                            added
+                        )
+
+                if status == "DEAD":
+                    dead.add(file_id)
+                elif status == "HEALTHY":
+                    healed.add(file_id)
+                else:
+                    unhealed.add(file_id)
+
+            release_refs(db, removed_paths)
 
-                        db.add(new_chunk)
-                        db.commit()
+            # A replica may be recreated at a path released above
+            db.flush()
 
-                        replicas.append(new_chunk)
-                        existing_paths.append(new_path)
+            db.add_all(added)
+            acquire_refs(
+                db,
+                [(c.chunk_path, c.chunk_hash, c.codec) for c in added]
+            )
 
-                        print(f"[REPAIR] Recreated replica on {node.name}")
+            now_dead = set_file_status(db, dead, "DEAD")
+            now_healthy = set_file_status(
+                db,
+                healed - dead - unhealed,
+                "HEALTHY",
+                only_from="DEGRADED"
+            )
 
-                    file.status = "HEALTHY"
+            db.commit()
+
+            if added or removed_paths:
+                publish(
+                    "chunks_replicated",
+                    replicas_added=len(added),
+                    replicas_removed=len(removed_paths)
+                )
 
-                db.commit()
+            publish_status(now_dead, "DEAD")
+            publish_status(now_healthy, "HEALTHY")
+
+            # A file deleted while its chunks were being copied
+            # must not keep the new copies
+            drop_deleted_files(db, {c.file_id for c in added})
 
         finally:
             db.close()
 
-        time.sleep(15)
 
+def replicate_chunk(
+    db: Session,
+    active_nodes,
+    file_id,
+    chunk_index,
+    replicas,
+    removed_paths,
+    added
+):
+    """
+    Copy one chunk onto enough online nodes. Row changes are staged
+    in the session; new Chunk rows are appended to added and
+    released paths to removed_paths, for the caller to commit.
+    Returns the file status this chunk implies, or None.
+    """
+
+    online = {node.name for node in active_nodes}
+
+    # ------------- Find healthy replica -------------
+    valid = None
+
+    for replica in replicas:
+        if (
+            path_node_name(replica.chunk_path) in online
+            and verify_replica(
+                replica.chunk_path,
+                replica.chunk_hash,
+                codec=replica.codec
+            )
+        ):
+            valid = replica
+            break
+
+    if valid is None:
+        logger.error(
+            "No readable replica",
+            extra={"file_id": file_id, "chunk_index": chunk_index}
+        )
+        if not any(chunk_exists(r.chunk_path) for r in replicas):
+            return "DEAD"
+        return None
+
+    # ------------- Remove missing replicas from DB -------------
+    present = []
+
+    for replica in replicas:
+        if chunk_exists(replica.chunk_path):
+            present.append(replica)
+        else:
+            removed_paths.append(replica.chunk_path)
+            db.delete(replica)
+
+    # ------------- Ensure replication factor -------------
+    available = [
+        r for r in present
+        if path_node_name(r.chunk_path) in online
+    ]
+
+    valid_path = valid.chunk_path
+    valid_hash = valid.chunk_hash
+
+    needed = settings.REPLICATION_FACTOR - len(available)
+
+    targets = choose_nodes(
+        placement_key(file_id, chunk_index, valid_hash),
+        active_nodes,
+        needed,
+        exclude={path_node_name(r.chunk_path) for r in present}
+    )
+
+    # Fewer eligible nodes than missing copies: copy what fits,
+    # the chunk stays under-replicated
+    failed = len(targets) < needed
+
+    if failed:
+        logger.warning(
+            "Too few nodes for replicas",
+            extra={
+                "file_id": file_id,
+                "chunk_index": chunk_index,
+                "targets": len(targets),
+                "needed": needed
+            }
+        )
+
+    # chunk_size is the original size; the file on disk may be compressed
+    chunk_size = valid.chunk_size
+
+    if chunk_size is None:
+        chunk_size = stored_size(valid_path)
+
+    for node in targets:
+
+        # New copies keep the healthy replica's encoding
+        new_path = chunk_path_for(
+            node.name,
+            file_id,
+            chunk_index,
+            valid_hash,
+            valid.codec
+        )
+
+        # A failing target only costs this copy; the next scan retries
+        try:
+            copy_replica(valid_path, new_path)
+        except OSError as e:
+            failed = True
+            logger.warning(
+                "Replica copy failed",
+                extra={"chunk_path": new_path, "error": str(e)}
+            )
+            continue
+
+        added.append(Chunk(
+            file_id=file_id,
+            chunk_index=chunk_index,
+            chunk_hash=valid_hash,
+            chunk_path=new_path,
+            chunk_size=chunk_size,
+            codec=valid.codec
+        ))
+
+        REPLICAS_RESTORED.inc(action="recreated")
+
+        logger.info(
+            "Replica recreated",
+            extra={"file_id": file_id, "chunk_index": chunk_index, "node": node.name}
+        )
+
+    return None if failed else "HEALTHY"
+
+
+def rebuild_shards(
+    db: Session,
+    active_nodes,
+    file_id,
+    chunk_index,
+    code,
+    shards,
+    removed_paths,
+    added
+):
+    """
+    Erasure-coded counterpart of replicate_chunk: every shard
+    index without a copy on an online node is rebuilt from k
+    verified shards onto a node holding no shard of this chunk.
+    """
+
+    online = {node.name for node in active_nodes}
+
+    # ------------- Remove missing shards from DB -------------
+    present = []
+
+    for shard in shards:
+        if chunk_exists(shard.chunk_path):
+            present.append(shard)
+        else:
+            removed_paths.append(shard.chunk_path)
+            db.delete(shard)
+
+    available = {
+        s.shard_index for s in present
+        if path_node_name(s.chunk_path) in online
+    }
+
+    lost = [i for i in range(code.total_shards) if i not in available]
+
+    if not lost:
+        return "HEALTHY"
+
+    # ------------- Rebuild from k verified shards -------------
+    found = read_verified_shards(
+        [s for s in present if path_node_name(s.chunk_path) in online],
+        code.data_shards
+    )
+
+    if len(found) < code.data_shards:
+        logger.error(
+            "Too few readable shards",
+            extra={
+                "file_id": file_id,
+                "chunk_index": chunk_index,
+                "readable": len(found),
+                "needed": code.data_shards
+            }
+        )
+        if len({s.shard_index for s in present}) < code.data_shards:
+            return "DEAD"
+        return None
+
+    chunk_size = shards[0].chunk_size
+    rebuilt = code.rebuild(found)
+
+    # The chunk and its lost shards hash as one batch
+    chunk_hash, *lost_hashes = hash_many(
+        [code.decode(found, chunk_size)] + [rebuilt[i] for i in lost]
+    )
+    shard_hashes = dict(zip(lost, lost_hashes))
+
+    targets = choose_nodes(
+        placement_key(file_id, chunk_index, chunk_hash),
+        active_nodes,
+        len(lost),
+        exclude={path_node_name(s.chunk_path) for s in present}
+    )
+
+    # Fewer eligible nodes than lost shards: rebuild what fits,
+    # the chunk stays degraded
+    failed = len(targets) < len(lost)
+
+    if failed:
+        logger.warning(
+            "Too few nodes for shards",
+            extra={
+                "file_id": file_id,
+                "chunk_index": chunk_index,
+                "targets": len(targets),
+                "needed": len(lost)
+            }
+        )
+
+    for shard_index, node in zip(lost, targets):
+
+        shard = rebuilt[shard_index]
+        shard_hash = shard_hashes[shard_index]
+
+        new_path = chunk_path_for(
+            node.name,
+            file_id,
+            chunk_index,
+            shard_hash,
+            shard_index=shard_index
+        )
+
+        try:
+            write_replica(new_path, shard)
+        except OSError as e:
+            failed = True
+            logger.warning(
+                "Shard write failed",
+                extra={"chunk_path": new_path, "error": str(e)}
+            )
+            continue
+
+        added.append(Chunk(
+            file_id=file_id,
+            chunk_index=chunk_index,
+            chunk_hash=shard_hash,
+            chunk_path=new_path,
+            chunk_size=chunk_size,
+            shard_index=shard_index
+        ))
+
+        REPLICAS_RESTORED.inc(action="rebuilt_shard")
+
+        logger.info(
+            "Shard rebuilt",
+            extra={
+                "file_id": file_id,
+                "chunk_index": chunk_index,
+                "shard_index": shard_index,
+                "node": node.name
+            }
+        )
+
+    return None if failed else "HEALTHY"
+
+
+# --------------------------------------------------
+# Task: a node changed state, re-check its chunks
+# --------------------------------------------------
+def check_node_chunks(node_name):
+
+    db: Session = ReadSessionLocal()
+
+    try:
+
+        chunk_keys = (
+            db.query(Chunk.file_id, Chunk.chunk_index)
+            .join(ChunkReplica, ChunkReplica.chunk_path == Chunk.chunk_path)
+            .filter(ChunkReplica.node_name == node_name)
+            .distinct()
+            .all()
+        )
+
+    finally:
+        db.close()
+
+    for file_id, chunk_index in chunk_keys:
+        report_under_replicated(file_id, chunk_index)
+
+
+# --------------------------------------------------
+# Periodic scan (safety net for faults nobody reported)
+# Metadata and stat() only; replica contents are the
+# scrubber's job.
+# --------------------------------------------------
+def last_scan_stats():
+
+    with _scan_lock:
+        return dict(_scan_stats)
+
+
+def scan_for_under_replication():
+
+    with SCAN_SECONDS.time():
+        under_replicated = _scan_for_under_replication()
+
+    with _scan_lock:
+        _scan_stats["under_replicated_chunks"] = under_replicated
+        _scan_stats["scanned_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    publish("repair_scan", under_replicated_chunks=under_replicated)
+
+
+def _scan_for_under_replication():
+
+    under_replicated = 0
+
+    db: Session = ReadSessionLocal()
+
+    try:
+
+        online = {
+            name
+            for (name,) in db.query(Node.name).filter(AVAILABLE)
+        }
+
+        last_id = None
+
+        # Page through files; each page's replicas come from one query
+        while True:
+
+            query = db.query(File.id, File.storage_policy).order_by(File.id)
+
+            if last_id is not None:
+                query = query.filter(File.id > last_id)
+
+            codes = {
+                file_id: parse_storage_policy(policy)
+                for file_id, policy in query.limit(BATCH_SIZE)
+            }
+
+            if not codes:
+                break
+
+            file_ids = list(codes)
+            last_id = file_ids[-1]
+
+            rows = (
+                db.query(
+                    Chunk.file_id,
+                    Chunk.chunk_index,
+                    Chunk.chunk_path,
+                    Chunk.shard_index
+                )
+                .filter(Chunk.file_id.in_(file_ids))
+                .order_by(Chunk.file_id, Chunk.chunk_index)
+                .all()
+            )
+
+            # Don't hold the read transaction while stat()ing replicas
+            db.rollback()
+
+            for (file_id, chunk_index), replicas in itertools.groupby(
+                rows,
+                key=lambda row: (row.file_id, row.chunk_index)
+            ):
+
+                available = [
+                    r for r in replicas
+                    if path_node_name(r.chunk_path) in online
+                    and chunk_exists(r.chunk_path)
+                ]
+
+                code = codes[file_id]
+
+                # Erasure-coded chunks need every shard index once
+                if code is not None:
+                    missing = code.total_shards - len({r.shard_index for r in available})
+                else:
+                    missing = settings.REPLICATION_FACTOR - len(available)
+
+                if missing > 0:
+                    under_replicated += 1
+                    report_under_replicated(file_id, chunk_index)
+
+    finally:
+        db.close()
+
+    return under_replicated
+
+
+def scan_forever():
+
+    while True:
+
+        logger.debug("Running background scan")
+
+        try:
+            scan_for_under_replication()
+        except Exception:
+            logger.exception("Background scan failed")
+
+        time.sleep(settings.REPAIR_SCAN_INTERVAL)
+
+
+# --------------------------------------------------
+# Workers
+# --------------------------------------------------
+def run_task(kind, args):
+
+    if kind == NODE_CHANGED:
+        check_node_chunks(*args)
+        return
+
+    chunk_path, chunk_hash = args
+
+    with _chunk_lock(chunk_hash):
+        repair_replica(chunk_path, chunk_hash)
+
+
+def take_under_replicated(limit):
+    """
+    Pop up to limit more queued under-replicated tasks, stopping
+    as soon as higher-priority work shows up.
+    """
+
+    tasks = []
+
+    while len(tasks) < limit:
+
+        try:
+            task = _tasks.get_nowait()
+        except queue.Empty:
+            break
+
+        if task[0] != UNDER_REPLICATED:
+            _tasks.put(task)
+            _tasks.task_done()
+            break
+
+        tasks.append(task)
+
+    return tasks
+
+
+def repair_worker():
+
+    while True:
+
+        task = _tasks.get()
+        kind = task[0]
+
+        tasks = [task]
+
+        if kind == UNDER_REPLICATED:
+            tasks += take_under_replicated(settings.REPAIR_BATCH_SIZE - 1)
+
+        # Faults reported from now on queue a fresh run
+        with _pending_lock:
+            for _, _, key, _ in tasks:
+                _pending.discard(key)
+
+        started = time.perf_counter()
+        outcome = "ok"
+
+        try:
+            if kind == UNDER_REPLICATED:
+                ensure_replication([args for _, _, _, args in tasks])
+            else:
+                run_task(kind, task[3])
+
+        except Exception:
+            outcome = "error"
+            logger.exception(
+                "Repair task failed",
+                extra={"task": TASK_NAMES[kind], "key": task[2]}
+            )
+
+        finally:
+            REPAIR_TASK_SECONDS.observe(
+                time.perf_counter() - started,
+                task=TASK_NAMES[kind]
+            )
+            REPAIR_TASKS.inc(len(tasks), task=TASK_NAMES[kind], outcome=outcome)
+
+            for _ in tasks:
+                _tasks.task_done()
+
+
+# --------------------------------------------------
+# Start Repair Engine
+# --------------------------------------------------
+def start_repair_engine():
+
+    for _ in range(settings.REPAIR_WORKERS):
+        threading.Thread(target=repair_worker, daemon=True).start()
+
+    threading.Thread(target=scan_forever, daemon=True).start()
+
+    logger.info(
+        "Repair engine started",
+        extra={"workers": settings.REPAIR_WORKERS}
+    )
@@ -0,0 +1,381 @@
+import time
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.services.placement import path_node_name
+from app.services.node_health import read_rank
+from app.services.verify_cache import verify_replica
+from app.services.chunk_files import ChunkCorrupt
+from app.services.node_store import is_remote, stat_key, read_verified
+from app.services.metrics import CHUNK_READ_SECONDS, NODE_BYTES_READ
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of reading one replica
+READ_OK = "ok"
+READ_MISSING = "missing"
+READ_CORRUPT = "corrupt"
+
+
+# --------------------------------------------------
+# Per-node read pools
+# Like the write pools: a slow disk only queues its own
+# reads, and reads of different chunks proceed on
+# different nodes in parallel.
+# --------------------------------------------------
+_node_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_read_pool(node_name):
+
+    with _pools_lock:
+
+        pool = _node_pools.get(node_name)
+
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=settings.READ_WORKERS_PER_NODE,
+                thread_name_prefix=f"reader-{node_name}"
+            )
+            _node_pools[node_name] = pool
+
+        return pool
+
+
+# --------------------------------------------------
+# Reads in flight per node (replica choice)
+# --------------------------------------------------
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _add_inflight(node_name, delta):
+
+    with _inflight_lock:
+        _inflight[node_name] = _inflight.get(node_name, 0) + delta
+
+
+def get_inflight(node_name):
+
+    with _inflight_lock:
+        return _inflight.get(node_name, 0)
+
+
+# --------------------------------------------------
+# Recent replica read latencies; the hedge delay is a
+# percentile of them
+# --------------------------------------------------
+class ReadLatency:
+
+    def __init__(self, window, percentile, min_delay, default_delay):
+
+        self.samples = deque(maxlen=window)
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+
+        with self.lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self):
+
+        with self.lock:
+            samples = sorted(self.samples)
+
+        # Too few samples for a meaningful percentile
+        if len(samples) < 20:
+            return self.default_delay
+
+        index = min(
+            int(len(samples) * self.percentile / 100),
+            len(samples) - 1
+        )
+
+        return max(samples[index], self.min_delay)
+
+
+read_latency = ReadLatency(
+    window=500,
+    percentile=settings.DOWNLOAD_HEDGE_PERCENTILE,
+    min_delay=settings.DOWNLOAD_HEDGE_MIN_DELAY,
+    default_delay=settings.DOWNLOAD_HEDGE_DEFAULT_DELAY
+)
+
+
+def record_read(chunk_path, started, size):
+
+    elapsed = time.monotonic() - started
+    node_name = path_node_name(chunk_path)
+
+    read_latency.record(elapsed)
+    CHUNK_READ_SECONDS.observe(elapsed, node=node_name)
+
+    if size:
+        NODE_BYTES_READ.inc(size, node=node_name)
+
+
+# --------------------------------------------------
+# Read (verify) one replica
+# Hashing reads the whole chunk, which also leaves it in
+# the page cache for the zero-copy send that follows.
+# Compressed replicas are decoded here instead, and the
+# decoded bytes are what gets sent; so are replicas on
+# chunk servers, which decode and hash them on their own
+# cores before sending.
+# Returns (outcome, decoded bytes or None).
+# --------------------------------------------------
+def read_replica(chunk_path, chunk_hash, codec=None):
+
+    started = time.monotonic()
+    size = 0
+
+    try:
+
+        if codec is None and not is_remote(chunk_path):
+
+            stored_size = stat_key(chunk_path)[0]
+
+            if not verify_replica(chunk_path, chunk_hash):
+                return READ_CORRUPT, None
+
+            size = stored_size
+
+            return READ_OK, None
+
+        data = read_verified(chunk_path, chunk_hash, codec)
+
+        size = len(data)
+
+        return READ_OK, data
+
+    except FileNotFoundError:
+        return READ_MISSING, None
+
+    except ChunkCorrupt:
+        return READ_CORRUPT, None
+
+    except OSError as e:
+
+        # Unreadable counts as corrupt; repair rewrites it
+        logger.warning(
+            "Replica read failed",
+            extra={"chunk_path": chunk_path, "error": str(e)}
+        )
+        return READ_CORRUPT, None
+
+    finally:
+        record_read(chunk_path, started, size)
+
+
+def read_shard(chunk_path, shard_hash):
+    """
+    Read one erasure-coded shard. Returns (outcome, shard bytes or None).
+    """
+
+    started = time.monotonic()
+    size = 0
+
+    try:
+
+        data = read_verified(chunk_path, shard_hash)
+
+        size = len(data)
+
+        return READ_OK, data
+
+    except FileNotFoundError:
+        return READ_MISSING, None
+
+    except ChunkCorrupt:
+        return READ_CORRUPT, None
+
+    except OSError as e:
+
+        logger.warning(
+            "Shard read failed",
+            extra={"chunk_path": chunk_path, "error": str(e)}
+        )
+        return READ_CORRUPT, None
+
+    finally:
+        record_read(chunk_path, started, size)
+
+
+def order_replicas(replicas, rotation):
+    """
+    Healthy nodes before suspect and down ones, then least busy
+    first; ties rotate with the chunk index so consecutive chunks
+    start on different nodes.
+    """
+
+    count = len(replicas)
+
+    return [
+        replica
+        for _, _, _, replica in sorted(
+            (
+                read_rank(path_node_name(replica[0])),
+                get_inflight(path_node_name(replica[0])),
+                (position - rotation) % count,
+                replica
+            )
+            for position, replica in enumerate(replicas)
+        )
+    ]
+
+
+def _submit_read(read, chunk_path, *args):
+
+    node_name = path_node_name(chunk_path)
+
+    _add_inflight(node_name, 1)
+
+    def run():
+        try:
+            return read(chunk_path, *args)
+        finally:
+            _add_inflight(node_name, -1)
+
+    return asyncio.wrap_future(get_read_pool(node_name).submit(run))
+
+
+# --------------------------------------------------
+# Fetch one chunk: read the preferred replica, and if it
+# is slower than the hedge delay also read the next one;
+# the first verified replica wins. Faulty replicas move
+# on to the next candidate.
+# replicas are (chunk_path, chunk_hash, codec) tuples.
+# Returns (healthy_path or None, data, missing, corrupt)
+# where data is the decoded chunk for a compressed replica
+# (None: send the file itself) and missing/corrupt are
+# lists of replica tuples.
+# --------------------------------------------------
+async def fetch_chunk(replicas, rotation):
+
+    candidates = deque(order_replicas(replicas, rotation))
+
+    pending = {}
+    missing = []
+    corrupt = []
+    hedged = False
+
+    def start_next():
+        replica = candidates.popleft()
+        pending[_submit_read(read_replica, *replica)] = replica
+
+    start_next()
+
+    while pending:
+
+        timeout = None
+
+        if candidates and not hedged:
+            timeout = read_latency.hedge_delay()
+
+        done, _ = await asyncio.wait(
+            pending,
+            timeout=timeout,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if not done:
+            # Slow read: hedge with the next replica
+            hedged = True
+            start_next()
+            continue
+
+        for future in done:
+
+            replica = pending.pop(future)
+            outcome, data = future.result()
+
+            if outcome == READ_OK:
+                # A losing hedged read finishes in the background
+                return replica[0], data, missing, corrupt
+
+            if outcome == READ_MISSING:
+                missing.append(replica)
+            else:
+                corrupt.append(replica)
+
+        if not pending and candidates:
+            start_next()
+
+    return None, None, missing, corrupt
+
+
+# --------------------------------------------------
+# Fetch one erasure-coded chunk: read k shards in
+# parallel (data shards first, which need no decoding),
+# moving on to parity shards for every shard that is
+# missing or corrupt, then decode.
+# shards are (chunk_path, shard_hash, shard_index) tuples.
+# Returns (chunk bytes or None, missing, corrupt).
+# --------------------------------------------------
+async def fetch_shards(shards, code, chunk_size):
+
+    k = code.data_shards
+
+    candidates = deque(sorted(
+        shards,
+        key=lambda shard: (
+            shard[2] >= k,
+            get_inflight(path_node_name(shard[0])),
+            shard[2]
+        )
+    ))
+
+    pending = {}
+    found = {}
+    missing = []
+    corrupt = []
+
+    while len(found) < k:
+
+        while candidates and len(found) + len(pending) < k:
+
+            chunk_path, shard_hash, shard_index = shard = candidates.popleft()
+
+            if shard_index not in found:
+                pending[_submit_read(read_shard, chunk_path, shard_hash)] = shard
+
+        if not pending:
+            break
+
+        done, _ = await asyncio.wait(
+            pending,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+
+        for future in done:
+
+            shard = pending.pop(future)
+            outcome, data = future.result()
+
+            if outcome == READ_OK:
+                found.setdefault(shard[2], data)
+            elif outcome == READ_MISSING:
+                missing.append(shard)
+            else:
+                corrupt.append(shard)
+
+    if len(found) < k:
+        return None, missing, corrupt
+
+    data = await asyncio.get_running_loop().run_in_executor(
+        None,
+        code.decode,
+        found,
+        chunk_size
+    )
+
+    return data, missing, corrupt
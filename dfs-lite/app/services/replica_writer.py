@@ -0,0 +1,328 @@
+import time
+import asyncio
+import logging
+import threading
+
+from collections import deque
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.config import settings
+from app.services.placement import add_node_load, path_node_name
+from app.services.node_store import write_stored, copy_stored
+from app.services.chunk_store import remove_chunk_files, release_pinned
+from app.services.metrics import CHUNK_WRITE_SECONDS, NODE_BYTES_WRITTEN
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------
+# Per-node write pools
+# Each storage node gets its own bounded pool so a slow
+# disk only queues its own writes.
+# --------------------------------------------------
+_node_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_node_pool(node_name):
+
+    with _pools_lock:
+
+        pool = _node_pools.get(node_name)
+
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=settings.WRITE_WORKERS_PER_NODE,
+                thread_name_prefix=f"writer-{node_name}"
+            )
+            _node_pools[node_name] = pool
+
+        return pool
+
+
+# --------------------------------------------------
+# Write one replica to its node (a local directory or a
+# chunk server). A node whose storage root is gone (lost
+# disk, unmounted volume) fails the write instead of
+# recreating the root on whatever is underneath.
+# --------------------------------------------------
+def write_replica(chunk_path, chunk_data):
+
+    started = time.perf_counter()
+
+    logger.debug("Writing replica", extra={"chunk_path": chunk_path})
+
+    write_stored(chunk_path, chunk_data)
+
+    node_name = path_node_name(chunk_path)
+
+    CHUNK_WRITE_SECONDS.observe(time.perf_counter() - started, node=node_name)
+    NODE_BYTES_WRITTEN.inc(len(chunk_data), node=node_name)
+
+    return chunk_path
+
+
+# --------------------------------------------------
+# Copy a healthy replica over a missing/corrupted one
+# --------------------------------------------------
+def copy_replica(source_path, chunk_path):
+
+    copy_stored(source_path, chunk_path)
+
+    return chunk_path
+
+
+# --------------------------------------------------
+# Replica writes of a single chunk
+# --------------------------------------------------
+class ChunkWrite:
+
+    def __init__(self, chunk_index, chunk_hash, chunk_size, targets, quorum,
+                 codec=None, shard_index=None):
+
+        self.chunk_index = chunk_index
+        self.chunk_hash = chunk_hash
+        self.chunk_size = chunk_size
+        self.codec = codec
+        self.shard_index = shard_index
+        self.targets = [path for _, path in targets]
+
+        # Reused stored copies whose references were taken up front
+        self.pinned = False
+        self.quorum = min(quorum, len(targets))
+
+        self.succeeded = []
+        self.failed = []
+        self.pending = len(targets)
+
+        # Resolves to True/False once quorum is reached or impossible
+        self.quorum_future = Future()
+
+        # Resolves once every replica write has finished
+        self.done_future = Future()
+
+        self._lock = threading.Lock()
+
+    def on_write_done(self, chunk_path, future):
+
+        with self._lock:
+
+            self.pending -= 1
+
+            error = future.exception()
+
+            if error is None:
+                self.succeeded.append(chunk_path)
+            else:
+                self.failed.append(chunk_path)
+                logger.warning(
+                    "Replica write failed",
+                    extra={"chunk_path": chunk_path, "error": str(error)}
+                )
+
+            reached = len(self.succeeded) >= self.quorum
+            impossible = len(self.succeeded) + self.pending < self.quorum
+            settle_quorum = (
+                (reached or impossible)
+                and not self.quorum_future.done()
+            )
+            all_done = self.pending == 0
+
+        if settle_quorum:
+            self.quorum_future.set_result(reached)
+
+        if all_done:
+            self.done_future.set_result(True)
+
+    def recorded_paths(self):
+
+        # Pending writes are recorded optimistically; if one of them
+        # fails later the replica is simply missing and gets healed.
+        with self._lock:
+            return [
+                path for path in self.targets
+                if path not in self.failed
+            ]
+
+
+def _on_replica_written(chunk_write, node_name, chunk_path, future):
+
+    add_node_load(node_name, -1)
+    chunk_write.on_write_done(chunk_path, future)
+
+
+# --------------------------------------------------
+# Fan-out writer for one upload
+# --------------------------------------------------
+class ReplicaWriter:
+
+    def __init__(self, quorum=None, max_in_flight=None):
+
+        self.quorum = quorum or settings.WRITE_QUORUM
+        self.max_in_flight = max_in_flight or settings.MAX_INFLIGHT_CHUNKS
+
+        self.chunk_writes = []
+        self._in_flight = deque()
+
+    def _trim_in_flight(self):
+
+        while self._in_flight and self._in_flight[0].done_future.done():
+            self._in_flight.popleft()
+
+    def wait_for_capacity(self):
+
+        # Backpressure: never hold more than max_in_flight chunks
+        # in memory while their replicas are being written.
+        self._trim_in_flight()
+
+        while len(self._in_flight) >= self.max_in_flight:
+            self._in_flight.popleft().done_future.result()
+            self._trim_in_flight()
+
+    async def wait_for_capacity_async(self):
+
+        # Same as wait_for_capacity, but yields to the event loop
+        self._trim_in_flight()
+
+        while len(self._in_flight) >= self.max_in_flight:
+            await asyncio.wrap_future(
+                self._in_flight.popleft().done_future
+            )
+            self._trim_in_flight()
+
+    def submit(self, chunk_index, chunk_hash, chunk_data, targets,
+               codec=None, chunk_size=None, shard_index=None):
+        """
+        targets: list of (node_name, chunk_path) pairs
+        chunk_data is written as-is; for compressed chunks and
+        erasure-coded shards pass the original chunk_size.
+        """
+
+        if not targets:
+            raise Exception(
+                f"No storage nodes available for chunk {chunk_index}"
+            )
+
+        self.wait_for_capacity()
+
+        chunk_write = ChunkWrite(
+            chunk_index,
+            chunk_hash,
+            len(chunk_data) if chunk_size is None else chunk_size,
+            targets,
+            self.quorum,
+            codec,
+            shard_index
+        )
+
+        for node_name, chunk_path in targets:
+
+            # Placement steers new chunks away from busy nodes
+            add_node_load(node_name, 1)
+
+            future = get_node_pool(node_name).submit(
+                write_replica,
+                chunk_path,
+                chunk_data
+            )
+
+            future.add_done_callback(
+                partial(
+                    _on_replica_written,
+                    chunk_write,
+                    node_name,
+                    chunk_path
+                )
+            )
+
+        self.chunk_writes.append(chunk_write)
+        self._in_flight.append(chunk_write)
+
+        return chunk_write
+
+    def reuse(self, chunk_index, chunk_hash, chunk_size, chunk_paths,
+              codec=None, pinned=False):
+
+        # Chunk content is already stored; reference it without writing.
+        # pinned: one reference per path is already held (pin_stored_paths)
+        chunk_write = ChunkWrite(
+            chunk_index,
+            chunk_hash,
+            chunk_size,
+            [(None, path) for path in chunk_paths],
+            self.quorum,
+            codec
+        )
+
+        chunk_write.pinned = pinned
+
+        chunk_write.pending = 0
+        chunk_write.quorum_future.set_result(True)
+        chunk_write.done_future.set_result(True)
+
+        self.chunk_writes.append(chunk_write)
+
+        return chunk_write
+
+    def finish(self):
+
+        # Wait until every chunk reached its write quorum
+        for chunk_write in self.chunk_writes:
+
+            if not chunk_write.quorum_future.result():
+                raise Exception(
+                    f"Write quorum not reached for chunk {chunk_write.chunk_index}"
+                )
+
+        return self.chunk_metadata()
+
+    async def finish_async(self):
+
+        for chunk_write in self.chunk_writes:
+
+            reached = await asyncio.wrap_future(
+                chunk_write.quorum_future
+            )
+
+            if not reached:
+                raise Exception(
+                    f"Write quorum not reached for chunk {chunk_write.chunk_index}"
+                )
+
+        return self.chunk_metadata()
+
+    def chunk_metadata(self):
+
+        return [
+            {
+                "chunk_index": chunk_write.chunk_index,
+                "chunk_hash": chunk_write.chunk_hash,
+                "chunk_size": chunk_write.chunk_size,
+                "codec": chunk_write.codec,
+                "shard_index": chunk_write.shard_index,
+                "chunk_paths": chunk_write.recorded_paths(),
+                "pinned": chunk_write.pinned
+            }
+            for chunk_write in self.chunk_writes
+        ]
+
+    def abort(self):
+
+        # Let in-flight writes settle, then drop what was written
+        # (unless another upload referenced the same content address)
+        # and the references held on reused copies
+        written = []
+        pinned = []
+
+        for chunk_write in self.chunk_writes:
+
+            chunk_write.done_future.result()
+
+            written += chunk_write.succeeded
+
+            if chunk_write.pinned:
+                pinned += chunk_write.targets
+
+        release_pinned(pinned)
+        remove_chunk_files(written)
@@ -0,0 +1,305 @@
+import time
+import logging
+import threading
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.replica import ChunkReplica
+from app.services.repair import report_corrupt_replica, report_missing_replica
+from app.services.verify_cache import verify_replica
+from app.services.node_store import stored_size
+from app.services.hashing import submit, hash_workers
+from app.services.metrics import SCRUB_REPLICAS
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow():
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --------------------------------------------------
+# Disk read budget (token bucket, bytes per second)
+# --------------------------------------------------
+class RateLimiter:
+
+    def __init__(self, rate):
+
+        self.rate = rate
+        self.allowance = rate
+        self.last = time.monotonic()
+
+    def consume(self, amount):
+
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+
+        self.allowance = min(
+            self.rate,
+            self.allowance + (now - self.last) * self.rate
+        )
+        self.last = now
+
+        self.allowance -= amount
+
+        if self.allowance < 0:
+            time.sleep(-self.allowance / self.rate)
+
+
+# --------------------------------------------------
+# Incremental scrubber
+# Walks chunk_replicas in keyset-paginated batches:
+# first replicas that were never verified (by id), then
+# replicas whose last verification is older than
+# SCRUB_REVERIFY_AFTER (oldest first). verified_at is
+# persisted, so a restart resumes with the stalest data.
+# Faults are handed to the repair engine.
+# --------------------------------------------------
+class Scrubber:
+
+    def __init__(self):
+
+        self.limiter = RateLimiter(settings.SCRUB_MAX_BYTES_PER_SEC)
+
+        # (phase, verified_at, id) of the last replica scrubbed
+        self.cursor = None
+        self.pass_started = None
+
+        self.scanned = 0
+        self.reported = 0
+
+    def start_pass(self):
+
+        self.cursor = ("new", None, 0)
+        self.pass_started = utcnow()
+        self.scanned = 0
+        self.reported = 0
+
+    def next_batch(self, db: Session):
+
+        phase, verified_at, last_id = self.cursor
+
+        if phase == "new":
+
+            batch = (
+                db.query(ChunkReplica)
+                .filter(ChunkReplica.verified_at == None)
+                .filter(ChunkReplica.id > last_id)
+                .order_by(ChunkReplica.id)
+                .limit(settings.SCRUB_BATCH_SIZE)
+                .all()
+            )
+
+            if batch:
+                return batch
+
+            phase, verified_at, last_id = self.cursor = ("stale", None, 0)
+
+        cutoff = self.pass_started - timedelta(
+            seconds=settings.SCRUB_REVERIFY_AFTER
+        )
+
+        query = db.query(ChunkReplica).filter(
+            ChunkReplica.verified_at < cutoff
+        )
+
+        if verified_at is not None:
+            query = query.filter(or_(
+                ChunkReplica.verified_at > verified_at,
+                and_(
+                    ChunkReplica.verified_at == verified_at,
+                    ChunkReplica.id > last_id
+                )
+            ))
+
+        return (
+            query
+            .order_by(ChunkReplica.verified_at, ChunkReplica.id)
+            .limit(settings.SCRUB_BATCH_SIZE)
+            .all()
+        )
+
+    def start_check(self, replica):
+        """
+        Queue the hash check of one replica on the hashing pool.
+        Returns its future, or None for a missing replica.
+        """
+
+        path = replica.chunk_path
+
+        try:
+            size = stored_size(path)
+        except FileNotFoundError:
+            logger.warning("Scrub found missing replica", extra={"chunk_path": path})
+            SCRUB_REPLICAS.inc(result="missing")
+            report_missing_replica(path, replica.chunk_hash)
+            self.reported += 1
+            return None
+
+        # The read budget is spent here, so hashing threads never sleep
+        self.limiter.consume(size)
+
+        # Always read the disk here; the cache only helps reads
+        return submit(
+            verify_replica,
+            path,
+            replica.chunk_hash,
+            use_cache=False,
+            codec=replica.codec
+        )
+
+    def finish_check(self, replica, future):
+        """
+        Returns True when the replica verified clean.
+        """
+
+        if future.result():
+            SCRUB_REPLICAS.inc(result="clean")
+            return True
+
+        path = replica.chunk_path
+
+        logger.warning("Scrub found corrupt replica", extra={"chunk_path": path})
+        SCRUB_REPLICAS.inc(result="corrupt")
+        report_corrupt_replica(path, replica.chunk_hash)
+
+        self.reported += 1
+
+        return False
+
+    def read_failed(self, replica, error):
+
+        SCRUB_REPLICAS.inc(result="error")
+        logger.warning(
+            "Scrub read failed",
+            extra={"chunk_path": replica.chunk_path, "error": str(error)}
+        )
+
+    def mark_verified(self, replica_ids, verified_at):
+
+        db: Session = SessionLocal()
+
+        try:
+
+            db.query(ChunkReplica).filter(
+                ChunkReplica.id.in_(replica_ids)
+            ).update(
+                {ChunkReplica.verified_at: verified_at},
+                synchronize_session=False
+            )
+
+            db.commit()
+
+        finally:
+            db.close()
+
+    def run_batch(self):
+        """
+        Scrub one batch. Returns the number of replicas looked at;
+        0 means the pass is complete.
+        """
+
+        if self.cursor is None:
+            self.start_pass()
+
+        # The batch is read without holding a transaction open
+        # while replicas are hashed; results are written in one
+        # short write transaction afterwards
+        db: Session = ReadSessionLocal()
+
+        try:
+            batch = self.next_batch(db)
+        finally:
+            db.close()
+
+        if not batch:
+
+            if self.scanned:
+                logger.info(
+                    "Scrub pass complete",
+                    extra={"checked": self.scanned, "reported": self.reported}
+                )
+
+            self.cursor = None
+            return 0
+
+        last = batch[-1]
+        next_cursor = (self.cursor[0], last.verified_at, last.id)
+
+        verified = []
+        workers = hash_workers()
+
+        # Replicas are verified in parallel, one per hashing thread
+        # at a time, so uploads and downloads are never queued
+        # behind a whole batch
+        for start in range(0, len(batch), workers):
+
+            checks = []
+
+            for replica in batch[start:start + workers]:
+
+                try:
+                    future = self.start_check(replica)
+                except OSError as e:
+                    self.read_failed(replica, e)
+                    continue
+
+                if future is not None:
+                    checks.append((replica, future))
+
+            for replica, future in checks:
+
+                try:
+                    if self.finish_check(replica, future):
+                        verified.append(replica.id)
+                except OSError as e:
+                    self.read_failed(replica, e)
+
+        if verified:
+            self.mark_verified(verified, utcnow())
+
+        self.cursor = next_cursor
+        self.scanned += len(batch)
+
+        return len(batch)
+
+
+def scrub_forever():
+
+    scrubber = Scrubber()
+
+    while True:
+
+        try:
+            scanned = scrubber.run_batch()
+
+        except Exception:
+
+            logger.exception("Scrub batch failed")
+            scanned = 0
+
+        if not scanned:
+            time.sleep(settings.SCRUB_IDLE_SLEEP)
+
+
+# --------------------------------------------------
+# Start Background Scrubber
+# --------------------------------------------------
+def start_scrubber():
+
+    thread = threading.Thread(
+        target=scrub_forever,
+        daemon=True
+    )
+
+    thread.start()
+
+    logger.info("Background scrubber started")
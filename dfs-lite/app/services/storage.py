@@ -1,52 +1,55 @@
-import os
-import hashlib
+import logging
+
+from itertools import count
 
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.database import SessionLocal
 from app.models.node import Node
+from app.config import settings
+from app.services.placement import choose_nodes
+from app.services.node_health import AVAILABLE
+from app.services.chunk_store import (
+    content_addressed,
+    chunk_path_for,
+    placement_key,
+    lookup_stored_paths,
+    pin_stored_paths
+)
+from app.services.replica_writer import ReplicaWriter
+from app.services.chunker import make_chunker
+from app.services.codecs import encode_chunk, encode_many
+from app.services.hashing import sha256_hex, hash_many
+from app.services.metrics import BYTES_IN, CHUNK_HASH_SECONDS
 
-CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Read size for file-like sources (several chunks per read)
+READ_SIZE = settings.UPLOAD_READ_SIZE
 
 
 # --------------------------------------------------
-# REAL PROJECT ROOT
-# storage.py -> services -> app -> dfs-lite
+# REAL PROJECT ROOT (resolved in app/config.py)
 # --------------------------------------------------
-BASE_DIR = os.path.dirname(
-    os.path.dirname(
-        os.path.dirname(
-            os.path.abspath(__file__)
-        )
-    )
-)
+STORAGE_DIR = settings.STORAGE_DIR
 
-STORAGE_DIR = os.path.join(
-    BASE_DIR,
-    "storage"
-)
-
-print("BASE_DIR =", BASE_DIR)
-print("STORAGE_DIR =", STORAGE_DIR)
+logger = logging.getLogger(__name__)
 
 
 # --------------------------------------------------
-# SAVE FILE IN CHUNKS
+# ONLINE NODES
 # --------------------------------------------------
-def save_file_in_chunks(file, file_id):
+def get_online_nodes():
 
     db: Session = SessionLocal()
 
     try:
 
         # Get ONLINE nodes from database
-        online_nodes = db.query(Node).filter(
-            Node.is_online == True
-        ).all()
+        online_nodes = db.query(Node).filter(AVAILABLE).all()
 
-        print(
-            "ONLINE NODES:",
-            [node.name for node in online_nodes]
+        logger.debug(
+            "Online nodes",
+            extra={"nodes": [node.name for node in online_nodes]}
         )
 
         # No nodes available
@@ -55,85 +58,443 @@ def save_file_in_chunks(file, file_id):
                 "No storage nodes online"
             )
 
-        total_size = 0
-        total_chunks = 0
+        return online_nodes
+
+    finally:
+
+        db.close()
+
+
+# --------------------------------------------------
+# REPLICA TARGETS FOR ONE CHUNK
+# --------------------------------------------------
+def chunk_targets(online_nodes, file_id, chunk_index, chunk_hash, codec=None):
+
+    # Exactly REPLICATION_FACTOR online nodes per chunk
+    nodes = choose_nodes(
+        placement_key(file_id, chunk_index, chunk_hash),
+        online_nodes,
+        settings.REPLICATION_FACTOR
+    )
+
+    return [
+        (
+            node.name,
+            chunk_path_for(
+                node.name,
+                file_id,
+                chunk_index,
+                chunk_hash,
+                codec
+            )
+        )
+        for node in nodes
+    ]
+
+
+# --------------------------------------------------
+# HASH INCOMING CHUNK DATA
+# --------------------------------------------------
+def hash_chunk(chunk_data):
+
+    with CHUNK_HASH_SECONDS.time(node="ingest"):
+        return sha256_hex(chunk_data)
+
+
+def hash_chunks(chunks):
+
+    # One batch on the hashing pool: the chunks hash in parallel
+    with CHUNK_HASH_SECONDS.time(node="ingest"):
+        return hash_many(chunks)
+
+
+# --------------------------------------------------
+# ERASURE-CODED CHUNK: k+m shards on distinct nodes
+# --------------------------------------------------
+def require_shard_nodes(online_nodes, code):
+
+    if code is not None and len(online_nodes) < code.total_shards:
+        raise Exception(
+            f"Storage policy {code.spec} needs {code.total_shards} "
+            f"online nodes, {len(online_nodes)} available"
+        )
+
+
+def stage_shards(writer, online_nodes, file_id, chunk_index, chunk_data, code,
+                 chunk_hash=None):
+
+    chunk_hash = chunk_hash or hash_chunk(chunk_data)
+
+    shards = code.encode(chunk_data)
+
+    nodes = choose_nodes(
+        placement_key(file_id, chunk_index, chunk_hash),
+        online_nodes,
+        code.total_shards
+    )
+
+    require_shard_nodes(nodes, code)
+
+    shard_hashes = hash_chunks(shards)
+
+    for shard_index, (node, shard, shard_hash) in enumerate(
+        zip(nodes, shards, shard_hashes)
+    ):
+
+        writer.submit(
+            chunk_index,
+            shard_hash,
+            shard,
+            [(
+                node.name,
+                chunk_path_for(
+                    node.name,
+                    file_id,
+                    chunk_index,
+                    shard_hash,
+                    shard_index=shard_index
+                )
+            )],
+            chunk_size=len(chunk_data),
+            shard_index=shard_index
+        )
+
+
+# --------------------------------------------------
+# HASH ONE CHUNK AND HAND IT TO THE WRITER
+# In content mode, chunks already stored (in this upload
+# or any earlier one) are referenced instead of written.
+# Copies from earlier uploads are pinned (referenced) right
+# away, so a concurrent delete cannot unlink them before
+# this upload's rows exist; if none is still referenced
+# the chunk is written again.
+# New chunks are compressed (settings.COMPRESSION) before
+# they are fanned out; the hash is over the original bytes.
+# Callers that already hashed the chunk pass chunk_hash.
+# --------------------------------------------------
+def reuse_stored(writer, chunk_index, chunk_size, chunk_hash, stored):
+    """
+    Reference a stored copy instead of writing the chunk (content
+    mode only). Returns False if the chunk has to be written.
+    """
+
+    if not content_addressed():
+        return False
+
+    pinned = False
+
+    if chunk_hash not in stored:
+
+        codec, paths = lookup_stored_paths(chunk_hash)
+
+        if paths:
+            paths = pin_stored_paths(paths)
+            pinned = True
+
+        stored[chunk_hash] = (codec, paths)
+
+    codec, paths = stored[chunk_hash]
+
+    if not paths:
+        return False
+
+    # Later repeats in this upload are covered by the pin (or
+    # by this upload's own write)
+    writer.reuse(chunk_index, chunk_hash, chunk_size, paths, codec, pinned)
+
+    return True
+
+
+def stage_chunk(writer, online_nodes, file_id, chunk_index, chunk_data, stored,
+                chunk_hash=None):
+
+    chunk_hash = chunk_hash or hash_chunk(chunk_data)
+
+    if reuse_stored(writer, chunk_index, len(chunk_data), chunk_hash, stored):
+        return
+
+    write_new_chunk(
+        writer,
+        online_nodes,
+        file_id,
+        chunk_index,
+        len(chunk_data),
+        chunk_hash,
+        encode_chunk(chunk_data),
+        stored
+    )
+
+
+def write_new_chunk(writer, online_nodes, file_id, chunk_index, chunk_size,
+                    chunk_hash, encoded, stored):
 
-        chunk_metadata = []
+    codec, stored_data = encoded
 
-        chunk_index = 0
+    targets = chunk_targets(
+        online_nodes,
+        file_id,
+        chunk_index,
+        chunk_hash,
+        codec
+    )
+
+    writer.submit(
+        chunk_index,
+        chunk_hash,
+        stored_data,
+        targets,
+        codec=codec,
+        chunk_size=chunk_size
+    )
+
+    stored[chunk_hash] = (codec, [path for _, path in targets])
+
+
+# --------------------------------------------------
+# STAGE A BATCH OF CHUNKS
+# stage_chunk for consecutive chunks, except that every
+# chunk to be written is compressed in one batch on the
+# pool. Reuse is resolved first, so referenced chunks are
+# never compressed; repeats of a chunk first written in
+# this batch reference it once it has been submitted.
+# --------------------------------------------------
+def stage_chunks(writer, online_nodes, file_id, first_index, chunks, chunk_hashes,
+                 stored):
+
+    new_chunks = []
+    repeats = []
+    new_hashes = set()
+
+    for chunk_index, chunk_data, chunk_hash in zip(
+        count(first_index), chunks, chunk_hashes
+    ):
+
+        if chunk_hash in new_hashes:
+            repeats.append((chunk_index, len(chunk_data), chunk_hash))
+
+        elif not reuse_stored(
+            writer, chunk_index, len(chunk_data), chunk_hash, stored
+        ):
+            new_chunks.append((chunk_index, chunk_data, chunk_hash))
+
+            if content_addressed():
+                new_hashes.add(chunk_hash)
+
+    encoded_chunks = encode_many([chunk_data for _, chunk_data, _ in new_chunks])
+
+    for (chunk_index, chunk_data, chunk_hash), encoded in zip(
+        new_chunks, encoded_chunks
+    ):
+        write_new_chunk(
+            writer,
+            online_nodes,
+            file_id,
+            chunk_index,
+            len(chunk_data),
+            chunk_hash,
+            encoded,
+            stored
+        )
+
+    for chunk_index, chunk_size, chunk_hash in repeats:
+        reuse_stored(writer, chunk_index, chunk_size, chunk_hash, stored)
+
+
+# --------------------------------------------------
+# SAVE FILE IN CHUNKS
+# code: ReedSolomon for erasure-coded files, None to replicate
+# --------------------------------------------------
+def save_file_in_chunks(file, file_id, chunker=None, code=None):
+
+    online_nodes = get_online_nodes()
+    require_shard_nodes(online_nodes, code)
+
+    chunker = chunker or make_chunker()
+
+    total_size = 0
+    total_chunks = 0
+
+    writer = ReplicaWriter()
+
+    stored = {}
+
+    def submit_chunks(chunks):
+
+        nonlocal total_chunks
+
+        chunk_hashes = hash_chunks(chunks)
+
+        if code is None:
+            stage_chunks(
+                writer,
+                online_nodes,
+                file_id,
+                total_chunks,
+                chunks,
+                chunk_hashes,
+                stored
+            )
+            total_chunks += len(chunks)
+            return
+
+        for chunk_data, chunk_hash in zip(chunks, chunk_hashes):
+
+            stage_shards(
+                writer,
+                online_nodes,
+                file_id,
+                total_chunks,
+                chunk_data,
+                code,
+                chunk_hash
+            )
+
+            total_chunks += 1
+
+    try:
 
         while True:
 
-            chunk_data = file.read(CHUNK_SIZE)
+            # Next piece is read while earlier chunks are still
+            # being written by the node pools
+            data = file.read(READ_SIZE)
 
             # EOF
-            if not chunk_data:
+            if not data:
                 break
 
-            print(
-                f"\nPROCESSING CHUNK {chunk_index}"
-            )
+            total_size += len(data)
+            BYTES_IN.inc(len(data))
 
-            total_size += len(chunk_data)
+            submit_chunks(chunker.feed(data))
 
-            chunk_hash = hashlib.sha256(
-                chunk_data
-            ).hexdigest()
+        # Trailing partial chunk
+        submit_chunks(chunker.flush())
 
-            chunk_paths = []
+        chunk_metadata = writer.finish()
 
-            # Replicate ONLY to online nodes
-            for node in online_nodes:
+    except Exception:
 
-                node_path = os.path.join(
-                    STORAGE_DIR,
-                    node.name
-                )
+        writer.abort()
+        raise
 
-                os.makedirs(
-                    node_path,
-                    exist_ok=True
-                )
+    return (
+        total_size,
+        total_chunks,
+        chunk_metadata
+    )
 
-                chunk_filename = (
-                    f"{file_id}_chunk_{chunk_index}"
-                )
 
-                chunk_path = os.path.join(
-                    node_path,
-                    chunk_filename
-                )
+# --------------------------------------------------
+# SAVE STREAM IN CHUNKS (async upload pipeline)
+# Bytes arrive from an async iterator, are collected into
+# UPLOAD_READ_SIZE pieces and cut into chunks; the chunks
+# of one piece are hashed in parallel off the event loop
+# and handed to the replica writer. Memory stays bounded
+# by MAX_INFLIGHT_CHUNKS.
+# --------------------------------------------------
+async def save_stream_in_chunks(stream, file_id, chunker=None, code=None):
 
-                print(
-                    "WRITING TO:",
-                    chunk_path
-                )
+    online_nodes = await run_in_threadpool(get_online_nodes)
+    require_shard_nodes(online_nodes, code)
 
-                with open(chunk_path, "wb") as f:
-                    f.write(chunk_data)
+    chunker = chunker or make_chunker()
 
-                print(
-                    "WRITE SUCCESS:",
-                    os.path.exists(chunk_path)
-                )
+    total_size = 0
+    total_chunks = 0
+
+    writer = ReplicaWriter()
+
+    stored = {}
 
-                chunk_paths.append(chunk_path)
+    async def submit_chunks(chunks):
 
-            chunk_metadata.append({
-                "chunk_index": chunk_index,
-                "chunk_hash": chunk_hash,
-                "chunk_paths": chunk_paths
-            })
+        nonlocal total_chunks
+
+        if not chunks:
+            return
+
+        chunk_hashes = await run_in_threadpool(hash_chunks, chunks)
+
+        if code is None:
+
+            # Backpressure before the batch is handed over
+            await writer.wait_for_capacity_async()
+
+            await run_in_threadpool(
+                stage_chunks,
+                writer,
+                online_nodes,
+                file_id,
+                total_chunks,
+                chunks,
+                chunk_hashes,
+                stored
+            )
+            total_chunks += len(chunks)
+            return
+
+        for chunk_data, chunk_hash in zip(chunks, chunk_hashes):
+
+            # Backpressure before another chunk is buffered
+            await writer.wait_for_capacity_async()
+
+            await run_in_threadpool(
+                stage_shards,
+                writer,
+                online_nodes,
+                file_id,
+                total_chunks,
+                chunk_data,
+                code,
+                chunk_hash
+            )
 
             total_chunks += 1
-            chunk_index += 1
 
-        return (
-            total_size,
-            total_chunks,
-            chunk_metadata
-        )
+    async def feed(data):
 
-    finally:
+        # Rolling-hash chunking is CPU work; keep it off the loop
+        if chunker.cpu_bound:
+            chunks = await run_in_threadpool(chunker.feed, data)
+        else:
+            chunks = chunker.feed(data)
 
-        db.close()
+        await submit_chunks(chunks)
+
+    try:
+
+        pending = []
+        pending_size = 0
+
+        async for data in stream:
+
+            total_size += len(data)
+            BYTES_IN.inc(len(data))
+
+            pending.append(data)
+            pending_size += len(data)
+
+            if pending_size >= READ_SIZE:
+                await feed(b"".join(pending))
+                pending = []
+                pending_size = 0
+
+        if pending:
+            await feed(b"".join(pending))
+
+        # Trailing partial chunk
+        await submit_chunks(chunker.flush())
+
+        chunk_metadata = await writer.finish_async()
+
+    except Exception:
+
+        await run_in_threadpool(writer.abort)
+        raise
+
+    return (
+        total_size,
+        total_chunks,
+        chunk_metadata
+    )
@@ -0,0 +1,664 @@
+import time
+import logging
+import threading
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.file import File
+from app.models.chunk import Chunk
+from app.models.upload_session import UploadSession, UploadChunk
+from app.services.replica_writer import ReplicaWriter, copy_replica
+from app.services.verify_cache import verify_replica
+from app.services.chunk_store import (
+    content_addressed,
+    lookup_stored_paths,
+    lookup_chunk_size,
+    acquire_refs,
+    new_refs,
+    take_existing_refs,
+    release_refs,
+    discard_unrecorded,
+    remove_chunk_files
+)
+from app.services.storage import (
+    get_online_nodes,
+    require_shard_nodes,
+    chunk_targets,
+    stage_chunk,
+    stage_shards,
+    hash_chunk
+)
+from app.services.erasure import parse_storage_policy
+from app.services.metrics import BYTES_IN
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionNotFound(Exception):
+    pass
+
+
+class InvalidChunk(Exception):
+    pass
+
+
+class ChunkConflict(Exception):
+    pass
+
+
+class IncompleteUpload(Exception):
+
+    def __init__(self, missing):
+
+        super().__init__(f"{len(missing)} chunks not uploaded")
+        self.missing = missing
+
+
+def utcnow():
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Striped locks: one chunk index of a session is stored at a time
+_chunk_locks = [threading.Lock() for _ in range(64)]
+
+
+def _chunk_lock(session_id, chunk_index):
+
+    return _chunk_locks[hash((session_id, chunk_index)) % len(_chunk_locks)]
+
+
+# --------------------------------------------------
+# Upload sessions
+# A file is uploaded as fixed-size chunks the client PUTs
+# by index (in parallel, in any order, each with its
+# SHA-256) and then committed. Stored chunks are recorded
+# in the database, so an interrupted upload resumes with
+# the missing chunks only, across restarts on both sides.
+# The session id becomes the file id, so chunk paths stay
+# valid on commit.
+# --------------------------------------------------
+def expected_chunk_size(session, chunk_index):
+
+    return min(
+        session.chunk_size,
+        session.total_size - chunk_index * session.chunk_size
+    )
+
+
+def expires_at(session):
+
+    return session.updated_at + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def create_session(db: Session, filename, owner, total_size, chunk_size, code):
+
+    if total_size < 0:
+        raise InvalidChunk("size must not be negative")
+
+    if not 0 < chunk_size <= settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise InvalidChunk(
+            f"chunk_size must be between 1 and {settings.UPLOAD_MAX_CHUNK_SIZE}"
+        )
+
+    session = UploadSession(
+        id=uuid4(),
+        filename=filename,
+        owner=owner,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        total_chunks=-(-total_size // chunk_size),
+        storage_policy=code.spec if code is not None else "replicated",
+        updated_at=utcnow()
+    )
+
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+
+    return session
+
+
+def get_session(db: Session, session_id):
+
+    session = db.query(UploadSession).filter(
+        UploadSession.id == session_id
+    ).first()
+
+    if session is None:
+        raise UploadSessionNotFound()
+
+    return session
+
+
+def received_chunks(db: Session, session_id):
+
+    return {
+        chunk_index
+        for (chunk_index,) in db.query(UploadChunk.chunk_index)
+        .filter(UploadChunk.session_id == session_id)
+        .distinct()
+    }
+
+
+def stored_content_hash(session_id, chunk_index):
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        return db.query(UploadChunk.content_hash).filter(
+            UploadChunk.session_id == session_id,
+            UploadChunk.chunk_index == chunk_index
+        ).limit(1).scalar()
+
+    finally:
+        db.close()
+
+
+def check_not_stored(session_id, chunk_index, content_hash):
+    """
+    True if the index still needs content; False if it already
+    holds this content. Other content raises ChunkConflict.
+    """
+
+    stored_hash = stored_content_hash(session_id, chunk_index)
+
+    if stored_hash is None:
+        return True
+
+    if stored_hash != content_hash:
+        raise ChunkConflict(
+            f"Chunk {chunk_index} was already uploaded with different content"
+        )
+
+    return False
+
+
+def check_chunk_index(session, chunk_index):
+
+    if not 0 <= chunk_index < session.total_chunks:
+        raise InvalidChunk(
+            f"chunk_index must be between 0 and {session.total_chunks - 1}"
+        )
+
+
+def touch_session(db: Session, session_id, idle_before=None):
+    """
+    Refresh the session's activity time. As the first write of a
+    transaction it also serializes chunk stores, commit and abort of
+    the session. Returns False if the session is gone (or, with
+    idle_before, was active since).
+    """
+
+    query = db.query(UploadSession).filter(UploadSession.id == session_id)
+
+    if idle_before is not None:
+        query = query.filter(UploadSession.updated_at < idle_before)
+
+    updated = query.update(
+        {UploadSession.updated_at: utcnow()},
+        synchronize_session=False
+    )
+
+    return updated > 0
+
+
+# --------------------------------------------------
+# Store one chunk
+# The chunk is verified against the client's hash before
+# anything is written. Storing an index again with the
+# same content is a no-op, so clients can simply retry.
+# Returns False if the chunk was already stored.
+# --------------------------------------------------
+def store_chunk(session_id, chunk_index, chunk_data, content_hash):
+
+    content_hash = content_hash.lower()
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        session = get_session(db, session_id)
+    finally:
+        db.close()
+
+    check_chunk_index(session, chunk_index)
+
+    expected = expected_chunk_size(session, chunk_index)
+
+    if len(chunk_data) != expected:
+        raise InvalidChunk(
+            f"Chunk {chunk_index} must be {expected} bytes, got {len(chunk_data)}"
+        )
+
+    if hash_chunk(chunk_data) != content_hash:
+        raise InvalidChunk(f"SHA-256 mismatch for chunk {chunk_index}")
+
+    BYTES_IN.inc(len(chunk_data))
+
+    with _chunk_lock(session_id, chunk_index):
+
+        if not check_not_stored(session_id, chunk_index, content_hash):
+            return False
+
+        chunk_metadata = write_chunk(session, chunk_index, chunk_data, content_hash)
+
+        try:
+            record_chunk(session_id, chunk_metadata, content_hash)
+        except Exception:
+            discard_unrecorded(chunk_metadata)
+            raise
+
+    return True
+
+
+def write_chunk(session, chunk_index, chunk_data, chunk_hash):
+
+    code = parse_storage_policy(session.storage_policy)
+
+    online_nodes = get_online_nodes()
+    require_shard_nodes(online_nodes, code)
+
+    writer = ReplicaWriter()
+
+    try:
+
+        if code is not None:
+            stage_shards(
+                writer,
+                online_nodes,
+                session.id,
+                chunk_index,
+                chunk_data,
+                code,
+                chunk_hash
+            )
+        else:
+            stage_chunk(
+                writer,
+                online_nodes,
+                session.id,
+                chunk_index,
+                chunk_data,
+                {},
+                chunk_hash
+            )
+
+        return writer.finish()
+
+    except Exception:
+
+        writer.abort()
+        raise
+
+
+def record_chunk(session_id, chunk_metadata, content_hash, reused=False):
+    """
+    reused: chunk_metadata names stored copies found by lookup; they
+    are referenced in this transaction only if still referenced.
+    Returns False (recording nothing) if none of them is.
+    """
+
+    db: Session = SessionLocal()
+
+    try:
+
+        if not touch_session(db, session_id):
+            raise UploadSessionNotFound()
+
+        # Held like a file's references, so deletes of other files
+        # never remove deduplicated chunks this session relies on
+        if reused:
+
+            chunk_metadata = [
+                dict(chunk, chunk_paths=take_existing_refs(db, chunk["chunk_paths"]))
+                for chunk in chunk_metadata
+            ]
+
+            if not all(chunk["chunk_paths"] for chunk in chunk_metadata):
+                db.rollback()
+                return False
+
+        else:
+            acquire_refs(db, new_refs(chunk_metadata))
+
+        for chunk in chunk_metadata:
+            for path in chunk["chunk_paths"]:
+                db.add(UploadChunk(
+                    session_id=session_id,
+                    chunk_index=chunk["chunk_index"],
+                    chunk_hash=chunk["chunk_hash"],
+                    chunk_path=path,
+                    chunk_size=chunk["chunk_size"],
+                    codec=chunk["codec"],
+                    shard_index=chunk["shard_index"],
+                    content_hash=content_hash
+                ))
+
+        db.commit()
+
+        return True
+
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# Dedup negotiation
+# Before uploading, the client sends the SHA-256 of its
+# chunks; chunks the cluster already stores are added to
+# the session without their bytes being sent. Content
+# mode references the stored copies. File mode keeps one
+# copy per file, so they are copied on the server.
+# Erasure-coded sessions store shards, which are never
+# shared, so all their chunks have to be uploaded.
+# Returns the manifest's indexes still to be uploaded.
+# --------------------------------------------------
+def apply_manifest(session_id, manifest):
+    """
+    manifest: {chunk_index: SHA-256 of the chunk}
+    """
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        session = get_session(db, session_id)
+    finally:
+        db.close()
+
+    for chunk_index in manifest:
+        check_chunk_index(session, chunk_index)
+
+    reuse = parse_storage_policy(session.storage_policy) is None
+
+    online_nodes = None
+    missing = []
+
+    for chunk_index, content_hash in sorted(manifest.items()):
+
+        content_hash = content_hash.lower()
+
+        with _chunk_lock(session_id, chunk_index):
+
+            if not check_not_stored(session_id, chunk_index, content_hash):
+                continue
+
+            codec, paths = lookup_stored_paths(content_hash) if reuse else (None, [])
+
+            # A stored chunk of another size (e.g. some file's last
+            # chunk) cannot fill this index
+            expected = expected_chunk_size(session, chunk_index)
+
+            if paths and lookup_chunk_size(content_hash) != expected:
+                paths = []
+
+            reused = bool(paths) and content_addressed()
+
+            if paths and not reused:
+
+                if online_nodes is None:
+                    online_nodes = get_online_nodes()
+
+                paths = copy_stored_chunk(
+                    online_nodes,
+                    session.id,
+                    chunk_index,
+                    content_hash,
+                    codec,
+                    paths
+                )
+
+            if not paths:
+                missing.append(chunk_index)
+                continue
+
+            chunk_metadata = [{
+                "chunk_index": chunk_index,
+                "chunk_hash": content_hash,
+                "chunk_size": expected,
+                "codec": codec,
+                "shard_index": None,
+                "chunk_paths": paths
+            }]
+
+            try:
+                recorded = record_chunk(
+                    session_id,
+                    chunk_metadata,
+                    content_hash,
+                    reused
+                )
+            except Exception:
+                discard_unrecorded(chunk_metadata)
+                raise
+
+            # Every stored copy was deleted since the lookup
+            if not recorded:
+                missing.append(chunk_index)
+
+    return missing
+
+
+def copy_stored_chunk(online_nodes, file_id, chunk_index, chunk_hash, codec, paths):
+    """
+    Copy a verified stored chunk to this file's own replica paths.
+    Returns the new paths, or [] if no stored copy verifies.
+    """
+
+    source = None
+
+    for path in paths:
+
+        # A copy on a node that cannot be reached is skipped
+        try:
+            if verify_replica(path, chunk_hash, codec=codec):
+                source = path
+                break
+        except OSError:
+            continue
+
+    if source is None:
+        return []
+
+    copied = []
+
+    try:
+
+        for _, chunk_path in chunk_targets(
+            online_nodes,
+            file_id,
+            chunk_index,
+            chunk_hash,
+            codec
+        ):
+            copy_replica(source, chunk_path)
+            copied.append(chunk_path)
+
+    except OSError:
+
+        remove_chunk_files(copied)
+        raise
+
+    return copied
+
+
+# --------------------------------------------------
+# Commit: the session's chunks become the file's
+# Committing again after success returns the file, so a
+# client that lost the response can retry.
+# --------------------------------------------------
+def commit_session(session_id):
+
+    db: Session = SessionLocal()
+
+    try:
+
+        if not touch_session(db, session_id):
+
+            db.rollback()
+
+            committed = db.query(File).filter(File.id == session_id).first()
+
+            if committed is None:
+                raise UploadSessionNotFound()
+
+            return committed
+
+        session = get_session(db, session_id)
+
+        rows = (
+            db.query(UploadChunk)
+            .filter(UploadChunk.session_id == session_id)
+            .order_by(UploadChunk.chunk_index, UploadChunk.id)
+            .all()
+        )
+
+        present = {row.chunk_index for row in rows}
+
+        missing = [i for i in range(session.total_chunks) if i not in present]
+
+        if missing:
+            db.rollback()
+            raise IncompleteUpload(missing)
+
+        # One size per index (rows are per replica or shard)
+        sizes = {row.chunk_index: row.chunk_size for row in rows}
+
+        if sum(sizes.values()) != session.total_size:
+            db.rollback()
+            raise InvalidChunk(
+                f"Chunks add up to {sum(sizes.values())} bytes, "
+                f"the upload declared {session.total_size}"
+            )
+
+        new_file = File(
+            id=session.id,
+            filename=session.filename,
+            owner=session.owner,
+            total_size=session.total_size,
+            total_chunks=session.total_chunks,
+            status="HEALTHY",
+            chunker=f"fixed:{session.chunk_size}",
+            storage_policy=session.storage_policy
+        )
+
+        db.add(new_file)
+        db.flush()
+
+        # References were taken per replica when the chunks were
+        # stored; they now belong to the file's Chunk rows
+        db.add_all(
+            Chunk(
+                file_id=session.id,
+                chunk_index=row.chunk_index,
+                chunk_hash=row.chunk_hash,
+                chunk_path=row.chunk_path,
+                chunk_size=row.chunk_size,
+                codec=row.codec,
+                shard_index=row.shard_index
+            )
+            for row in rows
+        )
+
+        db.execute(
+            delete(UploadChunk).where(UploadChunk.session_id == session_id)
+        )
+        db.delete(session)
+
+        db.commit()
+        db.refresh(new_file)
+
+        return new_file
+
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# Abort: release the session's chunks
+# --------------------------------------------------
+def abort_session(session_id, idle_before=None):
+
+    db: Session = SessionLocal()
+
+    try:
+
+        if not touch_session(db, session_id, idle_before):
+            raise UploadSessionNotFound()
+
+        result = db.execute(
+            delete(UploadChunk)
+            .where(UploadChunk.session_id == session_id)
+            .returning(UploadChunk.chunk_path)
+        )
+
+        unreferenced = release_refs(db, [path for (path,) in result])
+
+        db.query(UploadSession).filter(
+            UploadSession.id == session_id
+        ).delete(synchronize_session=False)
+
+        db.commit()
+
+    finally:
+        db.close()
+
+    remove_chunk_files(unreferenced)
+
+
+# --------------------------------------------------
+# Garbage-collect abandoned sessions
+# --------------------------------------------------
+def collect_expired_sessions():
+
+    idle_before = utcnow() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+    db: Session = ReadSessionLocal()
+
+    try:
+        expired = [
+            session_id
+            for (session_id,) in db.query(UploadSession.id).filter(
+                UploadSession.updated_at < idle_before
+            )
+        ]
+    finally:
+        db.close()
+
+    aborted = 0
+
+    for session_id in expired:
+
+        try:
+            abort_session(session_id, idle_before)
+            aborted += 1
+        except UploadSessionNotFound:
+            # Committed, aborted or active again in the meantime
+            pass
+
+    if aborted:
+        logger.info("Aborted expired upload sessions", extra={"sessions": aborted})
+
+    return aborted
+
+
+def collect_forever():
+
+    while True:
+
+        try:
+            collect_expired_sessions()
+        except Exception:
+            logger.exception("Upload session cleanup failed")
+
+        time.sleep(settings.UPLOAD_SESSION_GC_INTERVAL)
+
+
+def start_session_collector():
+
+    threading.Thread(target=collect_forever, daemon=True).start()
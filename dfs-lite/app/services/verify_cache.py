@@ -0,0 +1,101 @@
+import time
+import threading
+
+from collections import OrderedDict
+
+from app.config import settings
+from app.services.placement import path_node_name
+from app.services.chunk_files import ChunkCorrupt
+from app.services.node_store import stat_key, hash_stored
+from app.services.metrics import CHUNK_HASH_SECONDS
+
+
+# --------------------------------------------------
+# Hash a replica (on its chunk server for remote nodes)
+# --------------------------------------------------
+def hash_replica(path, codec=None):
+
+    with CHUNK_HASH_SECONDS.time(node=path_node_name(path)):
+        return hash_stored(path, codec)
+
+
+# --------------------------------------------------
+# Verification cache
+# Remembers the last successful hash check per replica,
+# keyed by (path, size, mtime_ns, inode). Any rewrite of
+# the file changes the key, so stale entries never match;
+# the TTL bounds how long silent bit rot can go unnoticed.
+# --------------------------------------------------
+_verified = OrderedDict()
+_lock = threading.Lock()
+
+
+def _stat_key(path):
+
+    return (path,) + tuple(stat_key(path))
+
+
+def _lookup(key):
+
+    with _lock:
+
+        entry = _verified.get(key)
+
+        if entry is None:
+            return None
+
+        chunk_hash, verified_at = entry
+
+        if time.monotonic() - verified_at > settings.VERIFY_CACHE_TTL:
+            del _verified[key]
+            return None
+
+        _verified.move_to_end(key)
+
+        return chunk_hash
+
+
+def _record(key, chunk_hash):
+
+    with _lock:
+
+        _verified[key] = (chunk_hash, time.monotonic())
+        _verified.move_to_end(key)
+
+        while len(_verified) > settings.VERIFY_CACHE_MAX_ENTRIES:
+            _verified.popitem(last=False)
+
+
+def verify_replica(path, expected_hash, use_cache=True, codec=None):
+    """
+    True if the replica at `path` exists and hashes to `expected_hash`.
+    use_cache=False forces a disk read (the result is still cached).
+    Compressed replicas (codec set) are decoded first; a replica that
+    fails to decode is reported as not matching.
+    """
+
+    try:
+        key = _stat_key(path)
+    except FileNotFoundError:
+        return False
+
+    if use_cache and _lookup(key) == expected_hash:
+        return True
+
+    try:
+        actual = hash_replica(path, codec)
+    except (FileNotFoundError, ChunkCorrupt):
+        return False
+
+    if actual != expected_hash:
+        return False
+
+    _record(key, actual)
+
+    return True
+
+
+def clear():
+
+    with _lock:
+        _verified.clear()
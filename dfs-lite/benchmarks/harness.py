@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import platform
+import subprocess
+
+from datetime import datetime, timezone
+
+
+# --------------------------------------------------
+# Isolated environment
+# The app reads its settings at import time, so the
+# temporary DB and storage must be in the environment
+# before anything under app/ is imported.
+# --------------------------------------------------
+class BenchEnvironment:
+
+    def __init__(self, workdir=None, keep=False):
+
+        self.root = workdir or tempfile.mkdtemp(prefix="dfs-bench-")
+        self.keep = keep
+
+        self.storage_dir = os.path.join(self.root, "storage")
+        self.db_path = os.path.join(self.root, "bench.db")
+
+    def apply(self, overrides=None):
+
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        env = {
+            "DATABASE_URL": f"sqlite:///{self.db_path}",
+            "STORAGE_DIR": self.storage_dir,
+
+            # Keep background work out of the measurements; the
+            # repair scenarios drive the repair engine themselves
+            "SCRUB_IDLE_SLEEP": "86400",
+            "REPAIR_SCAN_INTERVAL": "86400",
+            "NODE_PROBE_INTERVAL": "86400",
+
+            # Repair logs one line per restored replica
+            "LOG_LEVEL": "WARNING",
+        }
+
+        env.update(overrides or {})
+
+        os.environ.update(env)
+
+        return env
+
+    def cleanup(self):
+
+        if not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def start_client():
+    """
+    Import the app (after BenchEnvironment.apply) and boot it
+    in-process, startup hooks included.
+    """
+
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        sys.exit("The benchmarks need httpx: pip install httpx")
+
+    from app.main import app
+
+    client = TestClient(app)
+    client.__enter__()
+
+    return client
+
+
+# --------------------------------------------------
+# Process I/O counters (Linux /proc/self/io)
+# rchar/wchar count bytes through read()/write(), syscr/
+# syscw the calls, read_bytes/write_bytes what reached the
+# block device. Covers every thread of the process.
+# Reads through mmap (replica hashing, mmap sends) are not
+# read() calls: they only show up in read_bytes, and only
+# when they miss the page cache.
+# --------------------------------------------------
+IO_FIELDS = ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes")
+
+
+def read_io_counters():
+
+    try:
+        with open("/proc/self/io") as f:
+            raw = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return None
+
+    return {field: int(raw[field]) for field in IO_FIELDS if field in raw}
+
+
+def io_delta(before, after):
+
+    if before is None or after is None:
+        return None
+
+    return {field: after[field] - before[field] for field in before}
+
+
+# --------------------------------------------------
+# Latency samples of one scenario
+# --------------------------------------------------
+def percentile(samples, pct):
+
+    if not samples:
+        return None
+
+    ordered = sorted(samples)
+    index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+
+    return ordered[index]
+
+
+class Measurement:
+
+    def __init__(self, name):
+
+        self.name = name
+        self.latencies = []
+        self.payload_bytes = 0
+        self.errors = 0
+        self.extra = {}
+
+        self._started = None
+        self._io_before = None
+        self.elapsed = None
+        self.io = None
+
+    def __enter__(self):
+
+        self._io_before = read_io_counters()
+        self._started = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.elapsed = time.perf_counter() - self._started
+        self.io = io_delta(self._io_before, read_io_counters())
+
+        return False
+
+    def timed(self, func, *args, payload=0, **kwargs):
+        """
+        Run one operation and record its latency. A response with
+        a status code >= 400 counts as an error.
+        """
+
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - started)
+
+        if getattr(result, "status_code", 200) >= 400:
+            self.errors += 1
+        else:
+            self.payload_bytes += payload
+
+        return result
+
+    def summary(self):
+
+        ops = len(self.latencies)
+
+        result = {
+            "ops": ops,
+            "errors": self.errors,
+            "seconds": round(self.elapsed, 4),
+            "ops_per_sec": round(ops / self.elapsed, 2) if self.elapsed else None,
+            "throughput_mb_s": (
+                round(self.payload_bytes / self.elapsed / 1e6, 2)
+                if self.payload_bytes and self.elapsed else None
+            ),
+            "latency_ms": {
+                name: round(percentile(self.latencies, pct) * 1000, 3)
+                for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            } if ops else None,
+        }
+
+        if self.io is not None and ops:
+            result["io_per_op"] = {
+                field: round(value / ops, 1)
+                for field, value in self.io.items()
+            }
+
+        result.update(self.extra)
+
+        return result
+
+
+# --------------------------------------------------
+# Run metadata, so results are comparable
+# --------------------------------------------------
+def git_revision():
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(params):
+
+    from app.config import settings
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "settings": {
+            name: getattr(settings, name)
+            for name in dir(settings)
+            if name.isupper() and isinstance(getattr(settings, name), (int, float, str))
+        },
+    }
@@ -0,0 +1,244 @@
+"""
+Benchmark suite for the upload, download, repair and metadata paths.
+
+Boots the app in-process against a temporary DB and storage directory,
+generates a synthetic dataset and prints one line per scenario; --output
+writes the results as JSON and --compare diffs them against an earlier
+run. Run from dfs-lite/:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from benchmarks.harness import BenchEnvironment, start_client, run_metadata
+
+SCENARIOS = ("upload", "download", "metadata", "repair")
+
+MB = 1024 * 1024
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="DFS Lite benchmark suite"
+    )
+
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--small-files", type=int, default=200)
+    parser.add_argument("--small-size", type=int, default=64 * 1024)
+    parser.add_argument("--large-files", type=int, default=2)
+    parser.add_argument("--large-size", type=int, default=32 * MB)
+    parser.add_argument("--range-reads", type=int, default=200)
+    parser.add_argument("--range-size", type=int, default=256 * 1024)
+    parser.add_argument("--metadata-requests", type=int, default=200)
+    parser.add_argument("--damaged-replicas", type=int, default=20)
+    parser.add_argument("--heal-timeout", type=float, default=120)
+    parser.add_argument("--storage-policy", default=None,
+                        help='"replicated" or "ec:<k>+<m>" for the uploads')
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment setting, e.g. --set CHUNKER=cdc")
+    parser.add_argument("--workdir", default=None,
+                        help="directory for the DB and storage (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the working directory afterwards")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None,
+                        help="earlier JSON results to compare against")
+
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    return args
+
+
+def run_scenarios(client, args):
+
+    from benchmarks import scenarios as s
+
+    dataset = s.Dataset(args.seed)
+    results = []
+
+    # Every other scenario needs data; uploads always run
+    results.append(s.bench_upload_small(
+        client, dataset, args.small_files, args.small_size, args.storage_policy
+    ))
+    results.append(s.bench_upload_large(
+        client, dataset, args.large_files, args.large_size, args.storage_policy
+    ))
+
+    if "download" in args.scenarios:
+        results.append(s.bench_download(client, "download_small", dataset.small))
+        results.append(s.bench_download(client, "download_large", dataset.large))
+        results.append(s.bench_download_ranges(
+            client, dataset, args.range_reads, args.range_size
+        ))
+
+    if "metadata" in args.scenarios:
+        results.append(s.bench_list_files(client, 100))
+        results.append(s.bench_file_metadata(client, dataset, args.metadata_requests))
+        results.append(s.bench_cluster(
+            client, "/cluster/health", "cluster_health", args.metadata_requests
+        ))
+        results.append(s.bench_cluster(
+            client, "/cluster/stats", "cluster_stats", args.metadata_requests
+        ))
+
+    if "repair" in args.scenarios:
+        results.append(s.bench_heal(
+            client, dataset, "heal_corrupt",
+            args.damaged_replicas, "corrupt", args.heal_timeout
+        ))
+        results.append(s.bench_heal(
+            client, dataset, "heal_missing",
+            args.damaged_replicas, "missing", args.heal_timeout
+        ))
+        results.append(s.bench_node_outage(client, args.heal_timeout))
+
+    return {m.name: m.summary() for m in results}
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+def format_row(name, result):
+
+    latency = result.get("latency_ms") or {}
+    io = result.get("io_per_op") or {}
+
+    parts = [f"{name:<18}", f"ops={result['ops']:<5}"]
+
+    if result.get("throughput_mb_s") is not None:
+        parts.append(f"{result['throughput_mb_s']:>8.1f} MB/s")
+
+    if latency:
+        parts.append(f"p50={latency['p50']:.2f}ms p99={latency['p99']:.2f}ms")
+
+    if io:
+        parts.append(f"syscr/op={io.get('syscr', 0):.0f} rchar/op={io.get('rchar', 0):.0f}")
+
+    if "time_to_heal_s" in result:
+        heal = result["time_to_heal_s"]
+        parts.append(f"heal={heal:.2f}s" if heal is not None else "heal=timeout")
+
+    if result.get("skipped"):
+        parts.append(f"skipped: {result['skipped']}")
+
+    if result.get("errors"):
+        parts.append(f"errors={result['errors']}")
+
+    return "  ".join(parts)
+
+
+# Metrics diffed by --compare, and whether higher is better
+COMPARED = (
+    ("throughput_mb_s", True),
+    ("ops_per_sec", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p99", False),
+    ("io_per_op.syscr", False),
+    ("io_per_op.rchar", False),
+    ("time_to_heal_s", False),
+)
+
+
+def lookup(result, path):
+
+    for key in path.split("."):
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+
+    return result
+
+
+def compare(baseline, current):
+
+    lines = []
+
+    for name, result in current.items():
+
+        before = baseline.get(name)
+
+        if before is None:
+            continue
+
+        for metric, higher_is_better in COMPARED:
+
+            old = lookup(before, metric)
+            new = lookup(result, metric)
+
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old * 100
+            better = change > 0 if higher_is_better else change < 0
+
+            lines.append(
+                f"{name:<18} {metric:<18} {old:>12.2f} -> {new:>12.2f}  "
+                f"{change:+7.1f}% {'better' if better else 'worse' if change else ''}"
+            )
+
+    return lines
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+
+    overrides = dict(item.split("=", 1) for item in args.set)
+
+    environment = BenchEnvironment(args.workdir, args.keep)
+    environment.apply(overrides)
+
+    # Keep the app's own logging out of the report
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+    try:
+        client = start_client()
+
+        try:
+            results = run_scenarios(client, args)
+            metadata = run_metadata(vars(args))
+        finally:
+            client.__exit__(None, None, None)
+
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        environment.cleanup()
+
+    for name, result in results.items():
+        print(format_row(name, result))
+
+    report = {"meta": metadata, "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare}:")
+        for line in compare(baseline["results"], results):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
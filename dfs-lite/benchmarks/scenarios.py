@@ -0,0 +1,346 @@
+import os
+import time
+import random
+
+from benchmarks.harness import Measurement
+
+
+# --------------------------------------------------
+# Synthetic datasets
+# --------------------------------------------------
+class Dataset:
+
+    def __init__(self, seed):
+
+        self.rng = random.Random(seed)
+
+        # file_id -> size, per dataset group
+        self.small = {}
+        self.large = {}
+
+    def payload(self, size):
+
+        return self.rng.randbytes(size)
+
+    @property
+    def files(self):
+
+        return {**self.small, **self.large}
+
+
+def upload(client, measurement, owner, name, data, storage_policy=None):
+
+    params = {"owner": owner}
+
+    if storage_policy:
+        params["storage_policy"] = storage_policy
+
+    response = measurement.timed(
+        client.post,
+        "/upload",
+        params=params,
+        files={"uploaded_file": (name, data)},
+        payload=len(data)
+    )
+
+    return response.json().get("file_id")
+
+
+# --------------------------------------------------
+# Upload (save_stream_in_chunks end to end)
+# --------------------------------------------------
+def bench_upload_small(client, dataset, count, size, storage_policy=None):
+
+    with Measurement("upload_small") as m:
+
+        for i in range(count):
+
+            file_id = upload(
+                client, m, "bench-small", f"small-{i}.bin",
+                dataset.payload(size), storage_policy
+            )
+
+            if file_id:
+                dataset.small[file_id] = size
+
+    return m
+
+
+def bench_upload_large(client, dataset, count, size, storage_policy=None):
+
+    # Payloads are generated up front so RNG time stays out
+    # of the upload latencies
+    payloads = [dataset.payload(size) for _ in range(count)]
+
+    with Measurement("upload_large") as m:
+
+        for i, data in enumerate(payloads):
+
+            file_id = upload(
+                client, m, "bench-large", f"large-{i}.bin",
+                data, storage_policy
+            )
+
+            if file_id:
+                dataset.large[file_id] = size
+
+    return m
+
+
+# --------------------------------------------------
+# Download (ChunkStreamResponse)
+# --------------------------------------------------
+def bench_download(client, name, files):
+
+    with Measurement(name) as m:
+
+        for file_id, size in files.items():
+            m.timed(client.get, f"/download/{file_id}", payload=size)
+
+    return m
+
+
+def bench_download_ranges(client, dataset, count, range_size):
+
+    files = list(dataset.files.items())
+
+    with Measurement("download_range") as m:
+
+        if not files:
+            return m
+
+        for _ in range(count):
+
+            file_id, size = dataset.rng.choice(files)
+
+            start = dataset.rng.randrange(max(size - range_size, 1))
+            end = min(start + range_size, size) - 1
+
+            m.timed(
+                client.get,
+                f"/download/{file_id}",
+                headers={"Range": f"bytes={start}-{end}"},
+                payload=end - start + 1
+            )
+
+    return m
+
+
+# --------------------------------------------------
+# Metadata paths
+# --------------------------------------------------
+def bench_list_files(client, page_size):
+
+    with Measurement("list_files") as m:
+
+        cursor = None
+        pages = 0
+
+        while True:
+
+            params = {"limit": page_size}
+
+            if cursor:
+                params["cursor"] = cursor
+
+            response = m.timed(client.get, "/files", params=params)
+            pages += 1
+
+            cursor = response.headers.get("x-next-cursor")
+
+            if not cursor:
+                break
+
+        m.extra["pages"] = pages
+
+    return m
+
+
+def bench_file_metadata(client, dataset, count):
+
+    file_ids = list(dataset.files)
+
+    with Measurement("file_metadata") as m:
+
+        for _ in range(count if file_ids else 0):
+            m.timed(client.get, f"/files/{dataset.rng.choice(file_ids)}")
+
+    return m
+
+
+def bench_cluster(client, path, name, count):
+
+    with Measurement(name) as m:
+
+        for _ in range(count):
+            m.timed(client.get, path)
+
+    return m
+
+
+# --------------------------------------------------
+# Faults and time-to-heal
+# --------------------------------------------------
+def sample_replicas(dataset, count):
+    """
+    Up to count stored copies, at most one per chunk index of
+    a file so every damaged chunk keeps a healthy copy.
+    """
+
+    from app.database import ReadSessionLocal
+    from app.models.chunk import Chunk
+
+    db = ReadSessionLocal()
+
+    try:
+        rows = (
+            db.query(Chunk.file_id, Chunk.chunk_index, Chunk.chunk_path,
+                     Chunk.chunk_hash, Chunk.codec)
+            .order_by(Chunk.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+    seen = set()
+    picked = []
+
+    for row in dataset.rng.sample(rows, len(rows)):
+
+        key = (row.file_id, row.chunk_index)
+
+        if key in seen:
+            continue
+
+        seen.add(key)
+        picked.append(row)
+
+        if len(picked) >= count:
+            break
+
+    return picked
+
+
+def wait_until(check, timeout, interval=0.05):
+
+    started = time.perf_counter()
+
+    while time.perf_counter() - started < timeout:
+
+        if check():
+            return time.perf_counter() - started
+
+        time.sleep(interval)
+
+    return None
+
+
+def replicas_verified(replicas):
+
+    from app.services.verify_cache import verify_replica
+
+    return all(
+        verify_replica(r.chunk_path, r.chunk_hash, use_cache=False, codec=r.codec)
+        for r in replicas
+    )
+
+
+def bench_heal(client, dataset, name, count, damage, timeout):
+    """
+    damage: "corrupt" (overwrite) or "missing" (delete). Files with a
+    damaged replica are downloaded (the degraded read path reports the
+    faults), then time-to-heal is measured until every damaged replica
+    verifies again.
+    """
+
+    replicas = sample_replicas(dataset, count)
+
+    for r in replicas:
+        if damage == "corrupt":
+            with open(r.chunk_path, "wb") as f:
+                f.write(b"benchmark corruption")
+        elif os.path.exists(r.chunk_path):
+            os.remove(r.chunk_path)
+
+    affected = {str(r.file_id) for r in replicas}
+
+    with Measurement(name) as m:
+
+        started = time.perf_counter()
+
+        for file_id in affected:
+            m.timed(client.get, f"/download/{file_id}")
+
+        # Faults the downloads did not run into (another replica
+        # answered first) are handed over as the scrubber would
+        from app.services.repair import (
+            report_corrupt_replica,
+            report_missing_replica
+        )
+
+        report = report_corrupt_replica if damage == "corrupt" else report_missing_replica
+
+        for r in replicas:
+            report(r.chunk_path, r.chunk_hash)
+
+        healed = wait_until(lambda: replicas_verified(replicas), timeout)
+
+        m.extra["damaged_replicas"] = len(replicas)
+        m.extra["time_to_heal_s"] = (
+            round(time.perf_counter() - started, 3)
+            if healed is not None else None
+        )
+
+    return m
+
+
+def replication_restored():
+
+    from app.services.repair import (
+        queue_depth,
+        scan_for_under_replication,
+        last_scan_stats
+    )
+
+    # A scan re-queues whatever is still short, so only scan once
+    # the repair engine has drained its queue
+    if queue_depth():
+        return False
+
+    scan_for_under_replication()
+
+    return last_scan_stats()["under_replicated_chunks"] == 0
+
+
+def bench_node_outage(client, timeout):
+    """
+    Take one node offline and measure until the repair engine has
+    brought every chunk back to its replication target.
+    """
+
+    nodes = client.get("/nodes").json()
+    online = [n["name"] for n in nodes if n["is_online"]]
+
+    with Measurement("heal_node_outage") as m:
+
+        if len(online) < 2:
+            m.extra["skipped"] = "needs two online nodes"
+            return m
+
+        node = online[-1]
+
+        started = time.perf_counter()
+
+        m.timed(client.post, f"/nodes/{node}/toggle")
+
+        healed = wait_until(replication_restored, timeout, 0.5)
+
+        m.extra["node"] = node
+        m.extra["time_to_heal_s"] = (
+            round(time.perf_counter() - started, 3)
+            if healed is not None else None
+        )
+
+    client.post(f"/nodes/{node}/toggle")
+
+    return m